@@ -20,6 +20,11 @@ icon_path = Path('icon.ico')
 if icon_path.exists():
     datas.append((str(icon_path), '.'))
 
+# Встроенный Public Suffix List
+psl_path = Path('domain_engine') / 'data' / 'public_suffix_list.dat'
+if psl_path.exists():
+    datas.append((str(psl_path), 'domain_engine/data'))
+
 # === Анализ ===
 a = Analysis(
     ['domain_extractor.py'],
@@ -0,0 +1,37 @@
+"""Движок извлечения доменов без зависимости от Tk
+
+Имена пакета импортируются лениво (PEP 562): `python -m domain_engine`
+загружает только то, что нужно выбранному пути командной строки.
+"""
+import importlib
+
+# Публичное имя -> модуль пакета
+_EXPORTS = {
+    "ExtractionSettings": "settings",
+    "ExtractionPipeline": "pipeline",
+    "is_valid_domain": "pipeline",
+    "match_pattern": "pipeline",
+    "Formatter": "formatter",
+    "parse_mask": "formatter",
+    "PatternIndex": "patterns",
+    "load_pattern_file": "patterns",
+    "SuffixTrie": "suffix",
+    "get_suffix_trie": "suffix",
+    "public_suffix": "suffix",
+    "registrable_domain": "suffix",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
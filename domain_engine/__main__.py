@@ -0,0 +1,6 @@
+"""Запуск из командной строки: python -m domain_engine --help"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,177 @@
+"""Компактное хранение больших наборов доменов
+
+Домен в списке str стоит 50-60 байт накладных расходов плюс указатель.
+DomainArena хранит домены блоками по BLOCK_ITEMS: UTF-8 через '\\0',
+сжатые zlib, - повторяющиеся метки (com, www, googleapis, cdn) сжимаются
+в несколько бит. Распакованным в памяти бывает только один блок.
+Отсортированная арена помнит первый домен каждого блока, поэтому проверка
+вхождения распаковывает не больше одного блока.
+"""
+import os
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Доменов в одном сжатом блоке
+BLOCK_ITEMS = 8192
+
+# Разделитель доменов в блоке: не встречается ни в доменах, ни в масках
+_SEP = '\0'
+
+# Уровень zlib: блоки пишутся в горячем цикле, скорость важнее степени сжатия
+_LEVEL = 1
+
+
+class DomainArena:
+    """Последовательность доменов в сжатых блоках (только дописывание)
+
+    seqs=True - у каждого домена есть номер (порядок первого появления),
+    records() выдаёт пары (домен, номер). ordered=True - домены дописываются
+    по возрастанию, и для них работает быстрая проверка вхождения.
+    """
+
+    def __init__(self, ordered=False, seqs=False, block_items=BLOCK_ITEMS):
+        self.ordered = ordered
+        self.with_seqs = seqs
+        self.block_items = block_items
+        self.blocks = []        # (сжатый текст, сжатые номера или b'')
+        self.firsts = []        # первый домен каждого блока (для ordered)
+        self.count = 0
+        self.nbytes = 0         # сжатые байты в памяти
+        self.path = None        # файл, если блоки сброшены на диск
+        self._extents = []      # (смещение, длина текста, длина номеров) блоков в файле
+        self._pending = []
+        self._pending_seqs = array('Q')
+        self._cached = (None, None)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def on_disk(self):
+        return self.path is not None
+
+    # === Дописывание ===
+    def append(self, domain, seq=0):
+        self._pending.append(domain)
+        if self.with_seqs:
+            self._pending_seqs.append(seq)
+        self.count += 1
+        if len(self._pending) >= self.block_items:
+            self.seal()
+
+    def extend(self, domains, seqs=None):
+        """Дописывание пачки (seqs - номера той же длины для арены с номерами)"""
+        domains = list(domains)
+        pos = 0
+        while pos < len(domains):
+            take = self.block_items - len(self._pending)
+            self._pending.extend(domains[pos:pos + take])
+            if self.with_seqs:
+                self._pending_seqs.extend(seqs[pos:pos + take])
+            pos += take
+            if len(self._pending) >= self.block_items:
+                self.seal()
+        self.count += len(domains)
+
+    def seal(self):
+        """Сжатие накопленного блока"""
+        if not self._pending:
+            return
+        text = _SEP.join(self._pending)
+        if text.count(_SEP) != len(self._pending) - 1:
+            raise ValueError("домен содержит символ \\0")
+        block = (zlib.compress(text.encode('utf-8'), _LEVEL),
+                 zlib.compress(self._pending_seqs.tobytes(), _LEVEL) if self.with_seqs else b'')
+        if self.ordered:
+            self.firsts.append(self._pending[0])
+        if self.path is None:
+            self.blocks.append(block)
+            self.nbytes += len(block[0]) + len(block[1])
+        else:
+            self._write(block)
+        self._pending = []
+        self._pending_seqs = array('Q')
+
+    # === Сброс на диск ===
+    def spill(self, path):
+        """Перенос сжатых блоков в файл; дальнейшие блоки пишутся туда же"""
+        self.seal()
+        self.path = path
+        open(path, 'wb').close()
+        blocks, self.blocks, self.nbytes = self.blocks, [], 0
+        for block in blocks:
+            self._write(block)
+
+    def _write(self, block):
+        with open(self.path, 'ab') as f:
+            self._extents.append((f.tell(), len(block[0]), len(block[1])))
+            f.write(block[0])
+            f.write(block[1])
+
+    def _iter_raw(self):
+        if self.path is None:
+            yield from self.blocks
+            return
+        with open(self.path, 'rb') as f:
+            for offset, text_len, seqs_len in self._extents:
+                f.seek(offset)
+                yield f.read(text_len), f.read(seqs_len)
+
+    def _raw_block(self, index):
+        if self.path is None:
+            return self.blocks[index]
+        offset, text_len, seqs_len = self._extents[index]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return f.read(text_len), f.read(seqs_len)
+
+    # === Чтение ===
+    def _decode(self, block):
+        domains = zlib.decompress(block[0]).decode('utf-8').split(_SEP)
+        if not self.with_seqs:
+            return domains, None
+        seqs = array('Q')
+        seqs.frombytes(zlib.decompress(block[1]))
+        return domains, seqs
+
+    def iter_blocks(self):
+        """Пары (список доменов, номера или None) по блокам"""
+        for block in self._iter_raw():
+            yield self._decode(block)
+        if self._pending:
+            yield list(self._pending), (self._pending_seqs if self.with_seqs else None)
+
+    def __iter__(self):
+        for domains, _seqs in self.iter_blocks():
+            yield from domains
+
+    def records(self):
+        """Пары (домен, номер) в порядке хранения"""
+        for domains, seqs in self.iter_blocks():
+            yield from zip(domains, seqs)
+
+    def __contains__(self, domain):
+        if not self.ordered:
+            return any(domain in domains for domains, _seqs in self.iter_blocks())
+        if self._pending and self._pending[0] <= domain:
+            i = bisect_left(self._pending, domain)
+            return i < len(self._pending) and self._pending[i] == domain
+        index = bisect_right(self.firsts, domain) - 1
+        if index < 0:
+            return False
+        # Последний распакованный блок держится под рукой: запросы по порядку его переиспользуют
+        cached_index, domains = self._cached
+        if cached_index != index:
+            domains = self._decode(self._raw_block(index))[0]
+            self._cached = (index, domains)
+        i = bisect_left(domains, domain)
+        return i < len(domains) and domains[i] == domain
+
+    def close(self):
+        """Удаление файла сброшенных блоков"""
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
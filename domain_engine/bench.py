@@ -0,0 +1,577 @@
+"""Бенчмарки конвейера и генератор синтетических корпусов
+
+    python -m domain_engine.bench run -o results.json [--quick] [--only extract,filter]
+    python -m domain_engine.bench compare baseline.json results.json [--threshold 0.1]
+    python -m domain_engine.bench corpus proxy 8MB -o proxy.log
+    python -m domain_engine.bench verify [--fuzz 20000]
+
+Корпуса генерируются детерминированно по seed, поэтому результаты разных
+версий кода сравнимы между собой. Время каждого замера - лучшее из repeat
+запусков.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from .pipeline import MODE_PATTERNS, ExtractionPipeline
+from .settings import ExtractionSettings
+
+SEED = 20240601
+
+# Размеры корпусов: обычный прогон и быстрый (--quick)
+SIZES = (1 << 20, 8 << 20)
+QUICK_SIZES = (256 << 10,)
+
+# Патологический корпус медленный на порядки: его размер ограничен
+PATHOLOGICAL_MAX = 1 << 20
+
+# Число паттернов в чёрном/белом списках
+PATTERN_COUNTS = (10, 10_000, 1_000_000)
+QUICK_PATTERN_COUNTS = (10, 10_000)
+
+# Число доменов для дедупликации, сортировки, форматирования и экспорта
+ITEM_COUNTS = (100_000, 1_000_000)
+QUICK_ITEM_COUNTS = (20_000,)
+
+# Порог регрессии по умолчанию и минимальная значимая разница (с)
+THRESHOLD = 0.10
+MIN_DELTA = 0.002
+
+GROUPS = ('extract', 'scan', 'filter', 'format', 'dedup', 'export')
+
+# Дифференциальная проверка сканера: размер корпусов и число случайных строк на режим
+VERIFY_SIZE = 256 << 10
+VERIFY_FUZZ = 20_000
+
+# === Генератор корпусов ===
+_SYLLABLES = ('ka', 'lo', 'mi', 'net', 'web', 'cloud', 'shop', 'data', 'ya', 'go', 'cdn', 'api',
+              'tech', 'sys', 'mail', 'news', 'pro', 'ru', 'info', 'soft', 'bank', 'ex', 'ample', 'zen')
+_TLDS = (('com', 40), ('ru', 20), ('net', 10), ('org', 8), ('co.uk', 5), ('io', 4), ('de', 4),
+         ('com.au', 2), ('info', 3), ('su', 1), ('xyz', 2), ('online', 1))
+_SUBDOMAINS = ('', '', '', 'www.', 'www.', 'cdn.', 'api.', 'mail.', 'static.', 'img.', 'm.', 'a1.b2.')
+_IDN_SYLLABLES = ('при', 'мер', 'сайт', 'банк', 'почта', 'ново', 'сти', 'мага', 'зин', 'тест', 'дом', 'сеть')
+_IDN_TLDS = ('рф', 'рф', 'рус', 'москва', 'com', 'su')
+_WORDS = ('the', 'и', 'data', 'запрос', 'error', 'ok', 'user', 'login', 'страница', 'file', 'v2',
+          'тест', 'index', 'Hello', 'world', 'report', 'отчёт', '2024', 'id', 'value')
+
+
+class DomainPool:
+    """Пул доменов с повторяемостью по закону Ципфа (как в реальных логах)"""
+
+    def __init__(self, rng, size=20_000):
+        self.rng = rng
+        names, weights = zip(*_TLDS)
+        tlds = rng.choices(names, weights, k=size)
+        self.domains = [self._name() + '.' + tld for tld in tlds]
+        self.hosts = [rng.choice(_SUBDOMAINS) + d for d in self.domains]
+        self.cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(size)))
+
+    def _name(self):
+        rng = self.rng
+        name = ''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 3)))
+        if rng.random() < 0.15:
+            name += '-' + rng.choice(_SYLLABLES)
+        if rng.random() < 0.1:
+            name += str(rng.randint(1, 99))
+        return name
+
+    def sample(self, k):
+        return self.rng.choices(self.hosts, cum_weights=self.cum_weights, k=k)
+
+    def stream(self):
+        """Бесконечный поток хостов"""
+        while True:
+            yield from self.sample(1024)
+
+
+def _path(rng):
+    return '/' + '/'.join(rng.choice(_WORDS) for _ in range(rng.randint(0, 3))) + \
+        (f"?id={rng.randint(1, 99999)}" if rng.random() < 0.4 else '')
+
+
+def _proxy(rng, pool):
+    for host in pool.stream():
+        yield (f"{1700000000 + rng.randint(0, 10 ** 6)}.{rng.randint(100, 999)} {rng.randint(1, 9999):6d} "
+               f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)} TCP_MISS/200 "
+               f"{rng.randint(200, 99999)} GET http://{host}{_path(rng)} - "
+               f"HIER_DIRECT/{rng.randint(1, 223)}.{rng.randint(0, 255)}.0.{rng.randint(1, 254)} text/html\n")
+
+
+def _idn(rng, pool):
+    # Лог прокси, где треть хостов - кириллические, часть из них уже в punycode
+    idn_hosts = []
+    for _ in range(2000):
+        host = ''.join(rng.choice(_IDN_SYLLABLES) for _ in range(rng.randint(1, 3))) + '.' + rng.choice(_IDN_TLDS)
+        if rng.random() < 0.2:
+            host = host.encode('idna').decode('ascii')
+        idn_hosts.append(rng.choice(_SUBDOMAINS[:5]) + host)
+    for line in _proxy(rng, pool):
+        if rng.random() < 0.33:
+            host = line.split('http://', 1)[1].split('/', 1)[0]
+            line = line.replace(host, rng.choice(idn_hosts), 1)
+        yield line
+
+
+def _html(rng, pool):
+    for host in pool.stream():
+        word = rng.choice(_WORDS)
+        kind = rng.random()
+        if kind < 0.5:
+            yield f'<li><a href="https://{host}{_path(rng)}" class="link">{word} {word}</a></li>\n'
+        elif kind < 0.7:
+            yield f'<img src="//{host}/img/{rng.randint(1, 999)}.png" alt="{word}">\n'
+        elif kind < 0.85:
+            yield f'<p>{word} {host} {rng.choice(_WORDS)}, {rng.choice(_WORDS)}.</p>\n'
+        else:
+            yield f'<script>var u="{word}.{rng.choice(_WORDS)}";</script><div>{word}</div>\n'
+
+
+def _email(rng, pool):
+    for host in pool.stream():
+        user = rng.choice(_WORDS).lower() + str(rng.randint(1, 999))
+        kind = rng.random()
+        if kind < 0.3:
+            yield f"From: {rng.choice(_WORDS)} <{user}@{host}>\n"
+        elif kind < 0.5:
+            yield f"Received: from mx{rng.randint(1, 9)}.{host} (mx.{host} [10.0.0.{rng.randint(1, 254)}])\n"
+        elif kind < 0.6:
+            yield f"Message-ID: <{rng.getrandbits(48):x}.{rng.randint(1, 99)}@{host}>\n"
+        else:
+            yield ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(3, 12))) + f" {user}@{host}\n"
+
+
+def _csv(rng, pool):
+    yield "id,url,referrer,timestamp,status\n"
+    for i, host in enumerate(pool.stream()):
+        yield (f'{i},"https://{host}{_path(rng)}",{rng.choice(pool.hosts)},'
+               f'2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:00:00,{rng.choice((200, 301, 404))}\n')
+
+
+def _pathological(rng, pool):
+    """Строки, на которых бэктрекинг aggressive и standard растёт: длинные цепочки меток без зоны"""
+    while True:
+        kind = rng.random()
+        if kind < 0.3:
+            yield '.'.join('a' * rng.randint(1, 3) for _ in range(rng.randint(20, 200))) + '.1\n'
+        elif kind < 0.5:
+            yield '-'.join('x' * rng.randint(1, 5) for _ in range(rng.randint(20, 200))) + '\n'
+        elif kind < 0.7:
+            yield 'a' * rng.randint(100, 2000) + '.' + '9' * rng.randint(1, 20) + '\n'
+        elif kind < 0.85:
+            yield ('ab.' * rng.randint(50, 400)) + '\n'
+        else:
+            yield ' '.join(pool.sample(3)) + '\n'
+
+
+CORPORA = {
+    'proxy': _proxy,
+    'html': _html,
+    'email': _email,
+    'csv': _csv,
+    'pathological': _pathological,
+    'idn': _idn,
+}
+
+
+def generate_corpus(kind, size, seed=SEED):
+    """Текст корпуса вида kind размером около size байт UTF-8"""
+    rng = random.Random(f"{seed}:{kind}")
+    pool = DomainPool(rng)
+    lines = CORPORA[kind](rng, pool)
+    parts = []
+    total = 0
+    for line in lines:
+        parts.append(line)
+        total += len(line.encode('utf-8'))
+        if total >= size:
+            break
+    return ''.join(parts)
+
+
+def generate_domains(count, seed=SEED):
+    """Список доменов с повторами для дедупликации, сортировки и экспорта"""
+    rng = random.Random(f"{seed}:domains")
+    pool = DomainPool(rng, size=max(1000, count // 4))
+    return pool.sample(count)
+
+
+def generate_patterns(count, seed=SEED):
+    """Паттерны списков: точные домены, *.suffix, prefix.* и несколько общих wildcard"""
+    rng = random.Random(f"{seed}:patterns")
+    pool = DomainPool(rng, size=min(count, 200_000) or 1)
+    # Общие wildcard уходят в один regex: их в реальных списках единицы
+    patterns = [f"*{rng.choice(_SYLLABLES)}*{rng.choice(_SYLLABLES)}*" for _ in range(min(count // 100, 20))]
+    for i in range(count - len(patterns)):
+        domain = pool.domains[i % len(pool.domains)]
+        if i >= len(pool.domains):
+            domain = f"n{i}-{domain}"
+        kind = rng.random()
+        if kind < 0.6:
+            patterns.append(domain)
+        elif kind < 0.85:
+            patterns.append('*.' + domain)
+        else:
+            patterns.append(domain.split('.')[0] + '.*')
+    return patterns
+
+
+def size_label(size):
+    for unit, shift in (('MB', 20), ('KB', 10)):
+        if size >= 1 << shift and not size % (1 << shift):
+            return f"{size >> shift}{unit}"
+    return f"{size}B"
+
+
+def parse_size(text):
+    """'8MB', '256KB', '1000' в байты"""
+    text = text.strip().upper()
+    for unit, shift in (('MB', 20), ('KB', 10), ('B', 0)):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * (1 << shift))
+    return int(text)
+
+
+# === Замеры ===
+def measure(fn, repeat=3):
+    """Лучшее время из repeat запусков (с)"""
+    best = float('inf')
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+class Runner:
+    """Прогон групп бенчмарков с накоплением результатов"""
+
+    def __init__(self, quick=False, seed=SEED, repeat=3, log=None):
+        self.quick = quick
+        self.seed = seed
+        self.repeat = repeat
+        self.log = log or (lambda message: None)
+        self.results = {}
+        self._corpora = {}
+
+    def corpus(self, kind, size):
+        key = (kind, size)
+        if key not in self._corpora:
+            self._corpora[key] = generate_corpus(kind, size, self.seed)
+        return self._corpora[key]
+
+    @property
+    def sizes(self):
+        return QUICK_SIZES if self.quick else SIZES
+
+    def record(self, name, fn, nbytes=None, items=None, repeat=None):
+        seconds = measure(fn, self.repeat if repeat is None else repeat)
+        entry = {'seconds': seconds}
+        if nbytes is not None:
+            entry['bytes'] = nbytes
+            entry['mb_per_sec'] = nbytes / 1048576 / seconds if seconds else None
+        if items is not None:
+            entry['items'] = items
+            entry['items_per_sec'] = items / seconds if seconds else None
+        self.results[name] = entry
+        rate = (f"{entry['mb_per_sec']:.1f} МБ/с" if nbytes is not None
+                else f"{entry['items_per_sec']:,.0f} эл./с" if items is not None else "")
+        self.log(f"{name:<50} {seconds * 1000:10.2f} мс  {rate}")
+        return entry
+
+    def run(self, groups=GROUPS):
+        for group in groups:
+            getattr(self, f"bench_{group}")()
+        return self.results
+
+    # === Группы ===
+    def bench_extract(self):
+        """Извлечение и валидация каждым режимом на каждом корпусе"""
+        done = set()
+        for size in self.sizes:
+            for kind in CORPORA:
+                if kind == 'pathological':
+                    size = min(size, PATHOLOGICAL_MAX)
+                if (kind, size) in done:
+                    continue
+                done.add((kind, size))
+                text = self.corpus(kind, size)
+                nbytes = len(text.encode('utf-8'))
+                for mode in MODE_PATTERNS:
+                    pipeline = ExtractionPipeline(ExtractionSettings(extraction_mode=mode))
+                    self.record(f"extract/{mode}/{kind}/{size_label(size)}",
+                                lambda: pipeline.validate(pipeline.extract(text)), nbytes=nbytes)
+                    # Ручной сканер точек с тем же результатом, что у regex
+                    pipeline = ExtractionPipeline(ExtractionSettings(extraction_mode=mode, extract_engine="scanner"))
+                    self.record(f"extract/scanner/{mode}/{kind}/{size_label(size)}",
+                                lambda: pipeline.validate(pipeline.extract(text)), nbytes=nbytes)
+                    if kind not in ('proxy', 'idn'):
+                        continue
+                    # Юникодные шаблоны и IDNA: на ASCII-логе и на логе с кириллическими доменами
+                    for idn in ('punycode', 'unicode'):
+                        pipeline = ExtractionPipeline(ExtractionSettings(extraction_mode=mode, idn=idn))
+                        self.record(f"extract/idn-{idn}/{mode}/{kind}/{size_label(size)}",
+                                    lambda: pipeline.validate(pipeline.extract(text)), nbytes=nbytes)
+
+    def bench_scan(self):
+        """Чтение файла целиком: текстовый путь против bytes-regex по mmap"""
+        from .parallel import WorkUnit, iter_unit_candidates
+        size = self.sizes[-1]
+        with tempfile.TemporaryDirectory(prefix='domain_bench_') as tmp:
+            for kind in ('proxy', 'html'):
+                path = os.path.join(tmp, f"{kind}.txt")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(self.corpus(kind, size))
+                nbytes = os.path.getsize(path)
+                unit = WorkUnit(0, 0, path, 'utf-8', 0, None, nbytes)
+                for mode in MODE_PATTERNS:
+                    for byte_scan in (False, True):
+                        pipeline = ExtractionPipeline(ExtractionSettings(extraction_mode=mode, byte_scan=byte_scan))
+                        self.record(f"scan/{'bytes' if byte_scan else 'text'}/{mode}/{kind}/{size_label(size)}",
+                                    lambda: [c for c, _pos in iter_unit_candidates(unit, pipeline)], nbytes=nbytes)
+
+    def bench_filter(self):
+        """Фильтр TLD и списки из 10 / 10k / 1M паттернов: построение индекса и проверка"""
+        text = self.corpus('proxy', self.sizes[-1])
+        domains = ExtractionPipeline(ExtractionSettings()).validate(
+            ExtractionPipeline(ExtractionSettings()).extract(text))
+        n = len(domains)
+        pipeline = ExtractionPipeline(ExtractionSettings(selected_tlds=frozenset({'com', 'ru', 'co.uk'})))
+        self.record("filter/tld/3", lambda: pipeline.filter(domains), items=n)
+        for count in QUICK_PATTERN_COUNTS if self.quick else PATTERN_COUNTS:
+            patterns = tuple(generate_patterns(count, self.seed))
+            for kind in ('blacklist', 'whitelist'):
+                settings = ExtractionSettings(**{kind: patterns})
+                built = []
+                self.record(f"filter/{kind}/{count}/build", lambda: built.append(ExtractionPipeline(settings)),
+                            items=count, repeat=1)
+                pipeline = built[-1]
+                self.record(f"filter/{kind}/{count}/match", lambda: pipeline.filter(domains), items=n)
+
+    def bench_format(self):
+        """Форматирование: полный домен, зоны, SLD и продвинутая маска"""
+        variants = {
+            'full': {},
+            'upper': {'case_mode': 'upper'},
+            'no_tld': {'domain_format': 'no_tld'},
+            'sld': {'domain_format': 'sld'},
+            'prefix_suffix': {'prefix': 'http://', 'suffix': '/'},
+            'mask': {'use_advanced_mask': True, 'advanced_mask': 'https://{subdomain}.{name}.{tld}/?d={domain}'},
+        }
+        for count in QUICK_ITEM_COUNTS if self.quick else ITEM_COUNTS:
+            domains = generate_domains(count, self.seed)
+            for name, changes in variants.items():
+                pipeline = ExtractionPipeline(ExtractionSettings(**changes))
+                self.record(f"format/{name}/{count}", lambda: pipeline.format_all(domains), items=count)
+
+    def bench_dedup(self):
+        """Точная дедупликация, сортировка и фильтр Блума"""
+        from .extsort import ExternalSorter
+        from .sketches import BloomFilter
+
+        def sorter_run(domains, sort, dedup):
+            with ExternalSorter(sort=sort, dedup=dedup) as sorter:
+                sorter.extend(domains)
+                for _ in sorter.finish():
+                    pass
+
+        def bloom_run(domains):
+            bloom = BloomFilter(len(domains))
+            return [d for d in domains if bloom.add(d)]
+
+        for count in QUICK_ITEM_COUNTS if self.quick else ITEM_COUNTS:
+            domains = generate_domains(count, self.seed)
+            self.record(f"dedup/exact/{count}", lambda: sorter_run(domains, False, True), items=count)
+            self.record(f"dedup/sort/{count}", lambda: sorter_run(domains, True, False), items=count)
+            self.record(f"dedup/exact_sort/{count}", lambda: sorter_run(domains, True, True), items=count)
+            self.record(f"dedup/bloom/{count}", lambda: bloom_run(domains), items=count)
+
+    def bench_export(self):
+        """Экспорт в каждый формат во временный файл"""
+        from .exporters import EXPORTERS, export
+        with tempfile.TemporaryDirectory(prefix='domain_bench_') as tmp:
+            for count in QUICK_ITEM_COUNTS if self.quick else ITEM_COUNTS:
+                domains = generate_domains(count, self.seed)
+                for fmt in EXPORTERS:
+                    settings = ExtractionSettings(export_format=fmt)
+                    path = os.path.join(tmp, f"out.{fmt}")
+                    self.record(f"export/{fmt}/{count}", lambda: export(iter(domains), path, settings),
+                                items=len(domains))
+
+
+# === Дифференциальная проверка сканера ===
+# Алфавит случайных строк: граничные случаи шаблонов (схемы, www, дефисы, длинные метки, \w не-ASCII)
+_FUZZ_TOKENS = tuple('abcxyzwhtpsABW019-._@:/ ') + (
+    'www.', 'http://', 'https://', 'HTTPS://', 'WwW.', '.com', '.ru', '-', '..', '_', 'й', '²',
+    'a' * 70, '\n', '.x1', 'co.uk')
+
+
+def _fuzz_text(rng):
+    return ''.join(rng.choice(_FUZZ_TOKENS) for _ in range(rng.randint(1, 40)))
+
+
+def verify(seed=SEED, fuzz=VERIFY_FUZZ, size=VERIFY_SIZE, log=print):
+    """Сравнение findall сканера и регулярного выражения на корпусах и случайных строках
+
+    Возвращает число расхождений; по каждому печатается первое различие.
+    """
+    from .scanner import SCANNER_MODES, CandidateScanner
+    mismatches = 0
+
+    def check(mode, name, text, expected, got):
+        nonlocal mismatches
+        if expected == got:
+            return
+        mismatches += 1
+        index = next((i for i, (a, b) in enumerate(zip(expected, got)) if a != b), min(len(expected), len(got)))
+        log(f"❌ {mode}/{name}: кандидат #{index}: regex {expected[index:index + 1]} сканер {got[index:index + 1]}")
+        if len(text) <= 200:
+            log(f"   текст: {text!r}")
+
+    for mode in SCANNER_MODES:
+        scanner = CandidateScanner(mode)
+        pattern = MODE_PATTERNS[mode]
+        for kind in CORPORA:
+            text = generate_corpus(kind, min(size, PATHOLOGICAL_MAX) if kind == 'pathological' else size, seed)
+            start = time.perf_counter()
+            expected = pattern.findall(text)
+            regex_time = time.perf_counter() - start
+            start = time.perf_counter()
+            got = scanner.findall(text)
+            scanner_time = time.perf_counter() - start
+            check(mode, kind, text, expected, got)
+            log(f"{mode:<10} {kind:<12} кандидатов {len(expected):>7}  "
+                f"regex {regex_time * 1000:8.1f} мс  сканер {scanner_time * 1000:8.1f} мс")
+        rng = random.Random(f"{seed}:fuzz:{mode}")
+        for i in range(fuzz):
+            text = _fuzz_text(rng)
+            check(mode, f"fuzz#{i}", text, pattern.findall(text), scanner.findall(text))
+    return mismatches
+
+
+def metadata(runner):
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': runner.seed,
+        'quick': runner.quick,
+        'repeat': runner.repeat,
+    }
+
+
+def compare(baseline, current, threshold=THRESHOLD, min_delta=MIN_DELTA):
+    """Сравнение результатов: список (имя, было с, стало с, отношение, регрессия)
+
+    Регрессия - замедление больше threshold и больше min_delta секунд.
+    """
+    base, cur = baseline['results'], current['results']
+    rows = []
+    for name in sorted(base.keys() & cur.keys()):
+        before, after = base[name]['seconds'], cur[name]['seconds']
+        ratio = after / before if before else float('inf')
+        regression = ratio > 1 + threshold and after - before > min_delta
+        rows.append((name, before, after, ratio, regression))
+    return rows
+
+
+# === Командная строка ===
+def _run(args):
+    groups = [g.strip() for g in args.only.split(',')] if args.only else list(GROUPS)
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        print(f"❌ Неизвестные группы: {', '.join(sorted(unknown))} (есть: {', '.join(GROUPS)})",
+              file=sys.stderr)
+        return 2
+    runner = Runner(quick=args.quick, seed=args.seed, repeat=args.repeat,
+                    log=lambda message: print(message, file=sys.stderr))
+    runner.run(groups)
+    data = {'meta': metadata(runner), 'results': runner.results}
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"✅ Результаты сохранены: {args.output}", file=sys.stderr)
+    return 0
+
+
+def _compare(args):
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold, args.min_delta)
+    regressions = 0
+    for name, before, after, ratio, regression in rows:
+        regressions += regression
+        if regression or not args.regressions_only:
+            mark = '❌' if regression else ('✅' if ratio < 1 - args.threshold else '  ')
+            print(f"{mark} {name:<50} {before * 1000:10.2f} → {after * 1000:10.2f} мс  ×{ratio:.2f}")
+    print(f"Сравнено замеров: {len(rows)}, регрессий: {regressions}")
+    return 1 if regressions else 0
+
+
+def _corpus(args):
+    text = generate_corpus(args.kind, parse_size(args.size), args.seed)
+    if args.output == '-':
+        sys.stdout.write(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return 0
+
+
+def _verify(args):
+    mismatches = verify(args.seed, args.fuzz, parse_size(args.size))
+    if mismatches:
+        print(f"❌ Расхождений сканера с regex: {mismatches}")
+        return 1
+    print("✅ Сканер совпадает с regex во всех режимах")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m domain_engine.bench",
+                                     description="Бенчмарки конвейера извлечения доменов")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help="прогон бенчмарков, результат - JSON")
+    run.add_argument('-o', '--output', default='-', help="файл результатов ('-' - stdout)")
+    run.add_argument('--quick', action='store_true', help="маленькие размеры для быстрой проверки")
+    run.add_argument('--only', help=f"группы через запятую: {', '.join(GROUPS)}")
+    run.add_argument('--seed', type=int, default=SEED)
+    run.add_argument('--repeat', type=int, default=3, help="запусков на замер (берётся лучший)")
+    run.set_defaults(func=_run)
+    cmp = sub.add_parser('compare', help="сравнение с базовыми результатами, код 1 при регрессиях")
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=THRESHOLD, help="допустимое замедление (доля)")
+    cmp.add_argument('--min-delta', type=float, default=MIN_DELTA, help="минимальная значимая разница, с")
+    cmp.add_argument('--regressions-only', action='store_true', help="показывать только регрессии")
+    cmp.set_defaults(func=_compare)
+    corpus = sub.add_parser('corpus', help="запись синтетического корпуса")
+    corpus.add_argument('kind', choices=sorted(CORPORA))
+    corpus.add_argument('size', help="размер: 8MB, 256KB, 1000")
+    corpus.add_argument('-o', '--output', default='-')
+    corpus.add_argument('--seed', type=int, default=SEED)
+    corpus.set_defaults(func=_corpus)
+    check = sub.add_parser('verify', help="сравнение сканера точек с regex, код 1 при расхождениях")
+    check.add_argument('--fuzz', type=int, default=VERIFY_FUZZ, help="случайных строк на режим")
+    check.add_argument('--size', default=size_label(VERIFY_SIZE), help="размер корпусов")
+    check.add_argument('--seed', type=int, default=SEED)
+    check.set_defaults(func=_verify)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,16 @@
+"""Каталог и файлы кэша движка"""
+import os
+from pathlib import Path
+
+
+def cache_dir():
+    """Каталог кэша (DOMAIN_EXTRACTOR_CACHE, LOCALAPPDATA или XDG_CACHE_HOME)"""
+    base = os.environ.get('DOMAIN_EXTRACTOR_CACHE')
+    if base:
+        path = Path(base)
+    elif os.name == 'nt' and os.environ.get('LOCALAPPDATA'):
+        path = Path(os.environ['LOCALAPPDATA']) / 'DomainExtractor' / 'cache'
+    else:
+        path = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'domain_extractor'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
@@ -0,0 +1,309 @@
+"""Пакетный запуск без Tk: python -m domain_engine [параметры] ВХОД... -o ВЫХОД
+
+Параметры совпадают с ключами save_config; файл конфигурации того же формата
+задаётся через --config, параметры командной строки его переопределяют.
+Тяжёлые модули импортируются только на нужном пути: детектор кодировки -
+если кодировку приходится определять, пул процессов - при workers > 1.
+"""
+import argparse
+import json
+import re
+import sys
+from dataclasses import fields
+
+from .settings import ExtractionSettings
+
+# Коды завершения (как у grep: 1 - ничего не найдено)
+EXIT_OK = 0
+EXIT_NO_DOMAINS = 1
+EXIT_USAGE = 2
+EXIT_ERROR = 3
+EXIT_INTERRUPTED = 130
+EXIT_BROKEN_PIPE = 141  # как при завершении по SIGPIPE
+
+# Имя стандартного потока в аргументах
+STDIN = STDOUT = '-'
+
+# Блок чтения stdin (в символах): меньше файлового, чтобы фильтр не копил вывод
+STDIN_CHUNK = 256 * 1024
+
+_CHOICES = {
+    'extraction_mode': ('standard', 'aggressive', 'email', 'url'),
+    'idn': ('off', 'punycode', 'unicode'),
+    'extract_engine': ('regex', 'scanner'),
+    'case_mode': ('lower', 'upper', 'original'),
+    'domain_format': ('full', 'no_tld', 'only_tld', 'sld'),
+    'dedup_mode': ('exact', 'approximate'),
+    'export_format': ('txt', 'csv', 'json', 'xml'),
+}
+
+_HELP = {
+    'extraction_mode': "режим извлечения",
+    'strip_chars': "символы, срезаемые по краям кандидата",
+    'min_length': "минимальная длина домена",
+    'max_length': "максимальная длина домена",
+    'validate_dns': "проверка структуры домена",
+    'idn': "юникодные домены (пример.рф): выключено, вывод в punycode или в юникоде",
+    'extract_engine': "поиск кандидатов: findall регулярного выражения или сканер точек (тот же результат)",
+    'selected_tlds': 'фильтр зон через запятую, например ".com, .ru"',
+    'blacklist': "шаблон чёрного списка (можно повторять)",
+    'whitelist': "шаблон белого списка (можно повторять)",
+    'blacklist_files': "файл шаблонов чёрного списка (можно повторять)",
+    'whitelist_files': "файл шаблонов белого списка (можно повторять)",
+    'remove_www': "удалять www.",
+    'case_mode': "регистр результата",
+    'domain_format': "формат домена",
+    'use_advanced_mask': "форматировать по маске --advanced-mask",
+    'advanced_mask': "маска: {domain} {name} {tld} {sld} {subdomain} {full}",
+    'prefix': "префикс каждой строки",
+    'suffix': "суффикс каждой строки",
+    'remove_duplicates': "удалять дубликаты",
+    'dedup_mode': "дедупликация: точная или фильтром Блума",
+    'approx_capacity': "ёмкость фильтра Блума",
+    'approx_fp_rate': "доля ложных срабатываний фильтра Блума",
+    'sort_results': "сортировать результат",
+    'heavy_hitters': "частые домены и регистрируемые домены в статистике (Count-Min Sketch)",
+    'heavy_hitters_k': "размер top-K частых доменов",
+    'heavy_hitters_mb': "память Count-Min Sketch на процесс, МБ",
+    'export_format': "формат вывода",
+    'separator': r"разделитель txt (\n, \t, \r)",
+    'workers': "число процессов (0 - по числу ядер)",
+    'byte_scan': "bytes-regex по mmap для ASCII-совместимых кодировок",
+    'memory_budget_mb': "бюджет памяти сортировки, МБ",
+    'result_cache': "кэш кандидатов по файлам между запусками",
+    'result_cache_mb': "лимит кэша результатов, МБ",
+    'profile': "cProfile запуска: ВЫХОД.prof и сводка ВЫХОД.prof.txt (для stdout - в кэше)",
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="domain-extractor",
+        description="Извлечение доменов из текстовых файлов без графического интерфейса.",
+        epilog="Коды завершения: 0 - домены найдены, 1 - не найдены, 2 - ошибка параметров, "
+               "3 - ошибка обработки.")
+    parser.add_argument('inputs', nargs='*', metavar='ВХОД',
+                        help="входные файлы (в том числе .gz/.bz2/.xz/.zst); '-' или пусто - stdin")
+    parser.add_argument('-o', '--output', default=STDOUT, metavar='ВЫХОД',
+                        help="файл результата; '-' - stdout (по умолчанию)")
+    parser.add_argument('-c', '--config', metavar='JSON',
+                        help="файл конфигурации в формате save_config")
+    parser.add_argument('-e', '--encoding',
+                        help="кодировка входа (по умолчанию определяется автоматически)")
+    parser.add_argument('-f', '--follow', action='store_true',
+                        help="следить за дописываемыми файлами и дописывать только новые домены "
+                             "(по домену на строку; позиции и выданные домены сохраняются между запусками)")
+    parser.add_argument('--interval', type=float, default=2.0, metavar='СЕК',
+                        help="пауза между проходами в режиме слежения")
+    parser.add_argument('--stats', action='store_true', help="статистика в JSON в stderr")
+    parser.add_argument('-q', '--quiet', action='store_true', help="без сообщений в stderr")
+    group = parser.add_argument_group("настройки обработки (ключи save_config)")
+    for f in fields(ExtractionSettings):
+        # Заданы только явно указанные параметры: остальное - из --config или по умолчанию
+        kwargs = {'default': argparse.SUPPRESS, 'help': _HELP.get(f.name)}
+        if f.name == 'selected_tlds':
+            group.add_argument('--tld-filter', dest='tld_filter', metavar='ЗОНЫ', **kwargs)
+            continue
+        option = '--' + f.name.replace('_', '-')
+        if isinstance(f.default, bool):
+            group.add_argument(option, action=argparse.BooleanOptionalAction, **kwargs)
+        elif isinstance(f.default, tuple):
+            group.add_argument(option, action='append', metavar='ЗНАЧЕНИЕ', **kwargs)
+        else:
+            group.add_argument(option, type=type(f.default), choices=_CHOICES.get(f.name),
+                               metavar=None if f.name in _CHOICES else 'ЗНАЧЕНИЕ', **kwargs)
+    return parser
+
+
+def load_settings(args):
+    """Снимок настроек: файл конфигурации, поверх него - параметры командной строки"""
+    config = {}
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError(f"{args.config}: ожидается JSON-объект")
+    names = {f.name for f in fields(ExtractionSettings)} | {'tld_filter'}
+    config.update((k, v) for k, v in vars(args).items() if k in names)
+    return ExtractionSettings.from_config(config)
+
+
+def _stdin_result(index, pipeline, encoding, log):
+    """Обработка stdin одной единицей работы: блоки доменов выдаются по ходу чтения
+
+    Статистика, HLL и частые домены копятся в одном результате на весь поток;
+    его поля окончательны после исчерпания 'blocks', как у run_units.
+    """
+    from .instrument import StageStats
+    from .parallel import WorkUnit, iter_unit_blocks, unit_result
+    from .reader import bytes_consumed, iter_text_chunks, open_stream
+    stream = sys.stdin.buffer
+    head = b''
+    tier = 'manual'
+    if encoding is None:
+        from .encoding import SAMPLE_SIZE, detect_bytes
+        head = stream.read(SAMPLE_SIZE)
+        encoding, tier = detect_bytes(head, len(head) < SAMPLE_SIZE)
+    log(f" ℹ stdin: кодировка {encoding} ({tier})")
+    unit = WorkUnit(0, index, STDIN, encoding, 0, None, 0)
+    result = unit_result(unit)
+    stages = StageStats()
+
+    def candidates():
+        # Чтение, regex и валидация - здесь, фильтры и формат - в iter_unit_blocks
+        with open_stream(stream, encoding, head) as f:
+            for chunk in stages.timed('read', iter_text_chunks(f, STDIN_CHUNK)):
+                stages.count('decoded_chars', len(chunk))
+                with stages.timer('extract'):
+                    found = pipeline.extract(chunk)
+                stages.count('candidates', len(found))
+                with stages.timer('validate'):
+                    valid = pipeline.validate(found, stages)
+                result['bytes'] = bytes_consumed(f)
+                yield valid, result['bytes']
+
+    def blocks():
+        yield from iter_unit_blocks(result, unit, pipeline, blocks=candidates())
+        result['stages'].merge(stages)
+
+    result['blocks'] = blocks()
+    return result
+
+
+def iter_results(inputs, settings, encoding=None, log=None):
+    """Результаты run_units по входам в порядке аргументов
+
+    Выдаёт (номер входа, результат, вход обработан полностью); поля результата,
+    кроме 'blocks', окончательны после исчерпания его блоков.
+    Подряд идущие файлы обрабатываются одним планом работ.
+    """
+    from .parallel import plan_units, resolve_workers, run_units
+    from .pipeline import ExtractionPipeline
+    log = log or (lambda message: None)
+    workers = resolve_workers(settings.workers)
+    detector = None
+    i = 0
+    while i < len(inputs):
+        if inputs[i] == STDIN:
+            yield i, _stdin_result(i, ExtractionPipeline(settings), encoding, log), True
+            i += 1
+            continue
+        j = i
+        while j < len(inputs) and inputs[j] != STDIN:
+            j += 1
+        paths = inputs[i:j]
+        if encoding is None:
+            if detector is None:
+                from .encoding import EncodingDetector
+                detector = EncodingDetector()
+            detections = [detector.detect(path) for path in paths]
+            detector.save()
+            for path, d in zip(paths, detections):
+                log(f" ℹ {path}: кодировка {d.encoding} ({d.tier}, {d.elapsed * 1000:.1f} мс)")
+            encodings = [d.encoding for d in detections]
+            detect_time = sum(d.elapsed for d in detections)
+        else:
+            encodings = [encoding] * len(paths)
+            detect_time = 0.0
+        units = plan_units(paths, encodings, workers)
+        last_unit = {u.file_index: u.index for u in units}
+        for result in run_units(units, settings, workers):
+            # Время определения кодировок - в первый результат группы
+            result['encoding_time'] = detect_time
+            detect_time = 0.0
+            yield i + result['file_index'], result, last_unit[result['file_index']] == result['index']
+        i = j
+
+
+def extract(inputs, settings, encoding=None, log=None):
+    """Итератор итоговых доменов и словарь статистики в формате GUI (см. collect.collect)"""
+    from .collect import collect
+    names = ['stdin' if path == STDIN else path for path in inputs]
+    return collect(iter_results(inputs, settings, encoding, log), names, settings, log)
+
+
+def follow(inputs, output, settings, interval, log):
+    """Режим слежения до прерывания (Ctrl+C)"""
+    from .follow import Follower
+    follower = Follower(inputs, output, settings)
+    if follower.reset:
+        log(" ℹ Настройки изменились: позиции и множество выданных доменов сброшены")
+    log(f"📡 Слежение: файлов {len(inputs)}, уже выдано доменов {len(follower.seen)}")
+
+    def on_poll(result):
+        for path, event in result['events']:
+            log(f" ↻ {path}: {event}")
+        if result['new']:
+            log(f" ✓ +{result['new']} новых доменов (всего {follower.total_new})")
+
+    try:
+        follower.run(interval=interval, on_poll=on_poll)
+    except KeyboardInterrupt:
+        log(f"⏹ Слежение остановлено: новых доменов {follower.total_new}")
+    return EXIT_OK
+
+
+def _write_stdout(domains, settings, stats):
+    from .exporters import EXPORTERS, TxtExporter
+    out = sys.stdout
+    out.reconfigure(encoding='utf-8')
+    count = EXPORTERS.get(settings.export_format, TxtExporter)(out, settings).write(domains, stats)
+    # Текстовые фильтры завершают вывод переводом строки
+    if count and settings.export_format != 'csv':
+        out.write('\n')
+    out.flush()
+    return count
+
+
+def _run(inputs, args, settings, log):
+    """Извлечение и запись результата: (число записей, статистика)"""
+    domains, stats = extract(inputs, settings, args.encoding, log)
+    if args.output == STDOUT:
+        return _write_stdout(domains, settings, stats), stats
+    from .exporters import export
+    return export(domains, args.output, settings, stats), stats
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    inputs = args.inputs or [STDIN]
+    if inputs.count(STDIN) > 1:
+        parser.error("stdin ('-') можно указать только один раз")
+    if args.follow and STDIN in inputs:
+        parser.error("в режиме слежения нужны входные файлы, а не stdin")
+
+    def log(message, tag=None):
+        if not args.quiet:
+            print(message, file=sys.stderr)
+
+    try:
+        settings = load_settings(args)
+        if args.follow:
+            return follow(inputs, args.output, settings, args.interval, log)
+        if settings.profile:
+            from .instrument import profile_path, profiled
+            path = profile_path(args.output)
+            with profiled(path):
+                count, stats = _run(inputs, args, settings, log)
+            log(f" 🔬 Профиль: {path} (сводка в {path}.txt; процессы-воркеры не профилируются)")
+        else:
+            count, stats = _run(inputs, args, settings, log)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except BrokenPipeError:
+        # Читатель закрыл канал (например, head): не ругаемся при закрытии stdout
+        import os
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_BROKEN_PIPE
+    except (OSError, ValueError, RuntimeError, LookupError, re.error) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return EXIT_ERROR
+    except Exception as e:
+        # Любая другая ошибка - тоже код 3, а не трассировка с кодом 1 («не найдено»)
+        print(f"❌ {type(e).__name__}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    log(f"✅ Готово: {count} доменов за {stats['processing_time']:.2f} с")
+    if args.stats:
+        print(json.dumps(stats, ensure_ascii=False, indent=2, default=str), file=sys.stderr)
+    return EXIT_OK if count else EXIT_NO_DOMAINS
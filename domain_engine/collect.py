@@ -0,0 +1,153 @@
+"""Сборка итогового результата из результатов run_units: общая для GUI и CLI
+
+Блоки доменов идут в экспорт потоком (без сортировки и точной дедупликации)
+или через ExternalSorter; попутно сливаются статистика, частые домены,
+HLL-оценки и счётчики кэша результатов.
+"""
+import time
+from collections import Counter
+
+from .instrument import FILTER_REJECTS, StageStats
+from .parallel import merge_file_stats, merge_worker_stats
+
+
+def collect(results, names, settings, log=None):
+    """Итератор итоговых доменов и словарь статистики в формате GUI
+
+    results - тройки (номер входа, результат run_units, вход обработан
+    полностью); names - имена входов для сообщений и stats['files'].
+    log(сообщение, тег) получает сообщения о ходе работы. Время
+    result['encoding_time'] (если есть) идёт в стадию encoding.
+
+    Статистика окончательна после исчерпания итератора. Время, которое
+    потребитель итератора тратит на домены, идёт в стадию export. Незакрытый
+    итератор держит временные файлы сортировщика: его нужно исчерпать или закрыть.
+    """
+    from .sketches import BloomFilter, CardinalityStats, HeavyHitterStats
+    log = log or (lambda message, tag=None: None)
+    start_time = time.time()
+    approximate = settings.remove_duplicates and settings.dedup_mode == "approximate"
+    # Без сортировки и точной дедупликации сортировщик не нужен: домены идут в экспорт прямо из блоков
+    streaming = not settings.sort_results and (approximate or not settings.remove_duplicates)
+    bloom = cardinality = hitters = None
+    if approximate:
+        # В приближённом режиме дубликаты отсекает фильтр Блума, а не сортировщик
+        bloom = BloomFilter(settings.approx_capacity, settings.approx_fp_rate)
+        cardinality = CardinalityStats()
+        log(f" ⚙ Приближённая дедупликация: фильтр Блума {bloom.memory / 1048576:.1f} МБ, "
+            f"{bloom.hashes} хешей", "info")
+    if settings.heavy_hitters:
+        hitters = HeavyHitterStats(settings.heavy_hitters_k, settings.heavy_hitters_mb)
+        log(f" ⚙ Частые домены: топ-{settings.heavy_hitters_k}, "
+            f"Count-Min Sketch до {settings.heavy_hitters_mb} МБ на процесс", "info")
+    stats = {
+        'files_processed': 0,
+        'raw_domains': 0,
+        'valid_domains': 0,
+        'filtered_out': 0,
+        'duplicates_removed': 0,
+        'final_count': 0,
+        'tld_distribution': Counter(),
+        'workers': {},
+        'files': {},
+        'result_cache': {'hits': 0, 'misses': 0},
+        'processing_time': 0
+    }
+    stages = StageStats()
+
+    def batches():
+        # Блоки доменов по мере чтения: ни единица работы, ни файл целиком не копятся
+        file_raw = Counter()
+        file_cached = Counter()
+        total_bytes = candidates = 0
+        for idx, result, finished in results:
+            for block in result['blocks']:
+                stats['valid_domains'] += len(block)
+                if bloom is not None:
+                    with stages.timer('dedup'):
+                        new = [d for d in block if bloom.add(d)]
+                    stats['duplicates_removed'] += len(block) - len(new)
+                    block = new
+                yield block
+            file_raw[idx] += result['raw_count']
+            stages.merge(result['stages'])
+            if 'encoding_time' in result:
+                stages.add('encoding', result['encoding_time'])
+            total_bytes += result['bytes']
+            candidates += result['candidates']
+            stats['tld_distribution'].update(result['tld_distribution'])
+            if cardinality is not None:
+                cardinality.merge(result['cardinality'])
+            if hitters is not None:
+                with stages.timer('stats'):
+                    hitters.merge(result['heavy_hitters'])
+            merge_worker_stats(stats['workers'], result)
+            merge_file_stats(stats['files'], names[idx], result)
+            if result['cache'] is not None:
+                stats['result_cache']['hits' if result['cache'] == 'hit' else 'misses'] += 1
+                file_cached[idx] += result['cache'] == 'hit'
+            if finished:
+                stats['raw_domains'] += file_raw[idx]
+                stats['files_processed'] += 1
+                log(f" ✓ {names[idx]}: извлечено доменов {file_raw[idx]}", "success")
+                if file_cached[idx]:
+                    log(" ♻ Кандидаты взяты из кэша результатов", "info")
+        elapsed = time.time() - start_time
+        stats['filtered_out'] = sum(stages.rejects.get(reason, 0) for reason in FILTER_REJECTS)
+        stats['throughput'] = {
+            'avg_rate': total_bytes / elapsed if elapsed > 0 else 0.0,
+            'peak_rate': max((f['peak_rate'] for f in stats['files'].values()), default=0.0),
+            'candidates_per_sec': candidates / elapsed if elapsed > 0 else 0.0,
+        }
+        if cardinality is not None:
+            stats['approx'] = cardinality.to_stats()
+        if hitters is not None:
+            stats['heavy_hitters'] = hitters.to_stats()
+
+    def finalize(count):
+        # Точные счётчики известны после выдачи последнего домена
+        stats['final_count'] = count
+        if approximate:
+            log(f"🗑 Удалено вероятных дубликатов: {stats['duplicates_removed']}", "info")
+        elif settings.remove_duplicates:
+            stats['duplicates_removed'] = stats['valid_domains'] - count
+            log(f"🗑 Удалено дубликатов: {stats['duplicates_removed']}", "info")
+        if settings.sort_results:
+            log("📊 Результаты отсортированы", "info")
+        stats['processing_time'] = time.time() - start_time
+        stats['stages'] = stages.to_dict()
+
+    if streaming:
+        def domains():
+            count = 0
+            for batch in batches():
+                count += len(batch)
+                with stages.timer('export'):
+                    yield from batch
+            finalize(count)
+        return domains(), stats
+
+    def merged():
+        from .extsort import ExternalSorter
+        sorter = ExternalSorter(sort=settings.sort_results, dedup=settings.remove_duplicates and not approximate,
+                                memory_budget_mb=settings.memory_budget_mb)
+        try:
+            for batch in batches():
+                with stages.timer('dedup'):
+                    sorter.extend(batch)
+            with stages.timer('dedup'):
+                domains = sorter.finish()
+            if not isinstance(domains, list):
+                if sorter.spilled:
+                    log("💽 Превышен бюджет памяти: слияние сжатых серий с диска", "info")
+                else:
+                    log(f"🗜 Компактное хранение: {sorter.compact_bytes / 1048576:.1f} МБ сжатых доменов в памяти",
+                        "info")
+                # Слияние серий с диска идёт по мере выдачи доменов
+                domains = stages.timed('dedup', domains, batch=4096)
+            with stages.timer('export', exclude=('dedup',)):
+                yield from domains
+            finalize(sorter.count_out)
+        finally:
+            sorter.close()
+    return merged(), stats
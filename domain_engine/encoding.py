@@ -0,0 +1,179 @@
+"""Многоуровневое определение кодировки с кэшем по отпечатку файла
+
+Уровни по возрастанию стоимости: BOM, строгая проверка UTF-8 (и чистого
+ASCII), статистический детектор. Детекторы импортируются лениво, первым
+берётся самый быстрый из установленных.
+"""
+import codecs
+import importlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from hashlib import blake2b
+
+from .reader import SourceFile
+
+# Объём данных для определения кодировки
+SAMPLE_SIZE = 100000
+
+# Сколько байтов начала файла входит в отпечаток
+HEAD_SIZE = 4096
+
+# Максимум записей в кэше кодировок
+CACHE_ENTRIES = 20000
+
+# Статистические детекторы с chardet-совместимым detect(), от быстрых к медленным
+DETECTORS = ("cchardet", "charset_normalizer", "chardet")
+
+# Порядок важен: BOM UTF-32-LE начинается с BOM UTF-16-LE
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Результат: кодировка, решивший уровень и время определения (с)
+Detection = namedtuple('Detection', 'encoding tier elapsed')
+
+_detector = None
+
+
+def _statistical_detector():
+    """Первый установленный детектор: (имя, модуль) или (None, None)"""
+    global _detector
+    if _detector is None:
+        _detector = (None, None)
+        for name in DETECTORS:
+            try:
+                _detector = (name, importlib.import_module(name))
+                break
+            except ImportError:
+                continue
+    return _detector
+
+
+def detect_bytes(raw, complete=True):
+    """Кодировка образца данных: (кодировка, уровень)
+
+    complete=False означает, что образец обрезан и может кончаться
+    посреди многобайтового символа.
+    """
+    for bom, encoding in _BOMS:
+        if raw.startswith(bom):
+            return encoding, 'bom'
+    if raw.isascii():
+        # За образцом может начаться не-ASCII: UTF-8 читает ASCII так же
+        return 'utf-8', 'ascii'
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(raw, final=complete)
+        return 'utf-8', 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    name, module = _statistical_detector()
+    if module is not None:
+        encoding = module.detect(raw).get('encoding')
+        if encoding:
+            return encoding, name
+    return 'utf-8', 'fallback'
+
+
+class EncodingCache:
+    """Кэш кодировок на диске: путь -> (размер, mtime, хеш начала, кодировка)
+
+    Один кэш делят задачи из разных потоков GUI: обращения к записям идут под замком.
+    """
+
+    def __init__(self, path=None, max_entries=CACHE_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = None
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        try:
+            if self.path is None:
+                from .cache import cache_dir
+                self.path = cache_dir() / 'encodings.json'
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.entries = data
+        except (OSError, ValueError):
+            pass
+
+    def get(self, key, fingerprint):
+        with self._lock:
+            self._load()
+            entry = self.entries.get(key)
+        if entry and entry[:3] == list(fingerprint):
+            return entry[3]
+        return None
+
+    def put(self, key, fingerprint, encoding):
+        with self._lock:
+            self._load()
+            # Свежие записи - в конец, вытесняются самые старые
+            self.entries.pop(key, None)
+            self.entries[key] = [*fingerprint, encoding]
+            while len(self.entries) > self.max_entries:
+                del self.entries[next(iter(self.entries))]
+            self.dirty = True
+
+    def save(self):
+        """Атомарная запись кэша, если он менялся"""
+        with self._lock:
+            if not self.dirty or self.path is None:
+                return
+            try:
+                tmp = self.path.with_suffix('.tmp')
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(self.entries, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+                self.dirty = False
+            except OSError:
+                pass
+
+
+class EncodingDetector:
+    """Определение кодировки файлов с кэшем по (путь, размер, mtime, хеш начала)"""
+
+    def __init__(self, sample_size=SAMPLE_SIZE, cache=None, use_cache=True):
+        self.sample_size = sample_size
+        self.cache = (cache or EncodingCache()) if use_cache else None
+
+    @staticmethod
+    def fingerprint(path):
+        st = os.stat(path)
+        with open(path, 'rb') as f:
+            head = blake2b(f.read(HEAD_SIZE), digest_size=8).hexdigest()
+        return [st.st_size, st.st_mtime_ns, head]
+
+    def detect(self, path):
+        """Кодировка файла (по распакованным данным) с решившим уровнем"""
+        t0 = time.perf_counter()
+        key = fingerprint = None
+        if self.cache is not None:
+            key = os.path.abspath(path)
+            fingerprint = self.fingerprint(path)
+            encoding = self.cache.get(key, fingerprint)
+            # 'ascii' в кэше - от старых версий, для него нужна повторная проверка
+            if encoding and encoding != 'ascii':
+                return Detection(encoding, 'cache', time.perf_counter() - t0)
+        with SourceFile(path) as f:
+            raw = f.read(self.sample_size + 1)
+        encoding, tier = detect_bytes(raw[:self.sample_size], len(raw) <= self.sample_size)
+        if self.cache is not None:
+            self.cache.put(key, fingerprint, encoding)
+        return Detection(encoding, tier, time.perf_counter() - t0)
+
+    def save(self):
+        if self.cache is not None:
+            self.cache.save()
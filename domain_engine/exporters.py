@@ -0,0 +1,156 @@
+"""Потоковые экспортёры результатов: txt, csv, json, xml"""
+import csv
+import json
+import os
+from datetime import datetime
+from itertools import islice
+
+# Буфер файла вывода
+BUFFER_SIZE = 1024 * 1024
+
+# Сколько доменов склеивается за одну запись
+_BATCH = 8192
+
+
+def decode_separator(sep):
+    """Разделитель из поля ввода: \\n, \\t, \\r в управляющие символы"""
+    return sep.replace('\\n', '\n').replace('\\t', '\t').replace('\\r', '\r')
+
+
+def _batches(domains):
+    it = iter(domains)
+    while True:
+        batch = list(islice(it, _BATCH))
+        if not batch:
+            return
+        yield batch
+
+
+class Exporter:
+    """Базовый экспортёр: принимает итератор доменов, пишет в текстовый поток"""
+
+    extension = ".txt"
+
+    def __init__(self, f, settings=None):
+        self.f = f
+        self.settings = settings
+        self.count = 0
+
+    def write(self, domains, stats=None):
+        """Запись всех доменов; stats читается только после исчерпания итератора"""
+        self.begin()
+        for batch in _batches(domains):
+            self.write_batch(batch)
+            self.count += len(batch)
+        self.end(stats or {})
+        return self.count
+
+    def begin(self):
+        pass
+
+    def write_batch(self, batch):
+        raise NotImplementedError
+
+    def end(self, stats):
+        pass
+
+
+class TxtExporter(Exporter):
+    extension = ".txt"
+
+    def begin(self):
+        self.sep = decode_separator(self.settings.separator if self.settings else "\\n")
+
+    def write_batch(self, batch):
+        if self.count:
+            self.f.write(self.sep)
+        self.f.write(self.sep.join(batch))
+
+
+class CsvExporter(Exporter):
+    extension = ".csv"
+
+    def begin(self):
+        self.writer = csv.writer(self.f, lineterminator='\n')
+        self.writer.writerow(['domain'])
+
+    def write_batch(self, batch):
+        self.writer.writerows([d] for d in batch)
+
+
+class JsonExporter(Exporter):
+    """JSON пишется потоково: элементы массива, затем счётчик и статистика"""
+
+    extension = ".json"
+
+    def begin(self):
+        self.f.write('{\n  "domains": [')
+
+    def write_batch(self, batch):
+        dumps = json.dumps
+        prefix = ',\n    ' if self.count else '\n    '
+        self.f.write(prefix + ',\n    '.join(dumps(d, ensure_ascii=False) for d in batch))
+
+    def end(self, stats):
+        self.f.write('\n  ]' if self.count else ']')
+        statistics = {
+            'files_processed': stats.get('files_processed', 0),
+            'total_extracted': stats.get('raw_domains', 0),
+            'duplicates_removed': stats.get('duplicates_removed', 0),
+            'processing_time': f"{stats.get('processing_time', 0):.2f}s"
+        }
+        body = json.dumps(statistics, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+        self.f.write(f',\n  "count": {self.count},\n'
+                     f'  "timestamp": {json.dumps(datetime.now().isoformat())},\n'
+                     f'  "statistics": {body}\n}}')
+
+
+class XmlExporter(Exporter):
+    extension = ".xml"
+
+    def begin(self):
+        # xml.sax тянет за собой urllib: импорт только при экспорте в XML
+        from xml.sax.saxutils import escape
+        self.escape = escape
+        self.f.write('<?xml version="1.0" encoding="UTF-8"?>\n<domains>\n')
+
+    def write_batch(self, batch):
+        escape = self.escape
+        self.f.write(''.join(f' <domain>{escape(d)}</domain>\n' for d in batch))
+
+    def end(self, stats):
+        self.f.write('</domains>')
+
+
+EXPORTERS = {
+    "txt": TxtExporter,
+    "csv": CsvExporter,
+    "json": JsonExporter,
+    "xml": XmlExporter,
+}
+
+
+def open_output(path):
+    """Открытие файла вывода с крупным буфером"""
+    return open(path, 'w', encoding='utf-8', buffering=BUFFER_SIZE)
+
+
+def export(domains, path, settings, stats=None):
+    """Потоковый экспорт в формате settings.export_format, возвращает число доменов
+
+    Запись идёт во временный файл рядом с path и заменяет path только после
+    успешного завершения: при ошибке или отмене частичный файл удаляется.
+    """
+    exporter_cls = EXPORTERS.get(settings.export_format, TxtExporter)
+    tmp = f"{path}.part"
+    try:
+        with open_output(tmp) as f:
+            count = exporter_cls(f, settings).write(domains, stats)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return count
@@ -0,0 +1,236 @@
+"""Внешняя сортировка и дедупликация с ограничением памяти"""
+import heapq
+import os
+from array import array
+from bisect import bisect_left
+from itertools import compress, groupby, islice
+from operator import itemgetter
+
+from .arena import DomainArena
+
+# Бюджет памяти по умолчанию (МБ)
+MEMORY_BUDGET_MB = 512
+
+# Оценка накладных расходов на одну строку в буфере (объект str, кортеж, ссылки)
+_ITEM_OVERHEAD = 120
+
+# Доменов в буфере, после которых он сворачивается в компактную серию (arena.DomainArena)
+COMPACT_ITEMS = 1 << 20
+
+# Пачка при выдаче результата слияния
+_BATCH = 8192
+
+# Максимум одновременно сливаемых серий (ограничение на открытые файлы и распакованные блоки)
+_MAX_FANIN = 64
+
+# Число хеш-корзин для дедупликации без сортировки и размер их сжатых блоков
+_BUCKETS = 64
+_BUCKET_BLOCK = 2048
+
+# Корзина - равный диапазон значений hash() (64-битное целое со знаком)
+_HASH_MIN = -(1 << 63)
+_HASH_STEP = (1 << 64) // _BUCKETS
+
+
+class ExternalSorter:
+    """Накопление доменов с сортировкой и/или удалением дубликатов
+
+    Пока доменов меньше COMPACT_ITEMS и они помещаются в бюджет памяти,
+    работает как прежде (dict.fromkeys и list.sort). Дальше буфер
+    сворачивается в сжатые серии DomainArena, а при превышении бюджета
+    сжатыми серии сбрасываются во временные файлы:
+
+    - с сортировкой - отсортированные (и дедуплицированные) серии, которые
+      в конце сливаются k-путевым слиянием;
+    - с дедупликацией без сортировки - копия входа в порядке появления и
+      хеш-корзины пар (домен, номер первого вхождения); корзины по одной
+      дедуплицируются словарём, и из входа выбираются первые вхождения;
+    - без обоих - только копия входа.
+    """
+
+    def __init__(self, sort=False, dedup=True, memory_budget_mb=MEMORY_BUDGET_MB, tmpdir=None):
+        self.sort = sort
+        self.dedup = dedup
+        self.budget = max(1, memory_budget_mb) * 1024 * 1024
+        self.tmpdir = tmpdir
+        self.count_in = 0
+        self.count_out = 0
+        self.runs = []
+        # Домены в порядке появления (не нужны только при сортировке)
+        self._arrival = DomainArena() if not sort else None
+        self._files = 0
+        self._seq_base = 0
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._dir = None
+
+    def _arenas(self):
+        if self._arrival is not None and len(self._arrival):
+            return self.runs + [self._arrival]
+        return self.runs
+
+    @property
+    def spilled(self):
+        """Часть серий лежит во временных файлах"""
+        return any(run.on_disk for run in self._arenas())
+
+    @property
+    def compact_bytes(self):
+        """Сжатые байты серий в памяти"""
+        return sum(run.nbytes for run in self._arenas())
+
+    # === Накопление ===
+    def extend(self, items):
+        """Добавление пачки доменов в порядке появления (список, DomainArena или итератор)"""
+        # Учёт памяти по кускам: бюджет превышается не больше чем на кусок
+        it = iter(items)
+        while True:
+            piece = list(islice(it, _BATCH))
+            if not piece:
+                break
+            self._buffer.extend(piece)
+            self._buffer_bytes += sum(map(len, piece)) + _ITEM_OVERHEAD * len(piece)
+            if self._buffer_bytes >= self.budget or len(self._buffer) >= COMPACT_ITEMS:
+                self._seal()
+        self.count_in = self._seq_base + len(self._buffer)
+
+    def _new_path(self):
+        if self._dir is None:
+            # Временный каталог нужен только при сбросе серий на диск
+            import tempfile
+            self._dir = tempfile.mkdtemp(prefix='domain_extractor_', dir=self.tmpdir)
+        self._files += 1
+        return os.path.join(self._dir, f"run{self._files:05d}.bin")
+
+    def _check_budget(self):
+        """Сброс всех сжатых серий на диск, если в памяти они превысили бюджет"""
+        if self.compact_bytes >= self.budget:
+            for run in self._arenas():
+                if not run.on_disk:
+                    run.spill(self._new_path())
+
+    def _seal(self):
+        buffer = self._buffer
+        if self.sort:
+            run = DomainArena(ordered=True)
+            run.extend(sorted(set(buffer)) if self.dedup else sorted(buffer))
+            run.seal()
+            self.runs.append(run)
+        else:
+            self._arrival.extend(buffer)
+            if self.dedup:
+                self._partition(buffer, self._seq_base)
+        self._seq_base += len(buffer)
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._check_budget()
+
+    def _partition(self, items, base):
+        """Первые вхождения пачки - в хеш-корзины (домен, номер)"""
+        if not self.runs:
+            self.runs = [DomainArena(seqs=True, block_items=_BUCKET_BLOCK) for _ in range(_BUCKETS)]
+        # При обратном проходе в словаре остаётся самый ранний номер
+        first = dict(zip(reversed(items), range(base + len(items) - 1, base - 1, -1)))
+        # Сортировка по хешу раскладывает домены по корзинам-диапазонам без цикла на Python
+        domains = sorted(first, key=hash)
+        seqs = list(map(first.__getitem__, domains))
+        hashes = list(map(hash, domains))
+        start = 0
+        for i, run in enumerate(self.runs, 1):
+            end = bisect_left(hashes, _HASH_MIN + i * _HASH_STEP) if i < _BUCKETS else len(domains)
+            run.extend(domains[start:end], seqs[start:end])
+            start = end
+
+    # === Выдача результата ===
+    def finish(self):
+        """Итоговая последовательность: список (в памяти) или итератор слияния"""
+        self.count_in = self._seq_base + len(self._buffer)
+        if not self.runs and (self._arrival is None or not len(self._arrival)):
+            result = self._buffer
+            self._buffer = []
+            if self.dedup:
+                result = list(dict.fromkeys(result))
+            if self.sort:
+                result.sort()
+            self.count_out = len(result)
+            return result
+        if not self.sort and self._buffer:
+            self._seal()
+        return self._merge()
+
+    def _merge(self):
+        try:
+            if self.sort:
+                tail, self._buffer = self._buffer, []
+                tail = sorted(set(tail)) if self.dedup else sorted(tail)
+                runs = self._compact(list(self.runs))
+                items = heapq.merge(*runs, tail)
+                if self.dedup:
+                    items = map(itemgetter(0), groupby(items))
+            elif self.dedup:
+                items = compress(self._arrival, self._first_marks())
+            else:
+                items = iter(self._arrival)
+            # Счётчик ведётся пачками, а не на каждый домен
+            while True:
+                batch = list(islice(items, _BATCH))
+                if not batch:
+                    break
+                self.count_out += len(batch)
+                yield from batch
+        finally:
+            self.close()
+
+    def _first_marks(self):
+        """Отметки первых вхождений по номерам (bytearray длины count_in)"""
+        keep = bytearray(self.count_in)
+        for run in self.runs:
+            domains, seqs = [], array('Q')
+            for block_domains, block_seqs in run.iter_blocks():
+                domains.extend(block_domains)
+                seqs.extend(block_seqs)
+            # В корзине вхождения домена идут по возрастанию номеров
+            first = dict(zip(reversed(domains), reversed(seqs)))
+            for seq in first.values():
+                keep[seq] = 1
+            run.close()
+        return keep
+
+    def _compact(self, runs):
+        """Предварительное слияние групп серий, пока их больше _MAX_FANIN"""
+        while len(runs) > _MAX_FANIN:
+            merged_runs = []
+            for i in range(0, len(runs), _MAX_FANIN):
+                group = runs[i:i + _MAX_FANIN]
+                items = heapq.merge(*group)
+                if self.dedup:
+                    items = map(itemgetter(0), groupby(items))
+                run = DomainArena(ordered=True)
+                for item in items:
+                    run.append(item)
+                run.seal()
+                for r in group:
+                    self.runs.remove(r)
+                    r.close()
+                self.runs.append(run)
+                self._check_budget()
+                merged_runs.append(run)
+            runs = merged_runs
+        return runs
+
+    def close(self):
+        """Удаление серий и временных файлов"""
+        for run in self._arenas():
+            run.close()
+        self.runs = []
+        self._arrival = None
+        if self._dir is not None:
+            import shutil
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
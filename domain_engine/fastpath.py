@@ -0,0 +1,182 @@
+"""Быстрый путь: bytes-regex по mmap без декодирования всего файла
+
+Для кодировок, где каждый байт < 0x80 означает соответствующий ASCII-символ
+(UTF-8, EUC-*, однобайтовые cp1251/koi8-r/latin-1 и т.п.), регулярные
+выражения режимов standard/aggressive/url дают на байтах те же совпадения,
+что и на тексте. Расхождения возможны только рядом с не-ASCII байтами
+(\\b в юникодном режиме и четыре не-ASCII буквы, которые IGNORECASE сводит
+к [a-z]), поэтому такие места перепроверяются текстовым regex на
+декодированном окне между разделителями.
+"""
+import codecs
+import importlib
+import mmap
+import os
+import re
+
+from .pipeline import MODE_PATTERNS
+
+# Размер блока сканирования (байт)
+CHUNK_BYTES = 8 * 1024 * 1024
+
+# Режимы, регулярные выражения которых состоят только из ASCII-классов
+BYTE_MODES = ("standard", "aggressive", "url")
+
+
+def _expand_case(pattern):
+    """Регистронезависимость без IGNORECASE: буквы-литералы в [xX]"""
+    out = []
+    in_class = escaped = False
+    for ch in pattern:
+        if escaped:
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif in_class:
+            in_class = ch != ']'
+        elif ch == '[':
+            in_class = True
+        elif ch.isascii() and ch.isalpha():
+            ch = f"[{ch.lower()}{ch.upper()}]"
+        out.append(ch)
+    return ''.join(out)
+
+
+# Классы в шаблонах уже перечисляют оба регистра; без флага IGNORECASE
+# bytes-regex работает заметно быстрее
+BYTE_PATTERNS = {
+    mode: re.compile(_expand_case(MODE_PATTERNS[mode].pattern).encode('ascii'))
+    for mode in BYTE_MODES
+}
+
+# Многобайтовые кодировки, где байты < 0x80 не бывают частью других символов
+_TRANSPARENT_CODECS = {'utf-8', 'utf-8-sig', 'ascii', 'euc_jp', 'euc_kr', 'gb2312',
+                       'euc_jis_2004', 'euc_jisx0213'}
+
+# Символы, которые не входят ни в одно совпадение (включая префикс https://)
+# и не являются «словесными» - безопасные границы окон
+_MATCH_CHARS = set(b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.-:/@')
+_SEPARATOR = bytes(1 if (b < 0x80 and b not in _MATCH_CHARS) else 0 for b in range(256))
+
+# Не-ASCII буквы, совпадающие с [a-z] при IGNORECASE в юникодном regex
+_CASEFOLD_SPECIALS = 'İıſK'
+
+_NON_ASCII = re.compile(rb'[\x80-\xff]')
+
+
+def is_ascii_transparent(encoding):
+    """Кодировка, в которой байты < 0x80 всегда означают ASCII-символы"""
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return False
+    if name in _TRANSPARENT_CODECS:
+        return True
+    try:
+        module = importlib.import_module('encodings.' + name.replace('-', '_'))
+    except ImportError:
+        return False
+    table = getattr(module, 'decoding_table', None)
+    return isinstance(table, str) and table[:128] == ''.join(map(chr, range(128)))
+
+
+class ByteScanner:
+    """Извлечение кандидатов bytes-регуляркой прямо по отображению файла"""
+
+    def __init__(self, pipeline, encoding):
+        self.pipeline = pipeline
+        self.encoding = encoding
+        mode = pipeline.settings.extraction_mode
+        self.pattern = BYTE_PATTERNS[mode]
+        self.text_pattern = MODE_PATTERNS[mode]
+        self.groups = self.pattern.groups
+        strip = pipeline.settings.strip_chars
+        # Удаляемые символы вне _MATCH_CHARS не влияют на совпадения:
+        # тогда regex работает по mmap без копирования
+        neutral = all(ord(ch) < 0x80 and ord(ch) not in _MATCH_CHARS for ch in strip)
+        self.strip_table = None if neutral else bytes.maketrans(
+            strip.encode('ascii'), b' ' * len(strip))
+        self.position = 0  # конец последнего выданного блока (смещение в файле)
+        self.specials = []
+        bom = ''.encode(encoding)  # utf-8-sig добавляет BOM к любой строке
+        for ch in _CASEFOLD_SPECIALS:
+            try:
+                self.specials.append(ch.encode(encoding)[len(bom):])
+            except UnicodeError:
+                pass
+
+    @staticmethod
+    def supports(settings, encoding):
+        """Можно ли обработать задачу байтовым путём"""
+        return (settings.byte_scan and settings.idn == "off" and settings.extract_engine == "regex"
+                and settings.extraction_mode in BYTE_MODES
+                and all(ord(ch) < 0x80 for ch in settings.strip_chars)
+                and is_ascii_transparent(encoding))
+
+    def _decode(self, data):
+        return data.decode(self.encoding, errors='ignore')
+
+    def iter_candidates(self, path, start=0, end=None):
+        """Списки кандидатов по блокам, как pipeline.extract на тексте блоков"""
+        size = os.path.getsize(path)
+        end = size if end is None else end
+        if end <= start:
+            return
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = start
+            while pos < end:
+                stop = min(pos + CHUNK_BYTES, end)
+                if stop < end:
+                    nl = mm.rfind(b'\n', pos, stop)
+                    stop = nl + 1 if nl >= 0 else self._next_separator(mm, stop, end)
+                candidates = self._scan(mm, pos, stop)
+                self.position = stop
+                yield candidates
+                pos = stop
+
+    @staticmethod
+    def _next_separator(mm, pos, end):
+        # Строка без переводов длиннее блока: режем на ближайшем разделителе
+        sep = _SEPARATOR
+        while pos < end and not sep[mm[pos]]:
+            pos += 1
+        return min(pos + 1, end)
+
+    def _scan(self, mm, pos, stop):
+        if any(mm.find(s, pos, stop) >= 0 for s in self.specials):
+            # Редкие буквы с особым регистром - блок целиком текстовым путём
+            return self.pipeline.extract(self._decode(mm[pos:stop]))
+        if self.strip_table is None:
+            buf, lo, hi = mm, pos, stop
+        else:
+            buf, lo, hi = mm[pos:stop].translate(self.strip_table), 0, stop - pos
+        return self._scan_buffer(buf, lo, hi)
+
+    def _scan_buffer(self, buf, lo, hi):
+        if _NON_ASCII.search(buf, lo, hi) is None:
+            # Чистый ASCII: перепроверки не нужны, findall целиком в C
+            return [m.decode('ascii') for m in self.pattern.findall(buf, lo, hi)]
+        sep = _SEPARATOR
+        group = 1 if self.groups else 0
+        result = []
+        done = lo  # всё до этой позиции уже учтено
+        for m in self.pattern.finditer(buf, lo, hi):
+            s, e = m.span()
+            if s < done:
+                continue
+            if (s > lo and buf[s - 1] >= 0x80) or (e < hi and buf[e] >= 0x80):
+                # Перепроверка окна между разделителями текстовым regex
+                ws = s
+                while ws > lo and not sep[buf[ws - 1]]:
+                    ws -= 1
+                we = e
+                while we < hi and not sep[buf[we]]:
+                    we += 1
+                text = self._decode(buf[ws:we])
+                offset = len(self._decode(buf[ws:done])) if done > ws else 0
+                result.extend(self.text_pattern.findall(text, offset))
+                done = we
+                continue
+            result.append(m.group(group).decode('ascii'))
+            done = e
+        return result
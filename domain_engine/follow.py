@@ -0,0 +1,284 @@
+"""Слежение за растущими файлами: чтение только дописанных байтов
+
+Смещения по файлам и множество уже выданных доменов хранятся в кэше
+(по пути файла вывода), поэтому после перезапуска чтение продолжается с
+места остановки, а домены не повторяются. Ротация распознаётся по смене
+inode (остаток старого файла дочитывается, если он лежит рядом), усечение -
+по размеру и хешу начала файла.
+"""
+import json
+import os
+import sys
+import time
+from hashlib import blake2b
+
+from .cache import cache_dir
+from .pipeline import ExtractionPipeline
+from .reader import detect_compression
+
+# Пауза между проходами по файлам (с)
+POLL_INTERVAL = 2.0
+
+# Блок чтения дописанных данных
+READ_BLOCK = 4 * 1024 * 1024
+
+# Сколько байтов начала файла сверяется для распознавания перезаписи
+HEAD_SIZE = 1024
+
+# Настройки, от которых зависят выданные строки: при их смене состояние сбрасывается
+OUTPUT_FIELDS = ('extraction_mode', 'strip_chars', 'min_length', 'max_length', 'validate_dns', 'idn',
+                 'selected_tlds', 'blacklist', 'whitelist', 'blacklist_files', 'whitelist_files',
+                 'remove_www', 'case_mode', 'domain_format', 'use_advanced_mask', 'advanced_mask',
+                 'prefix', 'suffix')
+
+# События файла в результате прохода
+ROTATED = "rotated"
+TRUNCATED = "truncated"
+MISSING = "missing"
+COMPRESSED = "compressed"
+
+
+def _digest(data):
+    return blake2b(data, digest_size=8).hexdigest()
+
+
+def settings_digest(settings):
+    """Хеш настроек, влияющих на выдаваемые домены"""
+    values = [getattr(settings, name) for name in OUTPUT_FIELDS]
+    values = [sorted(v) if isinstance(v, frozenset) else v for v in values]
+    return _digest(json.dumps(values).encode('utf-8'))
+
+
+def state_key(output, paths):
+    """Имя состояния: по файлу вывода, для stdout - по набору входов"""
+    if output == '-':
+        return 'stdout-' + _digest('\n'.join(sorted(paths)).encode('utf-8'))
+    return _digest(os.path.abspath(output).encode('utf-8'))
+
+
+class SeenSet:
+    """Уже выданные домены: set в памяти и дописываемый файл на диске"""
+
+    def __init__(self, path):
+        self.path = path
+        self.items = set()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.items.update(line.rstrip('\n') for line in f)
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, domain):
+        return domain in self.items
+
+    def add_new(self, domains):
+        """Домены, которых ещё не было (в порядке появления), с добавлением в множество"""
+        items = self.items
+        new = []
+        for domain in domains:
+            if domain not in items:
+                items.add(domain)
+                new.append(domain)
+        return new
+
+    def commit(self, domains):
+        """Дозапись новых доменов на диск"""
+        if domains:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(d + '\n' for d in domains))
+
+    def clear(self):
+        self.items.clear()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class Follower:
+    """Слежение за входными файлами с дозаписью новых доменов в output ('-' - stdout)
+
+    Вывод - по домену на строку: дописывать можно только построчный формат.
+    """
+
+    def __init__(self, paths, output, settings, directory=None, detector=None):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.output = output
+        self.settings = settings
+        self.pipeline = ExtractionPipeline(settings)
+        self.detector = detector
+        if directory is None:
+            directory = cache_dir() / 'follow'
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, state_key(output, self.paths))
+        self.state_path = base + '.json'
+        self.seen = SeenSet(base + '.seen')
+        self.digest = settings_digest(settings)
+        self.files = {}
+        self.reset = False
+        self.total_bytes = 0
+        self.total_new = 0
+        self._reported = {}
+        self._load()
+
+    # === Состояние на диске ===
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get('settings') != self.digest:
+            # Смещения и множество относятся к другим настройкам
+            self.reset = True
+            self.seen.clear()
+            self.save()
+            return
+        self.files = state.get('files', {})
+
+    def save(self):
+        try:
+            tmp = self.state_path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'settings': self.digest, 'files': self.files}, f, ensure_ascii=False)
+            os.replace(tmp, self.state_path)
+        except OSError:
+            pass
+
+    # === Проход по файлам ===
+    def poll(self, control=None):
+        """Один проход: дочитывание всех файлов
+
+        Возвращает {'bytes', 'new', 'events'}, где events - список пар
+        (путь, событие) для ротаций, усечений и пропавших файлов.
+        """
+        result = {'bytes': 0, 'new': 0, 'events': []}
+        try:
+            for path in self.paths:
+                self._poll_file(path, result, control)
+        finally:
+            self.save()
+        self.total_bytes += result['bytes']
+        self.total_new += result['new']
+        return result
+
+    def _event(self, result, path, event):
+        # О пропавшем или сжатом файле сообщаем один раз, а не на каждом проходе
+        if event in (MISSING, COMPRESSED):
+            if self._reported.get(path) == event:
+                return
+            self._reported[path] = event
+        result['events'].append((path, event))
+
+    def _poll_file(self, path, result, control):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._event(result, path, MISSING)
+            return
+        if self._reported.get(path) == MISSING:
+            del self._reported[path]
+        entry = self.files.get(path)
+        if entry is not None:
+            if (st.st_dev, st.st_ino) != (entry['dev'], entry['ino']):
+                # Ротация: старый файл переименован - дочитываем его хвост
+                rotated = self._find_rotated(path, entry)
+                if rotated is not None:
+                    self._read(rotated, entry, os.path.getsize(rotated), result, control)
+                self._event(result, path, ROTATED)
+                entry = None
+            elif st.st_size < entry['offset'] or self._head(path, entry['head_len']) != entry['head']:
+                self._event(result, path, TRUNCATED)
+                entry = None
+        if entry is None:
+            if detect_compression(path):
+                self._event(result, path, COMPRESSED)
+                return
+            entry = {'dev': st.st_dev, 'ino': st.st_ino, 'offset': 0, 'head': _digest(b''), 'head_len': 0,
+                     'encoding': self._encoding(path)}
+            self.files[path] = entry
+        self._read(path, entry, st.st_size, result, control)
+
+    def _encoding(self, path):
+        if self.detector is None:
+            from .encoding import EncodingDetector
+            self.detector = EncodingDetector()
+        encoding = self.detector.detect(path).encoding
+        self.detector.save()
+        return encoding
+
+    @staticmethod
+    def _head(path, length):
+        with open(path, 'rb') as f:
+            return _digest(f.read(length))
+
+    @staticmethod
+    def _find_rotated(path, entry):
+        """Старый файл с тем же inode рядом с path (access.log.1 и т. п.) или None"""
+        directory, name = os.path.split(path)
+        try:
+            with os.scandir(directory) as it:
+                for item in it:
+                    if item.name != name and item.name.startswith(name) and item.is_file():
+                        st = item.stat()
+                        if (st.st_dev, st.st_ino) == (entry['dev'], entry['ino']):
+                            return item.path
+        except OSError:
+            pass
+        return None
+
+    def _read(self, path, entry, size, result, control):
+        """Чтение [offset, size) блоками, обрезанными по последнему переводу строки"""
+        encoding = entry['encoding']
+        newline = '\n'.encode(encoding).removeprefix(''.encode(encoding))
+        with open(path, 'rb') as f:
+            while entry['offset'] < size:
+                if control is not None:
+                    control.checkpoint()
+                f.seek(entry['offset'])
+                block = f.read(min(READ_BLOCK, size - entry['offset']))
+                if not block:
+                    break
+                cut = block.rfind(newline)
+                if cut >= 0:
+                    block = block[:cut + len(newline)]
+                elif len(block) < READ_BLOCK:
+                    # Недописанная строка: ждём перевода строки
+                    break
+                domains = self.pipeline.format_all(self.pipeline.run(block.decode(encoding, errors='ignore')))
+                new = self.seen.add_new(domains)
+                self._emit(new)
+                self.seen.commit(new)
+                if entry['head_len'] < HEAD_SIZE:
+                    f.seek(0)
+                    head = f.read(min(HEAD_SIZE, entry['offset'] + len(block)))
+                    entry['head'], entry['head_len'] = _digest(head), len(head)
+                entry['offset'] += len(block)
+                result['bytes'] += len(block)
+                result['new'] += len(new)
+
+    def _emit(self, domains):
+        if not domains:
+            return
+        text = ''.join(d + '\n' for d in domains)
+        if self.output == '-':
+            sys.stdout.write(text)
+            sys.stdout.flush()
+            return
+        with open(self.output, 'a', encoding='utf-8') as f:
+            f.write(text)
+
+    def run(self, control=None, interval=POLL_INTERVAL, on_poll=None):
+        """Проходы по файлам до отмены (control) или прерывания"""
+        while True:
+            result = self.poll(control)
+            if on_poll is not None:
+                on_poll(result)
+            if control is None:
+                time.sleep(interval)
+            else:
+                control.cancelled.wait(interval)
+                control.checkpoint()
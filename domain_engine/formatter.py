@@ -0,0 +1,157 @@
+"""Форматирование доменов, скомпилированное по снимку настроек один раз на задачу
+
+Маска разбирается на литералы и переменные заранее; вычисляются только те
+переменные, которые в ней встречаются. Пакетный вызов format_all проходит
+список целиком и форматирует каждый уникальный домен пачки один раз.
+"""
+import re
+
+# Переменные продвинутой маски
+MASK_FIELDS = ('domain', 'name', 'tld', 'sld', 'subdomain', 'full')
+
+# Переменные, для которых нужен публичный суффикс
+_ZONE_FIELDS = {'name', 'tld', 'sld', 'subdomain'}
+
+_PLACEHOLDER = re.compile(r'\{(' + '|'.join(MASK_FIELDS) + r')\}')
+
+
+def parse_mask(mask):
+    """Разбор маски на сегменты: ('text', литерал) и ('field', имя переменной)
+
+    Незнакомые {слова} остаются литералами, как при посегментной замене.
+    """
+    segments = []
+    pos = 0
+    for m in _PLACEHOLDER.finditer(mask):
+        if m.start() > pos:
+            segments.append(('text', mask[pos:m.start()]))
+        segments.append(('field', m.group(1)))
+        pos = m.end()
+    if pos < len(mask):
+        segments.append(('text', mask[pos:]))
+    return segments
+
+
+def _mask_template(segments):
+    """Строка для str.format с позиционными полями и список переменных по порядку"""
+    template = []
+    names = []
+    for kind, value in segments:
+        if kind == 'text':
+            template.append(value.replace('{', '{{').replace('}', '}}'))
+        else:
+            template.append(f'{{{len(names)}}}')
+            names.append(value)
+    return ''.join(template), names
+
+
+class Formatter:
+    """Форматирование доменов по снимку ExtractionSettings
+
+    suffixes (SuffixTrie) нужен форматам no_tld/only_tld/sld и маскам
+    с переменными зоны.
+    """
+
+    def __init__(self, settings, suffixes=None):
+        s = settings
+        self.strip_www = s.remove_www
+        self.case = {'lower': str.lower, 'upper': str.upper}.get(s.case_mode)
+        self.prefix, self.suffix = s.prefix, s.suffix
+        self.domain_format = s.domain_format
+        if s.use_advanced_mask:
+            self.segments = parse_mask(s.advanced_mask)
+            self.template, self.fields = _mask_template(self.segments)
+        else:
+            self.segments = self.template = self.fields = None
+        needs_zone = (self.domain_format != "full"
+                      or (self.fields is not None and _ZONE_FIELDS.intersection(self.fields)))
+        self.suffixes = suffixes if needs_zone else None
+        # Без маски и зоны формат сводится к проходам по списку
+        self.simple = self.fields is None and self.domain_format == "full"
+        if not self.simple:
+            self._one = self._compile()
+
+    # === Пакетный и одиночный вызов ===
+    def format_all(self, domains):
+        """Список отформатированных доменов"""
+        if self.simple:
+            return self._passes(domains)
+        one = self._one
+        memo = {d: one(d) for d in set(domains)}
+        return list(map(memo.__getitem__, domains))
+
+    def format(self, domain):
+        """Форматирование одного домена"""
+        if self.simple:
+            return self._passes([domain])[0]
+        return self._one(domain)
+
+    # === Полный домен: www, регистр, префикс и суффикс ===
+    def _passes(self, domains):
+        if self.strip_www:
+            domains = [d[4:] if d.startswith('www.') else d for d in domains]
+        if self.case is not None:
+            domains = list(map(self.case, domains))
+        prefix, suffix = self.prefix, self.suffix
+        if prefix and suffix:
+            return [prefix + d + suffix for d in domains]
+        if prefix:
+            return [prefix + d for d in domains]
+        if suffix:
+            return [d + suffix for d in domains]
+        return list(domains)
+
+    # === Форматы зоны и маска ===
+    def _compile(self):
+        """Функция одного домена для форматов, зависящих от меток и зоны"""
+        strip_www, case = self.strip_www, self.case
+        fmt = self.domain_format
+        prefix, suffix = self.prefix, self.suffix
+        template, fields = self.template, self.fields
+        render = template.format if template is not None else None
+        suffixes = self.suffixes
+        if suffixes is not None:
+            suffix_length, depth = suffixes.suffix_length, suffixes.depth
+
+        def one(original):
+            domain = original
+            if strip_www and domain.startswith('www.'):
+                domain = domain[4:]
+            if case is not None:
+                domain = case(domain)
+            parts = domain.split('.')
+            count = len(parts)
+            # Число меток публичного суффикса (co.uk - 2); если домен сам является
+            # суффиксом, зоной считается последняя метка
+            n = 1
+            if suffixes is not None and count > 1:
+                n = suffix_length('.'.join(parts[-depth:]).lower())
+                if n >= count:
+                    n = 1
+            if count > 1:
+                if fmt == "no_tld":
+                    domain = '.'.join(parts[:-n])
+                elif fmt == "only_tld":
+                    domain = '.' + '.'.join(parts[-n:])
+                elif fmt == "sld":
+                    # Имя регистрируемого домена (example из shop.example.co.uk)
+                    domain = parts[-n - 1]
+            if render is None:
+                return prefix + domain + suffix
+            values = []
+            for field in fields:
+                if field == 'domain':
+                    values.append(domain)
+                elif field == 'full':
+                    values.append(original)
+                elif field == 'name':
+                    values.append('.'.join(parts[:-n]) if count > 1 else parts[0])
+                elif field == 'tld':
+                    values.append('.'.join(parts[-n:]) if count > 1 else '')
+                elif field == 'sld':
+                    values.append(parts[-n - 1] if count > 1 else '')
+                else:
+                    values.append('.'.join(parts[:-n - 1]) if count > n + 1 else '')
+            return render(*values)
+
+        return one
@@ -0,0 +1,172 @@
+"""История результатов для отмены: сжатые файлы на диске, в памяти только метаданные
+
+Запись - домены по одному на строку в UTF-8 внутри gzip.
+"""
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+from itertools import islice
+
+from .cache import cache_dir
+
+# Ограничения истории по умолчанию
+MAX_ENTRIES = 10
+MAX_HISTORY_MB = 512
+
+# Доменов в одной записываемой пачке
+_BATCH = 8192
+
+# Расширение файлов записей (старые записи в другом формате не читаются)
+_SUFFIX = '.txt.gz'
+
+
+class HistoryRecord:
+    """Запись, которая пишется на диск по мере потребления результатов"""
+
+    def __init__(self, store, path):
+        self.store = store
+        self.path = path
+        self.count = 0
+        self.stats = {}
+        self.saved = False
+        # Значение с переводом строки (префикс или маска) строкой не записать: такой результат не сохраняется
+        self.broken = False
+        self._f = gzip.open(path, 'wt', encoding='utf-8', newline='\n', compresslevel=1)
+
+    def tee(self, domains):
+        """Пропуск доменов дальше с попутной записью в историю"""
+        it = iter(domains)
+        while True:
+            batch = list(islice(it, _BATCH))
+            if not batch:
+                return
+            if not self.broken:
+                text = '\n'.join(batch) + '\n'
+                if text.count('\n') == len(batch):
+                    self._f.write(text)
+                    self.count += len(batch)
+                else:
+                    self.broken = True
+            yield from batch
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._f.close()
+        if exc_type is None and not self.broken:
+            self.store._commit(self)
+        else:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class HistoryStore:
+    """Последние результаты на диске с лимитом по числу записей и по байтам
+
+    Задачи GUI завершаются в разных потоках: список записей, файлы и индекс
+    меняются только под замком.
+    """
+
+    def __init__(self, directory=None, max_entries=MAX_ENTRIES, max_mb=MAX_HISTORY_MB):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_mb = max_mb
+        self.entries = None
+        self._lock = threading.Lock()
+
+    def _dir(self):
+        if self.directory is None:
+            self.directory = cache_dir() / 'history'
+        os.makedirs(self.directory, exist_ok=True)
+        return self.directory
+
+    def _index_path(self):
+        return os.path.join(self._dir(), 'index.json')
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = []
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for e in data:
+                path = os.path.join(self._dir(), e['file'])
+                if not e['file'].endswith(_SUFFIX):
+                    # Записи прежнего формата не читаются: файл удаляется вместе с записью
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                elif os.path.exists(path):
+                    self.entries.append(e)
+        except (OSError, ValueError, TypeError, KeyError):
+            pass
+
+    def _save(self):
+        try:
+            tmp = self._index_path() + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, default=str)
+            os.replace(tmp, self._index_path())
+        except OSError:
+            pass
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self.entries)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def last(self):
+        """Метаданные последней записи или None"""
+        with self._lock:
+            self._load()
+            return self.entries[-1] if self.entries else None
+
+    def record(self):
+        """Новая запись: with store.record() as rec: export(rec.tee(domains)); rec.stats = ..."""
+        with self._lock:
+            self._load()
+        timestamp = datetime.now()
+        name = f"{timestamp.strftime('%Y%m%d-%H%M%S-%f')}{_SUFFIX}"
+        return HistoryRecord(self, os.path.join(self._dir(), name))
+
+    def _commit(self, record):
+        with self._lock:
+            self._load()
+            self.entries.append({
+                'timestamp': datetime.now().isoformat(),
+                'file': os.path.basename(record.path),
+                'count': record.count,
+                'bytes': os.path.getsize(record.path),
+                'stats': dict(record.stats),
+            })
+            self._trim()
+            self._save()
+            # Запись больше лимита по байтам удаляется сразу
+            record.saved = bool(self.entries) and self.entries[-1]['file'] == os.path.basename(record.path)
+
+    def _trim(self):
+        """Удаление старых записей сверх лимитов"""
+        limit = max(0, self.max_mb) * 1024 * 1024
+        while self.entries and (len(self.entries) > self.max_entries
+                                or sum(e['bytes'] for e in self.entries) > limit):
+            entry = self.entries.pop(0)
+            try:
+                os.remove(os.path.join(self._dir(), entry['file']))
+            except OSError:
+                pass
+
+    def iter_domains(self, entry):
+        """Потоковое чтение доменов записи"""
+        with gzip.open(os.path.join(self._dir(), entry['file']), 'rt', encoding='utf-8', newline='\n') as f:
+            for line in f:
+                yield line[:-1]
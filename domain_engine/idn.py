@@ -0,0 +1,65 @@
+"""Интернационализированные домены (IDN): шаблоны и IDNA-преобразование с кэшем
+
+Преобразование идёт через встроенный кодек idna (IDNA 2003 с nameprep) и
+стоит десятки микросекунд на домен, поэтому результаты кэшируются по LRU,
+а ASCII-домены без меток xn-- возвращаются как есть без обращения к кэшу.
+"""
+import re
+from functools import lru_cache
+
+# Вывод IDN: off - только ASCII-шаблоны (как раньше), punycode - xn--, unicode - исходное письмо
+IDN_MODES = ('off', 'punycode', 'unicode')
+
+# Доменов в каждом LRU-кэше преобразований
+CACHE_SIZE = 65536
+
+# Метка: буквы и цифры любого алфавита, дефис внутри
+_L = r'[^\W_]'
+_LD = r'(?:[^\W_]|-)'
+# Зона: буквы любого алфавита или punycode (xn--p1ai); xn-- проверяется первым,
+# иначе совпадение обрывалось бы на «xn»
+_TLD = r'(?:xn--[a-zA-Z0-9\-]+|[^\W\d_]{2,})'
+
+# Юникодные варианты MODE_PATTERNS: те же конструкции с метками любого алфавита
+IDN_PATTERNS = {
+    "standard": re.compile(rf'\b(?:{_L}(?:{_LD}{{0,61}}{_L})?\.)+{_TLD}\b', re.IGNORECASE),
+    "aggressive": re.compile(rf'(?:{_LD}+\.)+{_TLD}(?:\.[^\W\d_]{{2,}})?', re.IGNORECASE),
+    "email": re.compile(rf'[\w\.-]+@([\w\.-]+\.{_TLD})', re.IGNORECASE),
+    "url": re.compile(rf'(?:https?://)?(?:www\.)?({_L}(?:{_LD}{{0,61}}{_L})?'
+                      rf'(?:\.{_L}(?:{_LD}{{0,61}}{_L})?)*\.{_TLD})', re.IGNORECASE),
+}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _to_ascii(domain):
+    try:
+        return domain.encode('idna').decode('ascii')
+    except UnicodeError:
+        return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _to_unicode(domain):
+    try:
+        return domain.encode('idna').decode('idna')
+    except UnicodeError:
+        return None
+
+
+def to_ascii(domain):
+    """Punycode-форма домена (пример.рф → xn--e1afmkfd.xn--p1ai) или None, если она невозможна"""
+    if domain.isascii():
+        return domain
+    return _to_ascii(domain)
+
+
+def to_unicode(domain):
+    """Юникодная форма домена (xn--e1afmkfd.xn--p1ai → пример.рф) или None для неверного punycode"""
+    if domain.isascii() and 'xn--' not in domain:
+        return domain
+    return _to_unicode(domain)
+
+
+def cache_info():
+    """Статистика LRU-кэшей: {'ascii': CacheInfo, 'unicode': CacheInfo}"""
+    return {'ascii': _to_ascii.cache_info(), 'unicode': _to_unicode.cache_info()}
@@ -0,0 +1,149 @@
+"""Время и счётчики по стадиям конвейера, необязательный профилировщик задачи
+
+Таймеры ставятся на блоки (мегабайты текста), а не на отдельные домены,
+поэтому накладные расходы незаметны и инструментирование включено всегда.
+"""
+import os
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+# Стадии в порядке конвейера
+STAGE_NAMES = {
+    'encoding': "Определение кодировки",
+    'read': "Чтение и декодирование",
+    'extract': "Регулярные выражения",
+    'validate': "Валидация",
+    'cache': "Кэш результатов",
+    'filter_tld': "Фильтр TLD",
+    'filter_blacklist': "Чёрный список",
+    'filter_whitelist': "Белый список",
+    'format': "Форматирование",
+    'stats': "Статистика зон и частот",
+    'dedup': "Дедупликация и сортировка",
+    'export': "Экспорт",
+}
+
+# Причины отсева кандидатов
+REJECT_NAMES = {
+    'length': "длина",
+    'no_dot': "нет точки",
+    'dns': "структура DNS",
+    'idn': "IDNA-преобразование",
+    'tld': "фильтр TLD",
+    'blacklist': "чёрный список",
+    'whitelist': "белый список",
+}
+
+# Причины, которые относятся к фильтрам (stats['filtered_out'])
+FILTER_REJECTS = ('tld', 'blacklist', 'whitelist')
+
+
+class StageStats:
+    """Секунды по стадиям, счётчики и отсев по причинам; объединяются между процессами"""
+
+    def __init__(self):
+        self.times = {}
+        self.counts = {}
+        self.rejects = {}
+
+    def add(self, stage, seconds):
+        self.times[stage] = self.times.get(stage, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def reject(self, reason, n):
+        if n:
+            self.rejects[reason] = self.rejects.get(reason, 0) + n
+
+    @contextmanager
+    def timer(self, stage, exclude=()):
+        """Время блока в stage за вычетом времени, набежавшего внутри в стадиях exclude"""
+        t0 = time.perf_counter()
+        nested = sum(self.times.get(s, 0.0) for s in exclude)
+        try:
+            yield
+        finally:
+            nested = sum(self.times.get(s, 0.0) for s in exclude) - nested
+            self.add(stage, time.perf_counter() - t0 - nested)
+
+    def timed(self, stage, iterable, batch=1):
+        """Итератор, время ожидания каждого элемента которого идёт в stage
+
+        При batch > 1 элементы забираются пачками: для потока отдельных
+        доменов таймер на каждый элемент стоил бы больше самой работы.
+        """
+        it = iter(iterable)
+        if batch > 1:
+            while True:
+                t0 = time.perf_counter()
+                items = list(islice(it, batch))
+                self.add(stage, time.perf_counter() - t0)
+                if not items:
+                    return
+                yield from items
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - t0)
+                return
+            self.add(stage, time.perf_counter() - t0)
+            yield item
+
+    def merge(self, other):
+        """Добавление другого StageStats или словаря из to_dict()"""
+        if isinstance(other, StageStats):
+            other = other.to_dict()
+        for stage, seconds in other.get('times', {}).items():
+            self.add(stage, seconds)
+        for name, n in other.get('counts', {}).items():
+            self.count(name, n)
+        for reason, n in other.get('rejects', {}).items():
+            self.reject(reason, n)
+
+    def to_dict(self):
+        order = list(STAGE_NAMES)
+        times = sorted(self.times.items(), key=lambda kv: order.index(kv[0]) if kv[0] in order else len(order))
+        return {'times': dict(times), 'counts': dict(self.counts), 'rejects': dict(self.rejects)}
+
+
+def stage_rows(stages):
+    """Строки (название, секунды, доля) для отображения stats['stages']"""
+    times = stages.get('times', {})
+    total = sum(times.values()) or 1.0
+    return [(STAGE_NAMES.get(stage, stage), seconds, seconds / total) for stage, seconds in times.items()]
+
+
+# === Профилирование ===
+def profile_path(output=None):
+    """Файл профиля: рядом с файлом вывода, для предпросмотра и stdout - в кэше"""
+    if output and output != '-':
+        return f"{output}.prof"
+    from datetime import datetime
+
+    from .cache import cache_dir
+    directory = cache_dir() / 'profiles'
+    os.makedirs(directory, exist_ok=True)
+    return str(directory / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.prof")
+
+
+@contextmanager
+def profiled(path):
+    """cProfile вокруг блока: двоичный профиль в path, сводка top-40 в path + '.txt'
+
+    Профилируется только текущий поток; процессы-воркеры в профиль не попадают.
+    """
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        with open(f"{path}.txt", 'w', encoding='utf-8') as f:
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(40)
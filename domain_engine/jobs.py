@@ -0,0 +1,179 @@
+"""Задачи обработки: отмена, пауза и планировщик с приоритетами"""
+import heapq
+import itertools
+import multiprocessing
+import time
+
+# Приоритеты: меньше - раньше
+PRIORITY_PREVIEW = 0
+PRIORITY_EXPORT = 10
+
+# Состояния задачи
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Задача отменена пользователем"""
+
+
+class JobControl:
+    """Флаги отмены и паузы, видимые из потоков и процессов-воркеров"""
+
+    def __init__(self):
+        self.cancelled = multiprocessing.Event()
+        self.running = multiprocessing.Event()
+        self.running.set()
+
+    def cancel(self):
+        self.cancelled.set()
+        # Задача на паузе должна проснуться, чтобы увидеть отмену
+        self.running.set()
+
+    def pause(self):
+        self.running.clear()
+
+    def resume(self):
+        self.running.set()
+
+    @property
+    def paused(self):
+        return not self.running.is_set()
+
+    def checkpoint(self):
+        """Точка проверки: ждёт снятия паузы, при отмене бросает JobCancelled"""
+        if not self.running.is_set():
+            self.running.wait()
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+    def guard(self, iterable, every=8192):
+        """Итератор с точкой проверки каждые every элементов"""
+        for i, item in enumerate(iterable):
+            if not i % every:
+                self.checkpoint()
+            yield item
+
+
+class Job:
+    """Задача: входные файлы, файл вывода (None - предпросмотр) и снимок настроек
+
+    follow=True - слежение за дописываемыми файлами: работает до отмены.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, inputs, output, settings, preview=False, priority=None, follow=False):
+        self.id = next(self._ids)
+        self.inputs = list(inputs)
+        self.output = output
+        self.settings = settings
+        self.preview = preview
+        self.follow = follow
+        self.priority = priority if priority is not None else (
+            PRIORITY_PREVIEW if preview else PRIORITY_EXPORT)
+        self.status = QUEUED
+        self.control = JobControl()
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    @property
+    def kind(self):
+        if self.follow:
+            return "Слежение"
+        return "Предпросмотр" if self.preview else "Экспорт"
+
+    @property
+    def elapsed(self):
+        """Время выполнения в секундах (для задачи в очереди - 0)"""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class JobScheduler:
+    """Очередь задач с приоритетами и ограничением одновременно выполняемых
+
+    Методы вызываются из главного потока; start(job) запускает задачу
+    (обычно в отдельном потоке), по её завершении нужно вызвать finish(job).
+    """
+
+    def __init__(self, start, max_running=1):
+        self.start = start
+        self.max_running = max_running
+        self.jobs = []      # все задачи в порядке добавления (для панели очереди)
+        self._heap = []
+        self._running = set()
+
+    def submit(self, job):
+        self.jobs.append(job)
+        if job.follow:
+            # Слежение не завершается само и не занимает место в очереди
+            job.status = RUNNING
+            job.started = time.time()
+            self.start(job)
+            return job
+        heapq.heappush(self._heap, (job.priority, job.id, job))
+        self.dispatch()
+        return job
+
+    @property
+    def running(self):
+        return len(self._running)
+
+    @property
+    def pending(self):
+        return sum(1 for job in self.jobs if job.status == QUEUED)
+
+    def dispatch(self):
+        """Запуск задач из очереди, пока есть свободные места"""
+        while self._heap and len(self._running) < max(1, self.max_running):
+            _priority, _id, job = heapq.heappop(self._heap)
+            if job.status != QUEUED:
+                continue
+            job.status = RUNNING
+            job.started = time.time()
+            self._running.add(job.id)
+            self.start(job)
+
+    def finish(self, job, status=DONE, error=None):
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        self._running.discard(job.id)
+        self.dispatch()
+
+    def get(self, job_id):
+        for job in self.jobs:
+            if job.id == job_id:
+                return job
+        return None
+
+    def cancel(self, job):
+        if job.status == QUEUED:
+            # Из кучи задача уйдёт при следующем dispatch
+            job.status = CANCELLED
+            job.finished = time.time()
+        elif job.status in (RUNNING, PAUSED):
+            job.control.cancel()
+
+    def pause(self, job):
+        if job.status == RUNNING:
+            job.control.pause()
+            job.status = PAUSED
+
+    def resume(self, job):
+        if job.status == PAUSED:
+            job.control.resume()
+            job.status = RUNNING
+
+    def clear_finished(self):
+        self.jobs = [job for job in self.jobs if job.status not in FINISHED]
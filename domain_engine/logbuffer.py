@@ -0,0 +1,79 @@
+"""Кольцевой буфер строк лога с поиском и склейкой повторов"""
+from collections import deque
+
+# Лимит строк лога по умолчанию
+MAX_LINES = 5000
+
+
+class LogBuffer:
+    """Последние max_lines строк лога с тегами"""
+
+    def __init__(self, max_lines=MAX_LINES):
+        self.max_lines = max(1, max_lines)
+        self.lines = deque()
+
+    def __len__(self):
+        return len(self.lines)
+
+    def append(self, text, tag=None):
+        """Добавление строки; возвращает число вытесненных старых строк"""
+        self.lines.append((text, tag))
+        dropped = 0
+        while len(self.lines) > self.max_lines:
+            self.lines.popleft()
+            dropped += 1
+        return dropped
+
+    def resize(self, max_lines):
+        """Смена лимита; возвращает число вытесненных строк"""
+        self.max_lines = max(1, max_lines)
+        dropped = max(0, len(self.lines) - self.max_lines)
+        for _ in range(dropped):
+            self.lines.popleft()
+        return dropped
+
+    def clear(self):
+        self.lines.clear()
+
+    def search(self, query):
+        """Позиции (строка в буфере, столбец) всех вхождений без учёта регистра"""
+        query = query.lower()
+        if not query:
+            return []
+        result = []
+        for i, (text, _tag) in enumerate(self.lines):
+            low = text.lower()
+            col = low.find(query)
+            while col >= 0:
+                result.append((i, col))
+                col = low.find(query, col + len(query))
+        return result
+
+    def find_next(self, query, after):
+        """Первая строка с вхождением после строки after (по кругу) или None"""
+        query = query.lower()
+        n = len(self.lines)
+        if not query or not n:
+            return None
+        for step in range(1, n + 1):
+            i = (after + step) % n
+            if query in self.lines[i][0].lower():
+                return i
+        return None
+
+
+def coalesce(records):
+    """Склейка подряд идущих одинаковых записей (текст, тег) в «текст (×N)»"""
+    result = []
+    prev = None
+    count = 0
+    for record in records:
+        if record == prev:
+            count += 1
+            continue
+        if prev is not None:
+            result.append(prev if count == 1 else (f"{prev[0]} (×{count})", prev[1]))
+        prev, count = record, 1
+    if prev is not None:
+        result.append(prev if count == 1 else (f"{prev[0]} (×{count})", prev[1]))
+    return result
@@ -0,0 +1,315 @@
+"""Параллельная обработка файлов и диапазонов больших файлов в пуле процессов"""
+import os
+import time
+from collections import Counter, namedtuple
+
+from .arena import DomainArena
+from .pipeline import ExtractionPipeline
+from .reader import (iter_text_chunks, open_text, is_ascii_compatible, split_ranges, detect_compression,
+                     bytes_consumed)
+from .sketches import CardinalityStats, HeavyHitterStats
+from .instrument import StageStats
+
+# Размер диапазона, на который режутся большие файлы в параллельном режиме
+SPLIT_SIZE = 64 * 1024 * 1024
+
+# Доменов в результате воркера, после которых он уходит в сжатый временный файл
+SPILL_ITEMS = 1 << 16
+
+# Единица работы: файл целиком (end=None) или диапазон байтов файла
+WorkUnit = namedtuple('WorkUnit', 'index file_index path encoding start end size')
+
+
+def resolve_workers(workers):
+    """Число процессов: 0 - по числу ядер"""
+    if not workers or workers < 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def plan_units(paths, encodings, workers=1, split_size=SPLIT_SIZE):
+    """Построение списка единиц работы в порядке последовательной обработки"""
+    units = []
+    for file_index, (path, encoding) in enumerate(zip(paths, encodings)):
+        size = os.path.getsize(path)
+        # Сжатые файлы читаются только целиком
+        if (workers > 1 and size > split_size and is_ascii_compatible(encoding)
+                and not detect_compression(path)):
+            ranges = split_ranges(path, split_size)
+        else:
+            ranges = [(0, None)]
+        for start, end in ranges:
+            length = (end if end is not None else size) - start
+            units.append(WorkUnit(len(units), file_index, path, encoding, start, end, length))
+    return units
+
+
+def iter_unit_candidates(unit, pipeline, stages=None):
+    """Проверенные кандидаты единицы работы по блокам (до фильтрации)
+
+    Вместе с блоком выдаётся число прочитанных байтов единицы на диске.
+    stages (instrument.StageStats) получает время чтения, regex и валидации.
+    """
+    # Байтовые шаблоны компилируются при первом чтении файла, а не при запуске (stdin их не использует)
+    from .fastpath import ByteScanner
+    stages = stages if stages is not None else StageStats()
+    if ByteScanner.supports(pipeline.settings, unit.encoding) and not detect_compression(unit.path):
+        scanner = ByteScanner(pipeline, unit.encoding)
+        # Байтовый путь читает mmap и ищет совпадения за один проход
+        for candidates in stages.timed('extract', scanner.iter_candidates(unit.path, unit.start, unit.end)):
+            stages.count('candidates', len(candidates))
+            with stages.timer('validate'):
+                valid = pipeline.validate(candidates, stages)
+            yield valid, scanner.position - unit.start
+        return
+    with open_text(unit.path, unit.encoding, unit.start, unit.end) as f:
+        for chunk in stages.timed('read', iter_text_chunks(f)):
+            stages.count('decoded_chars', len(chunk))
+            with stages.timer('extract'):
+                candidates = pipeline.extract(chunk)
+            stages.count('candidates', len(candidates))
+            with stages.timer('validate'):
+                valid = pipeline.validate(candidates, stages)
+            yield valid, min(bytes_consumed(f), unit.size)
+
+
+def unit_result(unit, worker='main'):
+    """Заготовка результата единицы работы: поля, известные до обработки"""
+    return {'index': unit.index, 'file_index': unit.file_index, 'bytes': unit.size, 'worker': worker}
+
+
+def iter_unit_blocks(result, unit, pipeline, cache=None, progress=None, control=None, blocks=None):
+    """Отформатированные домены единицы работы по блокам, по мере чтения
+
+    Остальные поля result (счётчики, распределения, стадии, кэш) заполняются
+    после исчерпания итератора. blocks - готовые пары (кандидаты, позиция)
+    вместо чтения unit.path (например, для потока stdin).
+    """
+    t0 = last_time = time.perf_counter()
+    stages = StageStats()
+    done = candidates_count = 0
+    peak_rate = 0.0
+    tld_distribution = Counter()
+    raw_count = 0
+    # HLL-оценки считаются в воркере и объединяются при слиянии
+    s = pipeline.settings
+    approximate = s.remove_duplicates and s.dedup_mode == "approximate"
+    cardinality = CardinalityStats() if approximate else None
+    hitters = HeavyHitterStats(s.heavy_hitters_k, s.heavy_hitters_mb, pipeline.suffixes) if s.heavy_hitters else None
+    # Кэш хранит проверенные кандидаты: фильтры и формат применяются заново
+    with stages.timer('cache'):
+        key = cache.key(unit, s) if cache is not None else None
+        cached = cache.load(key) if key else None
+    status = None if key is None else ('hit' if cached is not None else 'miss')
+    # При промахе кандидаты сжимаются во временный файл записи по мере чтения
+    writer = cache.writer(key) if status == 'miss' else None
+    if cached is not None:
+        # Позиция в файле для записи кэша не считается: прогресс догоняется в конце
+        blocks = ((candidates, 0) for candidates in stages.timed('cache', cached))
+    elif blocks is None:
+        blocks = iter_unit_candidates(unit, pipeline, stages)
+    try:
+        for candidates, position in blocks:
+            # Пауза и отмена проверяются между блоками, в том числе в воркерах
+            if control is not None:
+                control.checkpoint()
+            if writer is not None:
+                with stages.timer('cache'):
+                    writer.write(candidates)
+            # Прогресс и пиковая скорость по блокам
+            now = time.perf_counter()
+            if now > last_time and position > done:
+                peak_rate = max(peak_rate, (position - done) / (now - last_time))
+            if progress is not None:
+                progress.add(position - done, len(candidates))
+            done, last_time = position, now
+            candidates_count += len(candidates)
+            domains = pipeline.filter(candidates, stages)
+            raw_count += len(domains)
+            with stages.timer('format'):
+                chunk = pipeline.format_all(domains)
+            with stages.timer('stats'):
+                if hitters is not None:
+                    # Зоны считаются по уникальным доменам пачки, которые sketch уже посчитал
+                    for domain, n in hitters.add(domains).items():
+                        tld_distribution[domain.rpartition('.')[2]] += n
+                else:
+                    tld_distribution.update(d.rpartition('.')[2] for d in domains)
+                if cardinality is not None:
+                    for value, domain in zip(chunk, domains):
+                        cardinality.add(value, domain)
+            if chunk:
+                yield chunk
+        with stages.timer('cache'):
+            # None - запись не сохранена (больше лимита кэша или ошибка записи)
+            cache_size = writer.commit() if writer is not None else None
+    finally:
+        # Отмена или ошибка: недописанная запись не попадает в кэш
+        if writer is not None:
+            writer.abort()
+    stages.count('bytes_read', done if cached is None else 0)
+    stages.count('validated', candidates_count)
+    stages.count('filtered', raw_count)
+    if progress is not None and done < unit.size:
+        progress.add(unit.size - done)
+    result.update({
+        'raw_count': raw_count,
+        'tld_distribution': tld_distribution,
+        'cardinality': cardinality,
+        'heavy_hitters': hitters,
+        'candidates': candidates_count,
+        'elapsed': time.perf_counter() - t0,
+        'peak_rate': peak_rate,
+        'cache': status,
+        'cache_key': key,
+        'cache_size': cache_size,
+        'stages': stages,
+    })
+
+
+def process_unit(unit, pipeline, worker='main', cache=None, progress=None, control=None, blocks=None):
+    """Обработка одной единицы работы целиком, результат - словарь для слияния
+
+    Домены собираются в 'formatted': до SPILL_ITEMS - списком, дальше - в
+    DomainArena, сброшенной во временный файл. Так воркер не держит вывод
+    единицы в памяти, а в главный процесс передаётся только путь к блокам.
+    """
+    result = unit_result(unit, worker)
+    formatted = []
+    try:
+        for chunk in iter_unit_blocks(result, unit, pipeline, cache, progress, control, blocks):
+            formatted.extend(chunk)
+            if isinstance(formatted, list) and len(formatted) >= SPILL_ITEMS:
+                import tempfile
+                arena = DomainArena()
+                arena.extend(formatted)
+                fd, path = tempfile.mkstemp(prefix='domain_extractor_', suffix='.bin')
+                os.close(fd)
+                arena.spill(path)
+                formatted = arena
+    except BaseException:
+        # Отмена или ошибка: временный файл никому не будет передан
+        discard_formatted(formatted)
+        raise
+    if isinstance(formatted, DomainArena):
+        formatted.seal()
+    result['formatted'] = formatted
+    return result
+
+
+def formatted_blocks(formatted):
+    """Блоки доменов из 'formatted' результата process_unit; временный файл удаляется"""
+    if isinstance(formatted, DomainArena):
+        try:
+            for domains, _seqs in formatted.iter_blocks():
+                yield domains
+        finally:
+            formatted.close()
+    elif formatted:
+        yield formatted
+
+
+def discard_formatted(formatted):
+    """Удаление временного файла невостребованного результата"""
+    if isinstance(formatted, DomainArena):
+        formatted.close()
+
+
+# === Состояние процесса-воркера ===
+_worker_pipeline = None
+_worker_cache = None
+_worker_progress = None
+_worker_control = None
+
+
+def _make_cache(settings):
+    if not settings.result_cache:
+        return None
+    from .resultcache import ResultCache
+    return ResultCache(max_mb=settings.result_cache_mb)
+
+
+def _init_worker(settings, progress, control):
+    global _worker_pipeline, _worker_cache, _worker_progress, _worker_control
+    _worker_pipeline = ExtractionPipeline(settings)
+    _worker_cache = _make_cache(settings)
+    _worker_progress = progress
+    _worker_control = control
+
+
+def _run_in_worker(unit):
+    return process_unit(unit, _worker_pipeline, worker=f"pid {os.getpid()}", cache=_worker_cache,
+                        progress=_worker_progress, control=_worker_control)
+
+
+def run_units(units, settings, workers=1, progress=None, control=None):
+    """Обработка единиц работы; результаты выдаются строго в порядке units
+
+    У каждого результата 'blocks' - итератор блоков отформатированных доменов;
+    остальные поля окончательны после его исчерпания. В одном процессе блоки
+    идут по мере чтения файла, из воркеров - из сжатого временного файла.
+    progress (progress.Progress) пополняется по мере чтения блоков,
+    в том числе из процессов-воркеров. control (jobs.JobControl) - пауза
+    и отмена: при отмене бросается JobCancelled.
+    """
+    cache = _make_cache(settings)
+    try:
+        for result in _iter_results(units, settings, workers, cache, progress, control):
+            yield result
+            # Потребитель мог не дочитать блоки: итоги результата нужны в любом случае
+            for _block in result['blocks']:
+                pass
+            # Индекс LRU ведёт только главный процесс; несохранённые записи в него не попадают
+            if result['cache'] == 'hit' or result['cache_size'] is not None:
+                cache.touch(result['cache_key'], result['cache_size'])
+    finally:
+        if cache is not None:
+            cache.save()
+
+
+def _iter_results(units, settings, workers, cache, progress, control):
+    if workers <= 1 or len(units) <= 1:
+        pipeline = ExtractionPipeline(settings)
+        for unit in units:
+            result = unit_result(unit)
+            result['blocks'] = iter_unit_blocks(result, unit, pipeline, cache, progress, control)
+            yield result
+        return
+    # Пул процессов (и multiprocessing) импортируется только когда нужен
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(units)),
+                               initializer=_init_worker, initargs=(settings, progress, control))
+    futures = []
+    taken = 0
+    try:
+        futures = [pool.submit(_run_in_worker, unit) for unit in units]
+        for future in futures:
+            result = future.result()
+            taken += 1
+            result['blocks'] = formatted_blocks(result.pop('formatted'))
+            yield result
+    finally:
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=True)
+        # Готовые, но не выданные результаты оставили временные файлы
+        for future in futures[taken:]:
+            if not future.cancelled() and future.exception() is None:
+                discard_formatted(future.result()['formatted'])
+
+
+def merge_worker_stats(worker_stats, result):
+    """Накопление пропускной способности по воркерам"""
+    entry = worker_stats.setdefault(result['worker'], {'units': 0, 'bytes': 0, 'time': 0.0})
+    entry['units'] += 1
+    entry['bytes'] += result['bytes']
+    entry['time'] += result['elapsed']
+
+
+def merge_file_stats(file_stats, name, result):
+    """Накопление скорости по файлам: байты, время, кандидаты, пиковая скорость"""
+    entry = file_stats.setdefault(name, {'bytes': 0, 'time': 0.0, 'candidates': 0, 'peak_rate': 0.0})
+    entry['bytes'] += result['bytes']
+    entry['time'] += result['elapsed']
+    entry['candidates'] += result['candidates']
+    entry['peak_rate'] = max(entry['peak_rate'], result['peak_rate'])
@@ -0,0 +1,138 @@
+"""Индекс чёрного/белого списка: поиск за O(число меток), а не O(число паттернов)"""
+import re
+
+# Символы регулярных выражений, из-за которых паттерн уходит в общий regex
+_REGEX_META = set('\\^$+?{}[]|()')
+
+# Ключ-маркер конца паттерна в узлах trie (метки доменов - всегда строки)
+_END = None
+
+# Имена из hosts-файлов, которые не являются блокируемыми доменами
+_HOSTS_SKIP = {'localhost', 'localhost.localdomain', 'local', 'broadcasthost',
+               'ip6-localhost', 'ip6-loopback', 'ip6-localnet', 'ip6-mcastprefix',
+               'ip6-allnodes', 'ip6-allrouters', 'ip6-allhosts', '0.0.0.0'}
+
+
+def pattern_to_regex(pattern):
+    """Паттерн с wildcard в регулярное выражение (как в match_pattern)"""
+    return pattern.replace('.', r'\.').replace('*', '.*')
+
+
+def _trie_insert(root, labels):
+    node = root
+    for label in labels:
+        node = node.setdefault(label, {})
+    node[_END] = True
+
+
+def _plain_labels(text):
+    """Метки паттерна без wildcard и спецсимволов или None"""
+    if not text or '*' in text or _REGEX_META.intersection(text):
+        return None
+    labels = text.split('.')
+    if '' in labels:
+        return None
+    return labels
+
+
+class PatternIndex:
+    """Скомпилированный набор паттернов вида domain.com, *.example.com, google.*
+
+    - точные домены - хеш-множество;
+    - *.suffix - trie по меткам в обратном порядке;
+    - prefix.* - trie по меткам в прямом порядке;
+    - остальные паттерны - один общий скомпилированный regex.
+    """
+
+    def __init__(self, patterns=(), files=()):
+        self.exact = set()
+        self.suffixes = {}
+        self.prefixes = {}
+        self.match_all = False
+        self._fallback = []
+        self._regex = None
+        self.count = 0
+        for pattern in patterns:
+            self.add(pattern)
+        for path in files:
+            for pattern in load_pattern_file(path):
+                self.add(pattern)
+        if self._fallback:
+            self._regex = re.compile('|'.join(f'(?:{p})' for p in self._fallback), re.IGNORECASE)
+
+    def add(self, pattern):
+        """Добавление паттерна в индекс (до первого вызова match)"""
+        pattern = pattern.strip().lower()
+        if not pattern:
+            return
+        self.count += 1
+        if pattern.strip('*') == '':
+            self.match_all = True
+            return
+        labels = _plain_labels(pattern)
+        if labels is not None:
+            self.exact.add(pattern)
+            return
+        if pattern.startswith('*.'):
+            labels = _plain_labels(pattern[2:])
+            if labels is not None:
+                _trie_insert(self.suffixes, reversed(labels))
+                return
+        if pattern.endswith('.*'):
+            labels = _plain_labels(pattern[:-2])
+            if labels is not None:
+                _trie_insert(self.prefixes, labels)
+                return
+        regex = pattern_to_regex(pattern)
+        re.compile(regex)
+        self._fallback.append(regex)
+
+    def __len__(self):
+        return self.count
+
+    def match(self, domain):
+        """Совпадает ли домен хотя бы с одним паттерном"""
+        if self.match_all:
+            return True
+        domain = domain.lower()
+        if domain in self.exact:
+            return True
+        if self.suffixes or self.prefixes:
+            labels = domain.split('.')
+            n = len(labels)
+            # *.example.com: домен длиннее суффикса хотя бы на одну метку
+            node = self.suffixes
+            for depth in range(n - 1, 0, -1):
+                node = node.get(labels[depth])
+                if node is None:
+                    break
+                if _END in node:
+                    return True
+            # google.*: после префикса остаётся хотя бы одна метка
+            node = self.prefixes
+            for depth in range(n - 1):
+                node = node.get(labels[depth])
+                if node is None:
+                    break
+                if _END in node:
+                    return True
+        if self._regex is not None and self._regex.fullmatch(domain):
+            return True
+        return False
+
+
+def load_pattern_file(path):
+    """Загрузка паттернов из hosts-файла или списка "один на строку\""""
+    patterns = []
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            fields = line.split()
+            if len(fields) > 1:
+                # Формат hosts: "0.0.0.0 ads.example.com [alias ...]"
+                patterns.extend(h for h in fields[1:] if h.lower() not in _HOSTS_SKIP)
+            elif fields[0].lower() not in _HOSTS_SKIP:
+                patterns.append(fields[0])
+    return patterns
@@ -0,0 +1,218 @@
+"""Конвейер извлечения: extract → validate → filter → format"""
+import re
+import time
+from itertools import filterfalse
+
+from .formatter import Formatter
+from .idn import IDN_PATTERNS, to_ascii, to_unicode
+from .patterns import PatternIndex
+
+# === Регулярные выражения режимов (компилируются один раз) ===
+MODE_PATTERNS = {
+    # Стандартный режим - основные домены
+    "standard": re.compile(r'\b(?:[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}\b', re.IGNORECASE),
+    # Агрессивный - включая поддомены (юникодные домены - через настройку idn, см. idn.py)
+    "aggressive": re.compile(r'(?:[a-zA-Z0-9\-]+\.)+[a-zA-Z]{2,}(?:\.[a-zA-Z]{2,})?', re.IGNORECASE),
+    # Извлечение из email
+    "email": re.compile(r'[\w\.-]+@([\w\.-]+\.[a-zA-Z]{2,})', re.IGNORECASE),
+    # Из URL
+    "url": re.compile(r'(?:https?://)?(?:www\.)?([a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*\.[a-zA-Z]{2,})', re.IGNORECASE),
+}
+
+_INVALID_CHARS = re.compile(r'[^a-z0-9\.\-]')
+
+
+def is_valid_domain(domain):
+    """Валидация структуры домена"""
+    if not domain or len(domain) > 253:
+        return False
+
+    # Проверка на недопустимые символы
+    if _INVALID_CHARS.search(domain):
+        return False
+
+    # Проверка частей домена
+    parts = domain.split('.')
+    if len(parts) < 2:
+        return False
+
+    for part in parts:
+        if not part or len(part) > 63:
+            return False
+        if part.startswith('-') or part.endswith('-'):
+            return False
+
+    return True
+
+
+def match_pattern(domain, pattern):
+    """Сопоставление домена с паттерном (поддержка wildcard)"""
+    pattern = pattern.replace('.', r'\.')
+    pattern = pattern.replace('*', '.*')
+    pattern = f'^{pattern}$'
+    return bool(re.match(pattern, domain, re.IGNORECASE))
+
+
+class ExtractionPipeline:
+    """Конвейер обработки, построенный по снимку ExtractionSettings"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        # С IDN - юникодные шаблоны; без него путь ASCII-доменов не меняется
+        self.idn = settings.idn if settings.idn != "off" else None
+        self.pattern = (IDN_PATTERNS if self.idn else MODE_PATTERNS).get(settings.extraction_mode)
+        self.findall = self.pattern.findall if self.pattern is not None else None
+        if settings.extract_engine == "scanner" and not self.idn:
+            from .scanner import SCANNER_MODES, CandidateScanner
+            if settings.extraction_mode in SCANNER_MODES:
+                self.findall = CandidateScanner(settings.extraction_mode).findall
+        self.strip_table = str.maketrans({ch: ' ' for ch in settings.strip_chars})
+        # Индексы списков строятся один раз на задачу
+        self.blacklist = PatternIndex(settings.blacklist, settings.blacklist_files)
+        self.whitelist = PatternIndex(settings.whitelist, settings.whitelist_files)
+        # Public Suffix List нужен только фильтру TLD и форматам, зависящим от зоны
+        needs_psl = (settings.selected_tlds or settings.domain_format != "full"
+                     or settings.use_advanced_mask)
+        self.suffixes = None
+        if needs_psl:
+            from .suffix import get_suffix_trie
+            self.suffixes = get_suffix_trie()
+        # Зоны фильтра приводятся к форме вывода: «.рф» и «.xn--p1ai» - одна зона
+        self.selected_tlds = settings.selected_tlds
+        if self.idn:
+            convert = to_ascii if self.idn == "punycode" else to_unicode
+            self.selected_tlds = frozenset(convert(tld) or tld for tld in settings.selected_tlds)
+        # Форматирование компилируется по настройкам один раз на задачу
+        self.formatter = Formatter(settings, self.suffixes)
+
+    # === Этап 1: извлечение кандидатов ===
+    def extract(self, text):
+        """Поиск кандидатов регулярным выражением режима (или сканером с тем же результатом)"""
+        if self.findall is None:
+            return []
+        # Удаление символов из strip_chars
+        if self.strip_table:
+            text = text.translate(self.strip_table)
+        return self.findall(text)
+
+    # === Этап 2: нормализация и валидация ===
+    def validate(self, candidates, stages=None):
+        """Нормализация, проверка длины и DNS-структуры (stages - счётчики отсева)"""
+        s = self.settings
+        min_len, max_len, check_dns = s.min_length, s.max_length, s.validate_dns
+        if self.idn:
+            candidates = self._idn_ascii(candidates, stages)
+        result = []
+        bad_length = no_dot = bad_dns = 0
+        for d in candidates:
+            d = d.lower().strip('.-')
+
+            # Проверка длины
+            if len(d) < min_len or len(d) > max_len:
+                bad_length += 1
+                continue
+
+            # Проверка наличия точки
+            if '.' not in d:
+                no_dot += 1
+                continue
+
+            # Валидация DNS
+            if check_dns and not is_valid_domain(d):
+                bad_dns += 1
+                continue
+
+            result.append(d)
+        if stages is not None:
+            stages.reject('length', bad_length)
+            stages.reject('no_dot', no_dot)
+            stages.reject('dns', bad_dns)
+        if self.idn == "unicode":
+            result = self._idn_unicode(result, stages)
+        return result
+
+    @staticmethod
+    def _idn_ascii(candidates, stages):
+        """Punycode-форма не-ASCII кандидатов: длины и DNS проверяются по ней"""
+        # Быстрый обход: в блоке без не-ASCII символов преобразовывать нечего
+        if ''.join(candidates).isascii():
+            return candidates
+        result = []
+        for d in candidates:
+            if not d.isascii():
+                d = to_ascii(d.strip('.-'))
+                if d is None:
+                    continue
+            result.append(d)
+        if stages is not None:
+            stages.reject('idn', len(candidates) - len(result))
+        return result
+
+    @staticmethod
+    def _idn_unicode(domains, stages):
+        """Юникодная форма проверенных доменов (метки xn-- раскодируются)"""
+        if 'xn--' not in ''.join(domains):
+            return domains
+        result = [u for u in map(to_unicode, domains) if u is not None]
+        if stages is not None:
+            stages.reject('idn', len(domains) - len(result))
+        return result
+
+    # === Этап 3: фильтры TLD и списков ===
+    def filter(self, domains, stages=None):
+        """Фильтрация по TLD, чёрному и белому спискам
+
+        Фильтры идут отдельными проходами, чтобы время и отсев каждого
+        можно было учесть в stages.
+        """
+        tlds = self.selected_tlds
+        blacklist, whitelist = self.blacklist, self.whitelist
+        domains = list(domains)
+        if tlds:
+            # Последняя метка или публичный суффикс: co.uk, com.au
+            public_suffix = self.suffixes.public_suffix
+            domains = self._filter_pass(
+                'tld', domains, stages,
+                lambda d: d.rpartition('.')[2] in tlds or public_suffix(d) in tlds)
+        # Чёрный список
+        if blacklist:
+            domains = self._filter_pass('blacklist', domains, stages, blacklist.match, drop=True)
+        # Белый список (если задан, пропускаем только совпадения)
+        if whitelist:
+            domains = self._filter_pass('whitelist', domains, stages, whitelist.match)
+        return domains
+
+    @staticmethod
+    def _filter_pass(name, domains, stages, predicate, drop=False):
+        t0 = time.perf_counter()
+        result = list(filterfalse(predicate, domains) if drop else filter(predicate, domains))
+        if stages is not None:
+            stages.add(f'filter_{name}', time.perf_counter() - t0)
+            stages.reject(name, len(domains) - len(result))
+        return result
+
+    def is_blacklisted(self, domain):
+        """Проверка на чёрный список"""
+        return self.blacklist.match(domain)
+
+    def is_whitelisted(self, domain):
+        """Проверка на белый список"""
+        return self.whitelist.match(domain)
+
+    def run(self, text):
+        """Извлечение, валидация и фильтрация текста"""
+        return self.filter(self.validate(self.extract(text)))
+
+    def run_stream(self, chunks):
+        """Обработка последовательности текстовых блоков (см. reader.iter_text_chunks)"""
+        for chunk in chunks:
+            yield self.run(chunk)
+
+    # === Этап 4: форматирование ===
+    def format(self, domain):
+        """Форматирование домена с учётом всех настроек"""
+        return self.formatter.format(domain)
+
+    def format_all(self, domains):
+        """Форматирование списка доменов (одним пакетом)"""
+        return self.formatter.format_all(domains)
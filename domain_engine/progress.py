@@ -0,0 +1,65 @@
+"""Прогресс по байтам входных файлов: общие счётчики процессов, скорость и ETA"""
+import multiprocessing
+import time
+
+
+class Progress:
+    """Счётчики прочитанных байтов и найденных кандидатов, общие для воркеров"""
+
+    def __init__(self, total_bytes=0):
+        self.total = total_bytes
+        # Обновляется раз на блок (мегабайты), поэтому блокировка почти бесплатна
+        self.counters = multiprocessing.Array('q', 2)
+
+    def add(self, nbytes, candidates=0):
+        with self.counters.get_lock():
+            self.counters[0] += nbytes
+            self.counters[1] += candidates
+
+    @property
+    def bytes_done(self):
+        return self.counters[0]
+
+    @property
+    def candidates(self):
+        return self.counters[1]
+
+
+class RateMeter:
+    """Сглаженные МБ/с, кандидатов/с и оценка оставшегося времени"""
+
+    def __init__(self, total_bytes, alpha=0.3):
+        self.total = max(1, total_bytes)
+        self.alpha = alpha
+        self.start = self.last_time = time.perf_counter()
+        self.last_bytes = 0
+        self.rate = None
+        self.peak = 0.0
+
+    def update(self, done, candidates, now=None):
+        """Снимок: процент, МБ/с, кандидатов/с и секунд до конца (или None)"""
+        now = time.perf_counter() if now is None else now
+        dt = now - self.last_time
+        if dt > 0:
+            instant = (done - self.last_bytes) / dt
+            self.rate = instant if self.rate is None else self.alpha * instant + (1 - self.alpha) * self.rate
+            self.peak = max(self.peak, self.rate)
+            self.last_time, self.last_bytes = now, done
+        elapsed = now - self.start
+        rate = self.rate or 0.0
+        return {
+            'percent': min(100.0, done / self.total * 100),
+            'mbps': rate / 1048576,
+            'candidates_per_sec': candidates / elapsed if elapsed > 0 else 0.0,
+            'eta': (self.total - done) / rate if rate > 0 else None,
+        }
+
+
+def format_eta(seconds):
+    """Оставшееся время в виде ЧЧ:ММ:СС или ММ:СС"""
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
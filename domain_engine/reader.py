@@ -0,0 +1,256 @@
+"""Потоковое чтение входных файлов фиксированными блоками"""
+import bz2
+import gzip
+import io
+import lzma
+import os
+import re
+
+# Размер блока чтения (в символах)
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Символы, которые не могут входить ни в одно совпадение ни в одном режиме:
+# разрез по такому символу не меняет результат findall
+_BOUNDARY = re.compile(r'[^\w.\-@]')
+
+
+def _safe_cut(buf, max_carry):
+    """Позиция, после которой буфер можно разрезать без потери доменов"""
+    pos = buf.rfind('\n')
+    if pos >= 0 and len(buf) - pos - 1 <= max_carry:
+        return pos + 1
+    # Длинная строка без переводов - ищем любой разделитель
+    last = -1
+    for m in _BOUNDARY.finditer(buf, max(pos + 1, 0)):
+        last = m.end()
+    if last >= 0:
+        return last
+    if pos >= 0:
+        return pos + 1
+    # Разделителей нет вовсе - режем принудительно, чтобы не копить память
+    return len(buf) if len(buf) > max_carry else 0
+
+
+def iter_text_chunks(f, chunk_size=CHUNK_SIZE):
+    """Чтение текстового потока блоками, разрезанными по безопасным границам
+
+    Каждый блок заканчивается на символе, который не может быть частью домена,
+    поэтому домен на стыке блоков не теряется и не дублируется. Пиковая память
+    ограничена размером блока и длиной самой длинной строки.
+    """
+    carry = ''
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            break
+        buf = carry + data if carry else data
+        cut = _safe_cut(buf, chunk_size)
+        if cut:
+            yield buf[:cut]
+        carry = buf[cut:]
+    if carry:
+        yield carry
+
+
+# === Сжатые входные файлы ===
+_MAGIC = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+]
+
+
+def detect_compression(path):
+    """Формат сжатия по сигнатуре файла: gzip, bz2, xz, zstd или None"""
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, name in _MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def _zstd_reader(raw):
+    try:
+        from compression import zstd
+        return zstd.ZstdFile(raw)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Для чтения .zst установите пакет zstandard") from None
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, closefd=False))
+
+
+class SourceFile:
+    """Входной файл с прозрачной распаковкой; position() - прочитано байт файла на диске"""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self.compression = detect_compression(path)
+        self.raw = open(path, 'rb')
+        if self.compression == 'gzip':
+            self.stream = gzip.GzipFile(fileobj=self.raw, mode='rb')
+        elif self.compression == 'bz2':
+            self.stream = bz2.BZ2File(self.raw, mode='rb')
+        elif self.compression == 'xz':
+            self.stream = lzma.LZMAFile(self.raw, mode='rb')
+        elif self.compression == 'zstd':
+            self.stream = _zstd_reader(self.raw)
+        else:
+            self.stream = self.raw
+
+    def position(self):
+        """Сколько байт исходного (сжатого) файла уже прочитано"""
+        try:
+            return self.raw.tell()
+        except (OSError, ValueError):
+            return self.size
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+    def text(self, encoding):
+        """Текстовый поток поверх распакованных данных (закрывает и SourceFile)"""
+        return _SourceText(self, encoding)
+
+    def close(self):
+        if self.stream is not self.raw:
+            self.stream.close()
+        self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _SourceText(io.TextIOWrapper):
+    """Текстовый поток, владеющий своим SourceFile"""
+
+    def __init__(self, source, encoding):
+        super().__init__(source.stream, encoding=encoding, errors='ignore')
+        self.source = source
+
+    def close(self):
+        if not self.closed:
+            super().close()
+            self.source.close()
+
+
+class _RangeRaw(io.RawIOBase):
+    """Сырой поток, ограниченный диапазоном байтов [start, end) файла"""
+
+    def __init__(self, path, start, end):
+        self._f = open(path, 'rb')
+        self._f.seek(start)
+        self._size = self._left = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self._left <= 0:
+            return 0
+        n = self._f.readinto(memoryview(b)[:min(len(b), self._left)])
+        self._left -= n
+        return n
+
+    @property
+    def consumed(self):
+        return self._size - self._left
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+class _PrefixedRaw(io.RawIOBase):
+    """Сырой поток: сначала уже прочитанные байты head, затем остаток stream"""
+
+    def __init__(self, head, stream):
+        self._head = memoryview(head)
+        # read1/readinto1 возвращают то, что уже пришло, не дожидаясь полного буфера
+        self._readinto = getattr(stream, 'readinto1', stream.readinto)
+        self.consumed = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self._head:
+            n = min(len(b), len(self._head))
+            b[:n] = self._head[:n]
+            self._head = self._head[n:]
+        else:
+            n = self._readinto(b) or 0
+        self.consumed += n
+        return n
+
+
+def open_stream(stream, encoding, head=b''):
+    """Текстовый поток поверх двоичного (например, stdin) с уже прочитанным началом head"""
+    raw = io.BufferedReader(_PrefixedRaw(head, stream), buffer_size=1024 * 1024)
+    return io.TextIOWrapper(raw, encoding=encoding, errors='ignore')
+
+
+def open_text(path, encoding, start=0, end=None):
+    """Открытие файла (или его диапазона байтов) как текстового потока"""
+    if not start and end is None:
+        if detect_compression(path):
+            return SourceFile(path).text(encoding)
+        return open(path, 'r', encoding=encoding, errors='ignore')
+    if end is None:
+        end = os.path.getsize(path)
+    raw = io.BufferedReader(_RangeRaw(path, start, end), buffer_size=1024 * 1024)
+    return io.TextIOWrapper(raw, encoding=encoding, errors='ignore')
+
+
+def bytes_consumed(f):
+    """Сколько байт файла на диске прочитал поток из open_text (с упреждением буфера)"""
+    source = getattr(f, 'source', None)
+    if source is not None:
+        return source.position()
+    raw = f.buffer.raw
+    return raw.consumed if isinstance(raw, (_RangeRaw, _PrefixedRaw)) else raw.tell()
+
+
+def is_ascii_compatible(encoding):
+    """Кодировка, в которой байт \\n всегда означает перевод строки"""
+    try:
+        return '\n.az09'.encode(encoding) == b'\n.az09'
+    except (LookupError, UnicodeError):
+        return False
+
+
+def split_ranges(path, split_size):
+    """Разбиение файла на диапазоны байтов, выровненные по переводам строк"""
+    size = os.path.getsize(path)
+    if size <= split_size:
+        return [(0, size)]
+    ranges = []
+    start = 0
+    with open(path, 'rb') as f:
+        while start < size:
+            target = start + split_size
+            if target >= size:
+                ranges.append((start, size))
+                break
+            f.seek(target)
+            # Граница - сразу после ближайшего перевода строки
+            while True:
+                block = f.read(64 * 1024)
+                if not block:
+                    end = size
+                    break
+                pos = block.find(b'\n')
+                if pos >= 0:
+                    end = f.tell() - len(block) + pos + 1
+                    break
+            ranges.append((start, end))
+            start = end
+    return ranges
@@ -0,0 +1,272 @@
+"""Кэш результатов извлечения по файлам между запусками
+
+Хранятся списки проверенных кандидатов (после извлечения и валидации, до
+фильтров и форматирования), поэтому смена фильтров, маски или формата
+экспорта не сбрасывает кэш. Ключ - отпечаток файла, диапазон, кодировка
+и хеш только тех настроек, от которых зависит извлечение. Запись пишется
+и читается потоком zlib по блокам, целиком в памяти она не собирается.
+Концевик записи (длина и CRC32 сжатых данных) проверяется до выдачи
+первого блока: повреждённая или оборванная запись считается промахом.
+"""
+import json
+import os
+import struct
+import threading
+import zlib
+from hashlib import blake2b
+
+from .cache import cache_dir
+
+# Лимит кэша результатов по умолчанию (МБ)
+RESULT_CACHE_MB = 256
+
+# Настройки, влияющие на список проверенных кандидатов
+EXTRACTION_FIELDS = ('extraction_mode', 'strip_chars', 'min_length', 'max_length', 'validate_dns', 'idn')
+
+# Размер выборок начала, середины и конца файла для хеша содержимого
+_SAMPLE = 65536
+
+# Версия формата записи (входит в ключ): кандидаты, каждый со своим '\n', одним потоком zlib и концевик
+_FORMAT = 3
+
+# Концевик записи: длина сжатых данных и их CRC32
+_TRAILER = struct.Struct('<QI')
+
+# Сжатых байтов, читаемых из записи за шаг
+_READ_SIZE = 256 * 1024
+
+# Индекс общий для задач GUI в разных потоках: его чтение, изменение и запись - под замком
+_index_lock = threading.Lock()
+
+
+def settings_key(settings):
+    """Хеш настроек извлечения"""
+    values = [getattr(settings, name) for name in EXTRACTION_FIELDS]
+    return blake2b(json.dumps(values).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def file_identity(path):
+    """Отпечаток файла: размер, mtime и хеш выборок содержимого"""
+    st = os.stat(path)
+    h = blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for offset in sorted({0, max(0, st.st_size // 2 - _SAMPLE // 2), max(0, st.st_size - _SAMPLE)}):
+            f.seek(offset)
+            h.update(f.read(_SAMPLE))
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns, h.hexdigest()]
+
+
+class ResultCache:
+    """Файлы записей пишут воркеры, индексом LRU управляет главный процесс
+
+    Отметки touch копятся в экземпляре и применяются в save() к индексу,
+    заново прочитанному с диска: одновременные задачи не затирают записи друг друга.
+    """
+
+    def __init__(self, directory=None, max_mb=RESULT_CACHE_MB):
+        self.directory = directory
+        self.max_bytes = max(0, max_mb) * 1024 * 1024
+        self.index = None
+        # Ключ -> размер новой записи или None, в порядке последнего использования
+        self.touched = {}
+
+    def _dir(self):
+        if self.directory is None:
+            self.directory = cache_dir() / 'results'
+        os.makedirs(self.directory, exist_ok=True)
+        return self.directory
+
+    def _path(self, key):
+        return os.path.join(self._dir(), f"{key}.z")
+
+    def key(self, unit, settings):
+        """Ключ записи для единицы работы"""
+        parts = file_identity(unit.path) + [unit.start, unit.end, unit.encoding, settings_key(settings), _FORMAT]
+        return blake2b(json.dumps(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+    # === Записи (в любом процессе) ===
+    def load(self, key):
+        """Итератор списков кандидатов записи или None, если её нет или она повреждена"""
+        path = self._path(key)
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return None
+        try:
+            length = self._verify(f)
+        except OSError:
+            length = None
+        if length is None:
+            # Повреждённая запись - промах: единица работы извлекается заново и запись перезаписывается
+            f.close()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return self._read(f, length)
+
+    @staticmethod
+    def _verify(f):
+        """Длина сжатых данных, если концевик сходится с файлом, иначе None"""
+        size = os.fstat(f.fileno()).st_size - _TRAILER.size
+        if size < 0:
+            return None
+        f.seek(size)
+        length, crc = _TRAILER.unpack(f.read(_TRAILER.size))
+        if length != size:
+            return None
+        f.seek(0)
+        check = 0
+        while size:
+            data = f.read(min(_READ_SIZE, size))
+            if not data:
+                return None
+            check = zlib.crc32(data, check)
+            size -= len(data)
+        if check != crc:
+            return None
+        f.seek(0)
+        return length
+
+    @staticmethod
+    def _read(f, length):
+        # Запись распаковывается по шагам: в памяти только текущий кусок кандидатов
+        with f:
+            z = zlib.decompressobj()
+            tail = b''
+            while True:
+                data = f.read(min(_READ_SIZE, length))
+                length -= len(data)
+                buf = tail + (z.decompress(data) if data else z.flush())
+                cut = buf.rfind(b'\n') + 1
+                if cut:
+                    yield buf[:cut - 1].decode('utf-8').split('\n')
+                tail = buf[cut:]
+                if not data:
+                    break
+
+    def writer(self, key):
+        """Потоковая запись кандидатов (write по блокам, commit в конце)"""
+        return EntryWriter(self._path(key), self.max_bytes)
+
+    # === Индекс LRU (только главный процесс) ===
+    def _index_path(self):
+        return os.path.join(self._dir(), 'index.json')
+
+    def _load_index(self):
+        self.index = {}
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.index = data
+        except (OSError, ValueError):
+            pass
+
+    def touch(self, key, size=None):
+        """Отметка использования записи (size - для новых записей)"""
+        old = self.touched.pop(key, None)
+        self.touched[key] = size if size is not None else old
+
+    def _apply(self, key, size):
+        old = self.index.pop(key, 0)
+        self.index[key] = size if size is not None else old
+        if size is None and not old:
+            # Запись без индекса (например, после сбоя) - узнаём размер с диска
+            try:
+                self.index[key] = os.path.getsize(self._path(key))
+            except OSError:
+                del self.index[key]
+
+    def save(self):
+        """Применение отметок к индексу на диске, вытеснение давно не использованных записей"""
+        with _index_lock:
+            self._load_index()
+            for key, size in self.touched.items():
+                self._apply(key, size)
+            self.touched.clear()
+            total = sum(self.index.values())
+            while total > self.max_bytes and self.index:
+                key = next(iter(self.index))
+                total -= self.index.pop(key)
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            try:
+                tmp = self._index_path() + '.tmp'
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(self.index, f)
+                os.replace(tmp, self._index_path())
+            except OSError:
+                pass
+
+
+class EntryWriter:
+    """Запись кандидатов во временный файл через zlib.compressobj с заменой в конце
+
+    В конец пишется концевик _TRAILER: без него (оборванная запись) load её не выдаст.
+
+    Запись больше лимита кэша не сохраняется: save() всё равно вытеснил бы её
+    сразу, поэтому временный файл удаляется, как только лимит превышен.
+    """
+
+    def __init__(self, path, limit):
+        self.path = path
+        self.tmp = f"{path}.{os.getpid()}.tmp"
+        self.limit = limit
+        self.size = 0
+        self.crc = 0
+        self._z = zlib.compressobj(1)
+        try:
+            self._f = open(self.tmp, 'wb')
+        except OSError:
+            self._f = None
+
+    @property
+    def active(self):
+        return self._f is not None
+
+    def write(self, domains):
+        if self._f is not None and domains:
+            self._put(self._z.compress(('\n'.join(domains) + '\n').encode('utf-8')))
+
+    def _put(self, data):
+        self.size += len(data)
+        if self.size + _TRAILER.size > self.limit:
+            self.abort()
+            return
+        self.crc = zlib.crc32(data, self.crc)
+        try:
+            self._f.write(data)
+        except OSError:
+            self.abort()
+
+    def commit(self):
+        """Замена записи; размер в байтах или None, если запись не сохранена"""
+        if self._f is None:
+            return None
+        self._put(self._z.flush())
+        if self._f is None:
+            return None
+        try:
+            self._f.write(_TRAILER.pack(self.size, self.crc))
+            self._f.close()
+            os.replace(self.tmp, self.path)
+        except OSError:
+            self.abort()
+            return None
+        self._f = None
+        return self.size + _TRAILER.size
+
+    def abort(self):
+        """Отказ от записи и удаление временного файла"""
+        if self._f is None:
+            return
+        self._f.close()
+        self._f = None
+        try:
+            os.remove(self.tmp)
+        except OSError:
+            pass
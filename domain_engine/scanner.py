@@ -0,0 +1,304 @@
+"""Ручной сканер кандидатов: альтернатива findall регулярных выражений режимов
+
+Вместо попытки сопоставления с каждой позиции текста сканер ищет точки
+(str.find - это memchr), от каждой точки расширяется влево и вправо по
+символам меток (lstrip/rstrip по набору символов, тоже без цикла Python)
+и применяет правила режима. Результат совпадает с MODE_PATTERNS[mode].findall
+символ в символ, включая возвраты regex: \\b в standard, необязательные
+https:// и www. в url, жадные цепочки меток. Проверка - дифференциальный
+прогон `python -m domain_engine.bench verify`.
+
+Четыре не-ASCII буквы, которые IGNORECASE сводит к [a-z] (İ ı ſ K), в блоке
+отправляют его целиком в regex: такие блоки редки, а правила для них
+разошлись бы с шаблонами.
+"""
+from .pipeline import MODE_PATTERNS
+
+# Режимы, для которых есть ручной сканер
+SCANNER_MODES = ("standard", "aggressive", "email", "url")
+
+_LETTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_ALNUM = _LETTERS + '0123456789'
+# Символы метки: буквы, цифры, дефис
+_LABEL = _ALNUM + '-'
+_ALNUM_SET = frozenset(_ALNUM)
+# Символы точечной цепочки и цепочки без букв (IP-адреса, метки времени, версии)
+_DOTTED = _LABEL + '.'
+_NO_LETTERS = '0123456789-.'
+_LABEL_SET = frozenset(_LABEL)
+
+# Метка DNS в standard и url: не длиннее 63 символов
+_MAX_LABEL = 63
+
+_CASEFOLD_SPECIALS = 'İıſK'
+
+_SCHEMES = ('http://', 'https://')
+
+
+def _is_word(ch):
+    """Символ \\w юникодного regex"""
+    return ch.isalnum() or ch == '_'
+
+
+def _run(text, j, chars, limit):
+    """Длина серии символов из chars с позиции j, но не больше limit"""
+    seg = text[j:j + limit]
+    return len(seg) - len(seg.lstrip(chars))
+
+
+def _span(text, j, chars):
+    """Конец серии символов из chars с позиции j (без ограничения длины)"""
+    while True:
+        n = _run(text, j, chars, 256)
+        j += n
+        if n < 256:
+            return j
+
+
+def _letterless(text, d):
+    """Конец точечной цепочки после точки d, если в ней нет ни одной буквы (иначе -1)
+
+    Все метки и зона любой цепочки, проходящей через d, лежат в этом отрезке,
+    а зоне нужны буквы: такие точки (IP-адреса, время) отбрасываются целиком.
+    """
+    end = _span(text, d + 1, _DOTTED)
+    return -1 if text[d + 1:end].strip(_NO_LETTERS) else end
+
+
+def _label_chain(text, d, strict):
+    """Начала сегментов после точки d: за каждой полной меткой с точкой - следующий
+
+    strict - метка DNS (1-63 символа, буква или цифра по краям), иначе любая
+    непустая серия символов метки (aggressive).
+    """
+    starts = [d + 1]
+    j = d + 1
+    while True:
+        if strict:
+            seg = text[j:j + _MAX_LABEL + 1]
+            n = len(seg) - len(seg.lstrip(_LABEL))
+            e = j + n
+            if not (0 < n <= _MAX_LABEL and text[j] in _ALNUM_SET and text[e - 1] in _ALNUM_SET):
+                return starts
+        else:
+            e = _span(text, j, _LABEL)
+            if e == j:
+                return starts
+        if not text.startswith('.', e):
+            return starts
+        j = e + 1
+        starts.append(j)
+
+
+def _tld_end(text, starts, boundary):
+    """Конец зоны [a-z]{2,} для самой длинной цепочки меток, где она есть (или -1)
+
+    boundary - после зоны нужна граница слова (\\b в standard).
+    """
+    for t in reversed(starts):
+        q = _span(text, t, _LETTERS)
+        if q - t < 2:
+            continue
+        if boundary and q < len(text) and _is_word(text[q]):
+            continue
+        return q
+    return -1
+
+
+class CandidateScanner:
+    """findall режима без регулярного выражения (для блоков со спецбуквами - regex)"""
+
+    def __init__(self, mode):
+        if mode not in SCANNER_MODES:
+            raise ValueError(f"нет сканера для режима {mode}")
+        self.mode = mode
+        self.pattern = MODE_PATTERNS[mode]
+        self._scan = getattr(self, f"_scan_{mode}")
+
+    def findall(self, text):
+        if any(ch in text for ch in _CASEFOLD_SPECIALS):
+            return self.pattern.findall(text)
+        return self._scan(text)
+
+    # === standard: \b(?:метка\.)+[a-z]{2,}\b ===
+    @staticmethod
+    def _scan_standard(text):
+        out = []
+        find = text.find
+        pos = 0
+        while True:
+            d = find('.', pos)
+            if d < 0:
+                return out
+            end = _letterless(text, d)
+            if end >= 0:
+                pos = end
+                continue
+            # Первая метка заканчивается на d: самое левое начало с \b перед ним
+            lo = max(pos, d - _MAX_LABEL)
+            seg = text[lo:d]
+            r = d - (len(seg) - len(seg.rstrip(_LABEL)))
+            p = -1
+            if r < d and text[d - 1] in _ALNUM_SET:
+                if text[r] in _ALNUM_SET and (r == 0 or not _is_word(text[r - 1])):
+                    p = r
+                else:
+                    # Внутри серии граница слова бывает только после дефиса
+                    k = find('-', r, d - 1)
+                    while k >= 0:
+                        if text[k + 1] in _ALNUM_SET:
+                            p = k + 1
+                            break
+                        k = find('-', k + 1, d - 1)
+            if p < 0:
+                pos = d + 1
+                continue
+            starts = _label_chain(text, d, True)
+            q = _tld_end(text, starts, True)
+            if q < 0:
+                # Точки внутри цепочки дают её же хвосты - они тоже без зоны
+                pos = starts[-1]
+                continue
+            out.append(text[p:q])
+            pos = q
+
+    # === aggressive: (?:[a-z0-9-]+\.)+[a-z]{2,}(?:\.[a-z]{2,})? ===
+    @staticmethod
+    def _scan_aggressive(text):
+        out = []
+        find = text.find
+        pos = 0
+        while True:
+            d = find('.', pos)
+            if d < 0:
+                return out
+            end = _letterless(text, d)
+            if end >= 0:
+                pos = end
+                continue
+            seg = text[pos:d]
+            r = d - (len(seg) - len(seg.rstrip(_LABEL)))
+            if r == d:
+                pos = d + 1
+                continue
+            starts = _label_chain(text, d, False)
+            q = _tld_end(text, starts, False)
+            if q < 0:
+                pos = starts[-1]
+                continue
+            if text.startswith('.', q):
+                q2 = _span(text, q + 1, _LETTERS)
+                if q2 - q - 1 >= 2:
+                    q = q2
+            out.append(text[r:q])
+            pos = q
+
+    # === url: (?:https?://)?(?:www\.)?(метка(?:\.метка)*\.[a-z]{2,}) ===
+    @staticmethod
+    def _group_end(text, g, cache):
+        """Конец группы url, начинающейся с g, или -1"""
+        if g >= len(text) or text[g] not in _ALNUM_SET:
+            return -1
+        n = _run(text, g, _LABEL, _MAX_LABEL + 1)
+        d = g + n
+        if n > _MAX_LABEL or text[d - 1] not in _ALNUM_SET or not text.startswith('.', d):
+            return -1
+        return CandidateScanner._suffix_end(text, d, cache)
+
+    @staticmethod
+    def _suffix_end(text, d, cache):
+        # Хвост после первой точки общий для всех начал группы: считается один раз
+        if d not in cache:
+            cache.clear()
+            starts = _label_chain(text, d, True)
+            cache[d] = (_tld_end(text, starts, False), starts)
+        return cache[d][0]
+
+    @staticmethod
+    def _scheme_before(text, i, pos):
+        """Начало https:// или http://, кончающегося на i (регистр любой), или -1"""
+        for scheme in _SCHEMES:
+            q = i - len(scheme)
+            if q >= pos and text[q:i].lower() == scheme:
+                return q
+        return -1
+
+    @classmethod
+    def _scan_url(cls, text):
+        out = []
+        find = text.find
+        pos = 0
+        cache = {}
+        while True:
+            d = find('.', pos)
+            if d < 0:
+                return out
+            end = _letterless(text, d)
+            if end >= 0:
+                pos = end
+                continue
+            lo = max(pos, d - _MAX_LABEL)
+            seg = text[lo:d]
+            r = d - (len(seg) - len(seg.rstrip(_LABEL)))
+            # Попытки с началом не правее d: (позиция, порядок в regex, начало группы)
+            attempts = []
+            if r < d and text[d - 1] in _ALNUM_SET:
+                first = r + (len(seg) - (r - lo) - len(seg[r - lo:].lstrip('-')))
+                if first < d:
+                    attempts.append((first, 3, first))
+                # Схема перед меткой: группа с начала серии
+                if text[r] in _ALNUM_SET and (r == 0 or text[r - 1] not in _LABEL_SET):
+                    q = cls._scheme_before(text, r, pos)
+                    if q >= 0:
+                        attempts.append((q, 1, r))
+            if d - 3 >= pos and text[d - 3:d].lower() == 'www':
+                attempts.append((d - 3, 2, d + 1))
+                q = cls._scheme_before(text, d - 3, pos)
+                if q >= 0:
+                    attempts.append((q, 0, d + 1))
+            end = -1
+            for _q, _order, g in sorted(attempts):
+                end = cls._group_end(text, g, cache)
+                if end >= 0:
+                    out.append(text[g:end])
+                    pos = end
+                    break
+            if end >= 0:
+                continue
+            if d in cache and cache[d][0] < 0:
+                # Цепочка меток без зоны: её точки дают те же хвосты; www. перед
+                # последней точкой ещё может начать группу после неё
+                pos = max(d + 1, cache[d][1][-1] - 4)
+            else:
+                pos = d + 1
+
+    # === email: [\w.-]+@([\w.-]+\.[a-z]{2,}) ===
+    @staticmethod
+    def _scan_email(text):
+        out = []
+        find = text.find
+        size = len(text)
+        pos = 0
+        while True:
+            a = find('@', pos)
+            if a < 0:
+                return out
+            # Локальная часть: непустая серия [\w.-] вплотную к @
+            if a <= pos or not (_is_word(text[a - 1]) or text[a - 1] in '.-'):
+                pos = a + 1
+                continue
+            e = a + 1
+            while e < size and (_is_word(text[e]) or text[e] in '.-'):
+                e += 1
+            # Самая правая точка, за которой две буквы, и хотя бы символ перед ней
+            k = text.rfind('.', a + 2, e)
+            while k >= 0:
+                if _run(text, k + 1, _LETTERS, 2) == 2:
+                    break
+                k = text.rfind('.', a + 2, k)
+            if k < 0:
+                pos = a + 1
+                continue
+            q = _span(text, k + 1, _LETTERS)
+            out.append(text[a + 1:q])
+            pos = q
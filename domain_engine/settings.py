@@ -0,0 +1,80 @@
+"""Неизменяемый снимок настроек обработки"""
+from dataclasses import dataclass, field, fields, replace
+
+
+def parse_tld_filter(text):
+    """Разбор строки фильтра TLD (".com, .ru") в множество зон"""
+    return frozenset(tld.strip().lower().lstrip('.') for tld in (text or '').split(',') if tld.strip())
+
+
+@dataclass(frozen=True)
+class ExtractionSettings:
+    """Снимок всех настроек задачи, снимается один раз перед запуском"""
+    # === Извлечение ===
+    extraction_mode: str = "standard"
+    strip_chars: str = "[](){}\"'<>"
+    min_length: int = 3
+    max_length: int = 255
+    validate_dns: bool = True
+    idn: str = "off"                    # off | punycode | unicode: юникодные домены и форма их вывода
+    extract_engine: str = "regex"       # regex | scanner: findall шаблона или ручной сканер точек
+    # === Фильтрация ===
+    selected_tlds: frozenset = field(default_factory=frozenset)
+    blacklist: tuple = ()
+    whitelist: tuple = ()
+    blacklist_files: tuple = ()
+    whitelist_files: tuple = ()
+    # === Форматирование ===
+    remove_www: bool = True
+    case_mode: str = "lower"
+    domain_format: str = "full"
+    use_advanced_mask: bool = False
+    advanced_mask: str = "https://{domain}"
+    prefix: str = ""
+    suffix: str = ""
+    # === Постобработка и экспорт ===
+    remove_duplicates: bool = True
+    dedup_mode: str = "exact"           # exact | approximate (Bloom + HyperLogLog)
+    approx_capacity: int = 2_000_000
+    approx_fp_rate: float = 0.01
+    sort_results: bool = False
+    heavy_hitters: bool = False         # top-K частых доменов: Count-Min Sketch в фиксированной памяти
+    heavy_hitters_k: int = 1000
+    heavy_hitters_mb: int = 16
+    export_format: str = "txt"
+    separator: str = "\\n"
+    # === Производительность ===
+    workers: int = 1
+    byte_scan: bool = True              # bytes-regex по mmap для ASCII-совместимых кодировок
+    memory_budget_mb: int = 512
+    result_cache: bool = True           # кэш проверенных кандидатов по файлам между запусками
+    result_cache_mb: int = 256
+    profile: bool = False               # cProfile задачи: .prof рядом с файлом вывода
+
+    @classmethod
+    def from_config(cls, config):
+        """Создание снимка из словаря в формате save_config"""
+        names = {f.name for f in fields(cls)}
+        values = {k: v for k, v in config.items() if k in names}
+        if 'blacklist' in config:
+            values['blacklist'] = tuple(config['blacklist'] or ())
+        if 'whitelist' in config:
+            values['whitelist'] = tuple(config['whitelist'] or ())
+        for key in ('blacklist_files', 'whitelist_files'):
+            if key in config:
+                values[key] = tuple(config[key] or ())
+        if 'tld_filter' in config:
+            values['selected_tlds'] = parse_tld_filter(config['tld_filter'])
+        elif 'selected_tlds' in values:
+            values['selected_tlds'] = frozenset(values['selected_tlds'])
+        for key in ('min_length', 'max_length', 'workers', 'memory_budget_mb', 'approx_capacity',
+                    'result_cache_mb', 'heavy_hitters_k', 'heavy_hitters_mb'):
+            if key in values:
+                values[key] = int(values[key])
+        if 'approx_fp_rate' in values:
+            values['approx_fp_rate'] = float(values['approx_fp_rate'])
+        return cls(**values)
+
+    def with_changes(self, **changes):
+        """Копия снимка с изменёнными полями"""
+        return replace(self, **changes)
@@ -0,0 +1,329 @@
+"""Вероятностные структуры: фильтр Блума, HyperLogLog и Count-Min Sketch"""
+import math
+from array import array
+from collections import Counter
+from hashlib import blake2b
+from operator import add
+
+_MASK64 = (1 << 64) - 1
+
+
+def hash64(value):
+    """Стабильный между процессами 64-битный хеш строки"""
+    return int.from_bytes(blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class BloomFilter:
+    """Фильтр Блума фиксированного размера для потоковой дедупликации"""
+
+    def __init__(self, capacity=2_000_000, fp_rate=0.01):
+        capacity = max(1, int(capacity))
+        fp_rate = min(max(float(fp_rate), 1e-9), 0.5)
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.size = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @property
+    def memory(self):
+        return len(self.bits)
+
+    def _positions(self, value):
+        digest = blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, value):
+        """Добавление; True, если значение (вероятно) встречено впервые"""
+        bits = self.bits
+        new = False
+        for pos in self._positions(value):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, value):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class HyperLogLog:
+    """Оценка числа уникальных значений в фиксированной памяти (2^p байт)"""
+
+    def __init__(self, precision=14):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        if self.m >= 128:
+            self.alpha = 0.7213 / (1 + 1.079 / self.m)
+        else:
+            self.alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(self.m, 0.673)
+
+    @property
+    def error(self):
+        """Относительная стандартная ошибка оценки"""
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, value):
+        self.add_hash(hash64(value))
+
+    def add_hash(self, x):
+        p = self.p
+        idx = x >> (64 - p)
+        w = x & ((1 << (64 - p)) - 1)
+        rank = (64 - p) - w.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other):
+        """Объединение с другим HLL той же точности"""
+        regs = self.registers
+        for i, r in enumerate(other.registers):
+            if r > regs[i]:
+                regs[i] = r
+
+    def estimate(self):
+        m = self.m
+        raw = self.alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        if raw <= 2.5 * m:
+            zeros = self.registers.count(0)
+            if zeros:
+                return m * math.log(m / zeros)
+        return raw
+
+    def __len__(self):
+        return int(round(self.estimate()))
+
+
+class CardinalityStats:
+    """HLL-оценки уникальных доменов: всего и по доменным зонам"""
+
+    def __init__(self, precision=14, tld_precision=10):
+        self.total = HyperLogLog(precision)
+        self.tld_precision = tld_precision
+        self.tlds = {}
+
+    def add(self, formatted, domain):
+        """Учёт отформатированного значения и исходного домена (для зоны)"""
+        self.total.add(formatted)
+        tld = domain.rpartition('.')[2]
+        hll = self.tlds.get(tld)
+        if hll is None:
+            hll = self.tlds[tld] = HyperLogLog(self.tld_precision)
+        hll.add(domain)
+
+    def merge(self, other):
+        self.total.merge(other.total)
+        for tld, hll in other.tlds.items():
+            mine = self.tlds.get(tld)
+            if mine is None:
+                self.tlds[tld] = hll
+            else:
+                mine.merge(hll)
+
+    def to_stats(self):
+        """Словарь для stats: оценки и относительные ошибки"""
+        tlds = {tld: len(hll) for tld, hll in self.tlds.items()}
+        return {
+            'unique': len(self.total),
+            'error': self.total.error,
+            'tld_unique': dict(sorted(tlds.items(), key=lambda kv: -kv[1])),
+            'tld_error': 1.04 / math.sqrt(1 << self.tld_precision),
+        }
+
+
+class CountMinSketch:
+    """Частоты в фиксированной памяти: оценка не ниже истинной и завышена
+    не больше чем на eps·N с вероятностью 1 - delta (N - сумма всех добавлений)"""
+
+    def __init__(self, width=1 << 18, depth=4):
+        self.width = max(16, int(width))
+        self.depth = max(1, int(depth))
+        self.table = array('Q', bytes(8 * self.width * self.depth))
+        self.total = 0
+
+    @classmethod
+    def for_memory(cls, memory_bytes, depth=4):
+        """Sketch, таблица которого занимает не больше memory_bytes"""
+        return cls(memory_bytes // (8 * depth), depth)
+
+    @property
+    def memory(self):
+        return self.table.itemsize * len(self.table)
+
+    @property
+    def eps(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+    def _positions(self, value):
+        digest = blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        width = self.width
+        return [i * width + (h1 + i * h2) % width for i in range(self.depth)]
+
+    def add(self, value, count=1):
+        """Добавление count вхождений; возвращает новую оценку частоты"""
+        table = self.table
+        self.total += count
+        estimate = None
+        for pos in self._positions(value):
+            table[pos] += count
+            if estimate is None or table[pos] < estimate:
+                estimate = table[pos]
+        return estimate
+
+    def estimate(self, value):
+        table = self.table
+        return min(table[pos] for pos in self._positions(value))
+
+    def error(self):
+        """Абсолютная граница завышения оценки: eps·N"""
+        return math.ceil(self.eps * self.total)
+
+    def merge(self, other):
+        """Объединение со sketch тех же размеров (счётчики складываются)"""
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("размеры Count-Min Sketch не совпадают")
+        self.table = array('Q', map(add, self.table, other.table))
+        self.total += other.total
+
+
+class HeavyHitters:
+    """Top-K частых значений в ограниченной памяти
+
+    Пока различных значений не больше EXACT_LIMIT, частоты считаются точно
+    (Counter); дальше - Count-Min Sketch на memory_mb и набор до 2·k
+    кандидатов: значение попадает в него, если его оценка выше k-й.
+    """
+
+    # Различных значений, до которых счёт точный
+    EXACT_LIMIT = 50_000
+
+    def __init__(self, k=1000, memory_mb=8, depth=4):
+        self.k = max(1, int(k))
+        self.memory_mb = memory_mb
+        self.depth = depth
+        self.exact = Counter()
+        self.sketch = None
+        self.candidates = {}
+        self.floor = 0
+
+    @property
+    def total(self):
+        return sum(self.exact.values()) if self.sketch is None else self.sketch.total
+
+    def update(self, counts):
+        """Учёт словаря {значение: число вхождений}"""
+        if self.sketch is None:
+            self.exact.update(counts)
+            if len(self.exact) <= self.EXACT_LIMIT:
+                return
+            counts, self.exact = self.exact, None
+            self.sketch = CountMinSketch.for_memory(int(self.memory_mb * 1048576), self.depth)
+        self._add(counts)
+
+    def _add(self, counts):
+        add_count = self.sketch.add
+        candidates = self.candidates
+        for value, n in counts.items():
+            estimate = add_count(value, n)
+            if estimate > self.floor or value in candidates:
+                candidates[value] = estimate
+                if len(candidates) > 2 * self.k:
+                    self._prune()
+
+    def _prune(self):
+        """Оставить k кандидатов с наибольшими оценками; k-я оценка - порог входа"""
+        estimate = self.sketch.estimate
+        ranked = sorted(((estimate(v), v) for v in self.candidates), reverse=True)[:self.k]
+        self.candidates = {v: n for n, v in ranked}
+        self.floor = ranked[-1][0] if len(ranked) >= self.k else 0
+
+    def merge(self, other):
+        if other.sketch is None:
+            self.update(other.exact)
+            return
+        if self.sketch is None:
+            exact = self.exact
+            self.exact = None
+            self.sketch = CountMinSketch(other.sketch.width, other.sketch.depth)
+            self._add(exact)
+        self.sketch.merge(other.sketch)
+        self.candidates.update(other.candidates)
+        self._prune()
+
+    def top(self):
+        """[(значение, частота)] по убыванию, не больше k"""
+        if self.sketch is None:
+            return self.exact.most_common(self.k)
+        estimate = self.sketch.estimate
+        ranked = sorted(((v, estimate(v)) for v in self.candidates), key=lambda kv: (-kv[1], kv[0]))
+        return ranked[:self.k]
+
+    def to_stats(self):
+        """Словарь для stats: top, сумма вхождений и граница ошибки оценок"""
+        exact = self.sketch is None
+        return {
+            'top': self.top(),
+            'total': self.total,
+            'exact': exact,
+            'error': 0 if exact else self.sketch.error(),
+            'confidence': 1.0 if exact else 1 - self.sketch.delta,
+            'memory': 0 if exact else self.sketch.memory,
+        }
+
+
+class HeavyHitterStats:
+    """Частые домены и регистрируемые домены за один проход (память делится поровну)"""
+
+    def __init__(self, k=1000, memory_mb=16, suffixes=None):
+        self.domains = HeavyHitters(k, memory_mb / 2)
+        self.registrable = HeavyHitters(k, memory_mb / 2)
+        self.suffixes = suffixes
+
+    def add(self, domains):
+        """Учёт пачки доменов; возвращает Counter пачки для повторного использования"""
+        counts = Counter(domains)
+        self.domains.update(counts)
+        if self.suffixes is None:
+            from .suffix import get_suffix_trie
+            self.suffixes = get_suffix_trie()
+        registrable_domain = self.suffixes.registrable_domain
+        registrable = Counter()
+        for domain, n in counts.items():
+            name = registrable_domain(domain)
+            if name is not None:
+                registrable[name] += n
+        self.registrable.update(registrable)
+        return counts
+
+    def merge(self, other):
+        self.domains.merge(other.domains)
+        self.registrable.merge(other.registrable)
+
+    def __getstate__(self):
+        # SuffixTrie не передаётся между процессами: в воркере берётся общий экземпляр
+        return {'domains': self.domains, 'registrable': self.registrable, 'suffixes': None}
+
+    def to_stats(self):
+        return {'domains': self.domains.to_stats(), 'registrable': self.registrable.to_stats()}
+
+
+def heavy_hitters_bound(entry):
+    """Подпись точности частот из HeavyHitters.to_stats() для отображения"""
+    if entry['exact']:
+        return "точно"
+    return f"оценка завышена не более чем на {entry['error']} с вероятностью {entry['confidence'] * 100:.1f}%"
@@ -0,0 +1,163 @@
+"""Public Suffix List: trie по меткам в обратном порядке и кэшируемый поиск"""
+import hashlib
+import marshal
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from .cache import cache_dir
+
+# Встроенная копия https://publicsuffix.org/list/public_suffix_list.dat
+PSL_PATH = Path(__file__).parent / 'data' / 'public_suffix_list.dat'
+
+# Флаги узла trie (хранятся под ключом '!', wildcard-потомок - под ключом '*')
+RULE = 1
+EXCEPTION = 2
+PRIVATE = 4
+
+_FLAG = '!'
+_WILDCARD = '*'
+
+
+def parse_psl(lines):
+    """Разбор текста PSL в trie из вложенных словарей"""
+    root = {}
+    private = False
+    for line in lines:
+        line = line.strip()
+        if line.startswith('//'):
+            if '===BEGIN PRIVATE DOMAINS===' in line:
+                private = True
+            elif '===END PRIVATE DOMAINS===' in line:
+                private = False
+            continue
+        if not line:
+            continue
+        rule = line.split()[0]
+        flag = RULE
+        if rule.startswith('!'):
+            rule = rule[1:]
+            flag = EXCEPTION
+        if private:
+            flag |= PRIVATE
+        forms = {rule.lower()}
+        try:
+            forms.add(rule.encode('idna').decode('ascii').lower())
+        except UnicodeError:
+            pass
+        for form in forms:
+            node = root
+            for label in reversed(form.split('.')):
+                node = node.setdefault(label, {})
+            node[_FLAG] = node.get(_FLAG, 0) | flag
+    return root
+
+
+def _compiled_path(source):
+    st = os.stat(source)
+    key = hashlib.sha1(f"{source}|{st.st_size}|{st.st_mtime_ns}".encode('utf-8')).hexdigest()[:16]
+    return cache_dir() / f"psl-{key}.marshal"
+
+
+def load_trie(source=PSL_PATH):
+    """Загрузка trie: из предкомпилированного кэша, иначе разбор и сохранение"""
+    try:
+        compiled = _compiled_path(source)
+        if compiled.exists():
+            with open(compiled, 'rb') as f:
+                return marshal.load(f)
+    except (OSError, ValueError, EOFError, TypeError):
+        compiled = None
+    with open(source, 'r', encoding='utf-8') as f:
+        trie = parse_psl(f)
+    if compiled is not None:
+        try:
+            tmp = compiled.with_suffix('.tmp')
+            with open(tmp, 'wb') as f:
+                marshal.dump(trie, f)
+            os.replace(tmp, compiled)
+        except OSError:
+            pass
+    return trie
+
+
+class SuffixTrie:
+    """Поиск публичного суффикса и регистрируемого домена за O(число меток)"""
+
+    def __init__(self, trie, include_private=False):
+        self.trie = trie
+        self.ignore = 0 if include_private else PRIVATE
+        # Глубина самого длинного правила: дальше этих меток смотреть не нужно
+        self.depth = self._max_depth(trie)
+        self.suffix_length = lru_cache(maxsize=65536)(self._suffix_length)
+
+    @classmethod
+    def _max_depth(cls, node):
+        children = [v for k, v in node.items() if k != _FLAG]
+        return 1 + max((cls._max_depth(c) for c in children), default=0) if children else 0
+
+    def _flag(self, node):
+        flag = node.get(_FLAG, 0)
+        return 0 if flag & self.ignore else flag
+
+    def _suffix_length(self, tail):
+        """Число меток публичного суффикса для хвоста домена (в нижнем регистре)"""
+        labels = tail.split('.')
+        node = self.trie
+        match = 1  # правило по умолчанию "*"
+        for i in range(len(labels) - 1, -1, -1):
+            depth = len(labels) - i
+            wild = node.get(_WILDCARD)
+            if wild is not None and self._flag(wild) & RULE:
+                match = max(match, depth)
+            node = node.get(labels[i])
+            if node is None:
+                break
+            flag = self._flag(node)
+            if flag & EXCEPTION:
+                # Исключение: суффикс - правило без самой левой метки
+                return depth - 1
+            if flag & RULE:
+                match = max(match, depth)
+        return match
+
+    def suffix_labels(self, domain):
+        """Число меток публичного суффикса домена (мемоизировано по хвосту)"""
+        tail = domain.lower().rsplit('.', self.depth)
+        if len(tail) > self.depth:
+            tail = tail[1:]
+        return self.suffix_length('.'.join(tail))
+
+    def public_suffix(self, domain):
+        """Публичный суффикс: co.uk для shop.example.co.uk"""
+        parts = domain.split('.')
+        return '.'.join(parts[-self.suffix_labels(domain):])
+
+    def registrable_domain(self, domain):
+        """Регистрируемый домен: example.co.uk для shop.example.co.uk (или None)"""
+        parts = domain.split('.')
+        n = self.suffix_labels(domain)
+        if len(parts) <= n:
+            return None
+        return '.'.join(parts[-n - 1:])
+
+
+_default = None
+
+
+def get_suffix_trie():
+    """Общий экземпляр SuffixTrie по встроенному списку (загружается один раз)"""
+    global _default
+    if _default is None:
+        _default = SuffixTrie(load_trie())
+    return _default
+
+
+def public_suffix(domain):
+    """Публичный суффикс домена по встроенному PSL"""
+    return get_suffix_trie().public_suffix(domain)
+
+
+def registrable_domain(domain):
+    """Регистрируемый домен по встроенному PSL"""
+    return get_suffix_trie().registrable_domain(domain)
@@ -1,17 +1,93 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext, Menu
-import re
+from tkinter import ttk, filedialog, messagebox, scrolledtext, Menu, font as tkfont
 from pathlib import Path
 import threading
+import queue
 import json
 import os
-import chardet
-from collections import deque, Counter
-import time
+from collections import Counter
 from datetime import datetime
 import csv
+from itertools import chain, islice
+from domain_engine import ExtractionSettings, ExtractionPipeline, is_valid_domain, match_pattern
+from domain_engine.settings import parse_tld_filter
+from domain_engine.encoding import EncodingDetector, Detection
+from domain_engine.parallel import plan_units, run_units, resolve_workers
+from domain_engine.collect import collect
+from domain_engine.progress import Progress, RateMeter, format_eta
+from domain_engine.jobs import Job, JobScheduler, JobCancelled, DONE, FAILED, CANCELLED, QUEUED, RUNNING, PAUSED
+from domain_engine.sketches import heavy_hitters_bound
+from domain_engine.exporters import export
+from domain_engine.history import HistoryStore
+from domain_engine.logbuffer import LogBuffer, coalesce
+from domain_engine.follow import Follower, ROTATED, TRUNCATED, MISSING, COMPRESSED
+from domain_engine.instrument import stage_rows, profiled, profile_path, REJECT_NAMES
+
+
+class VirtualList(ttk.Frame):
+    """Список, который отрисовывает только видимые строки"""
+
+    def __init__(self, parent, items, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.items = items
+        self.top = 0
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+        list_font = tkfont.Font(family="Consolas", size=9)
+        self.row_height = list_font.metrics('linespace') + 1
+        self.listbox = tk.Listbox(self, font=list_font, activestyle='none')
+        self.listbox.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.listbox.bind('<Configure>', lambda e: self.render())
+        self.listbox.bind('<MouseWheel>', lambda e: self.scroll_rows(-3 if e.delta > 0 else 3))
+        self.listbox.bind('<Button-4>', lambda e: self.scroll_rows(-3))
+        self.listbox.bind('<Button-5>', lambda e: self.scroll_rows(3))
+        self.listbox.bind('<Prior>', lambda e: self.scroll_rows(-self.rows()))
+        self.listbox.bind('<Next>', lambda e: self.scroll_rows(self.rows()))
+
+    def rows(self):
+        return max(1, self.listbox.winfo_height() // self.row_height)
+
+    def render(self):
+        total = len(self.items)
+        rows = self.rows()
+        self.top = max(0, min(self.top, total - rows))
+        visible = self.items[self.top:self.top + rows]
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *(f"{i:>8}. {d}" for i, d in enumerate(visible, self.top + 1)))
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + rows) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_rows(self, delta):
+        self.top += delta
+        self.render()
+        return "break"
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == tk.MOVETO:
+            self.top = int(float(amount) * len(self.items))
+            self.render()
+        elif unit == tk.PAGES:
+            self.scroll_rows(int(amount) * self.rows())
+        else:
+            self.scroll_rows(int(amount))
+
 
 class DomainExtractorApp:
+    # Лог: период опроса очереди (мс), записей за один проход, предел отставания
+    LOG_POLL_MS = 100
+    LOG_BATCH = 2000
+    LOG_BACKLOG = 50000
+    # Период обновления прогресса, скорости и ETA (мс)
+    PROGRESS_POLL_MS = 250
+    # Период обновления панели очереди задач (мс)
+    JOBS_POLL_MS = 500
+    JOB_STATUS = {QUEUED: "В очереди", RUNNING: "Выполняется", PAUSED: "Пауза",
+                  DONE: "Готово", FAILED: "Ошибка", CANCELLED: "Отменена"}
+
     def __init__(self, root):
         self.root = root
         self.root.title("Domain Extractor Pro v3.0")
@@ -26,6 +102,9 @@ class DomainExtractorApp:
         self.domain_format = tk.StringVar(value="full")
         self.remove_www = tk.BooleanVar(value=True)
         self.remove_duplicates = tk.BooleanVar(value=True)
+        self.dedup_mode = tk.StringVar(value="exact")
+        self.approx_capacity = tk.IntVar(value=2000000)
+        self.approx_fp_rate = tk.DoubleVar(value=0.01)
         self.sort_results = tk.BooleanVar(value=False)
         self.selected_tlds = set()
         self.export_format = tk.StringVar(value="txt")
@@ -41,17 +120,37 @@ class DomainExtractorApp:
         self.case_mode = tk.StringVar(value="lower")
         self.blacklist_patterns = []
         self.whitelist_patterns = []
+        self.blacklist_files = []
+        self.whitelist_files = []
         self.extraction_mode = tk.StringVar(value="standard")
+        self.idn = tk.StringVar(value="off")
+        self.extract_engine = tk.StringVar(value="regex")
+        self.workers = tk.IntVar(value=1)
+        self.memory_budget_mb = tk.IntVar(value=512)
+        self.result_cache = tk.BooleanVar(value=True)
+        self.result_cache_mb = tk.IntVar(value=256)
+        self.profile = tk.BooleanVar(value=False)
+        self.heavy_hitters = tk.BooleanVar(value=False)
+        self.heavy_hitters_k = tk.IntVar(value=1000)
+        self.heavy_hitters_mb = tk.IntVar(value=16)
        
         # История операций
-        self.history = []
+        self.history = HistoryStore()
         self.max_history = 10
+        self.history_mb = tk.IntVar(value=512)
         # Очередь задач
-        self.task_queue = deque()
-        self.is_processing = False
+        self.max_jobs = tk.IntVar(value=2)
+        self.scheduler = JobScheduler(self.start_job, max_running=2)
+        self.active_progress = None
+        # Кодировки файлов кэшируются на диске между запусками
+        self.encoding_detector = EncodingDetector()
        
         # Статистика
         self.stats = {}
+        # Лог: записи из любых потоков копятся в очереди и переносятся в виджет пачками
+        self.log_queue = queue.SimpleQueue()
+        self.log_buffer = LogBuffer()
+        self.log_max_lines = tk.IntVar(value=5000)
         # Настройки
         self.config_file = "domain_extractor_config_v3.json"
         self.load_config()
@@ -63,6 +162,8 @@ class DomainExtractorApp:
         self.root.bind("<F5>", lambda e: self.process_file())
         self.root.bind("<Control-f>", lambda e: self.focus_search())
         self.root.bind("<Control-z>", lambda e: self.undo_last())
+        self.root.after(self.LOG_POLL_MS, self.drain_log)
+        self.root.after(self.JOBS_POLL_MS, self.refresh_jobs)
 
     def create_widgets(self):
         # === Меню ===
@@ -108,6 +209,10 @@ class DomainExtractorApp:
         log_tab = ttk.Frame(notebook, padding="10")
         notebook.add(log_tab, text="Лог и результаты")
         self.create_log_tab(log_tab)
+        # === Вкладка 4: Очередь задач ===
+        jobs_tab = ttk.Frame(notebook, padding="10")
+        notebook.add(jobs_tab, text="Очередь задач")
+        self.create_jobs_tab(jobs_tab)
         # === Статус ===
         status_frame = ttk.Frame(self.root)
         status_frame.pack(fill=tk.X, padx=5, pady=2)
@@ -166,6 +271,16 @@ class DomainExtractorApp:
             rb = ttk.Radiobutton(extract_frame, text=text, variable=self.extraction_mode, value=val)
             rb.grid(row=i, column=0, sticky=tk.W, padx=5, pady=2)
             ttk.Label(extract_frame, text=desc, foreground="gray").grid(row=i, column=1, sticky=tk.W, padx=10)
+        ttk.Label(extract_frame, text="IDN (пример.рф):").grid(row=len(modes), column=0, sticky=tk.W, padx=5, pady=2)
+        idn_frame = ttk.Frame(extract_frame)
+        idn_frame.grid(row=len(modes), column=1, sticky=tk.W, padx=5)
+        for text, val in [("Выключено", "off"), ("Punycode", "punycode"), ("Юникод", "unicode")]:
+            ttk.Radiobutton(idn_frame, text=text, variable=self.idn, value=val).pack(side=tk.LEFT, padx=5)
+        ttk.Label(extract_frame, text="Движок:").grid(row=len(modes) + 1, column=0, sticky=tk.W, padx=5, pady=2)
+        engine_frame = ttk.Frame(extract_frame)
+        engine_frame.grid(row=len(modes) + 1, column=1, sticky=tk.W, padx=5)
+        for text, val in [("Regex", "regex"), ("Сканер точек", "scanner")]:
+            ttk.Radiobutton(engine_frame, text=text, variable=self.extract_engine, value=val).pack(side=tk.LEFT, padx=5)
         row += 1
         # === Формат вывода ===
         format_frame = ttk.LabelFrame(parent, text="Формат вывода", padding="10")
@@ -214,6 +329,8 @@ class DomainExtractorApp:
                    style="Accent.TButton", width=20).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="👁 Предпросмотр", command=self.preview_results,
                    width=15).pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="📡 Слежение", command=self.follow_files,
+                   width=15).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="🧹 Очистить лог", command=self.clear_log,
                    width=15).pack(side=tk.LEFT, padx=5)
 
@@ -263,7 +380,7 @@ class DomainExtractorApp:
         self.tld_entry.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=5)
         self.tld_entry.insert(0, ".com, .ru, .org, .net")
         ttk.Button(tld_entry_frame, text="Применить", command=self.update_tld_filter).grid(row=0, column=1, padx=2)
-        ttk.Label(tld_frame, text="Поддержка двухуровневых TLD: .co.uk, .com.au и т.д.",
+        ttk.Label(tld_frame, text="Зоны по Public Suffix List: .co.uk, .com.au и т.д.",
                  foreground="gray").grid(row=1, column=0, sticky=tk.W, padx=5)
         row += 1
         # === Чёрный/Белый списки ===
@@ -279,6 +396,83 @@ class DomainExtractorApp:
         ttk.Button(lists_info, text="Настроить", command=self.manage_whitelist).pack(side=tk.LEFT, padx=5)
         ttk.Label(lists_frame, text="Используйте * как wildcard: google.*, *.example.com",
                  foreground="gray").pack(anchor=tk.W, padx=5, pady=2)
+        row += 1
+        # === Производительность ===
+        perf_frame = ttk.LabelFrame(parent, text="Производительность", padding="10")
+        perf_frame.grid(row=row, column=0, sticky=(tk.W, tk.E), pady=5)
+        ttk.Label(perf_frame, text="Процессов:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
+        ttk.Spinbox(perf_frame, from_=0, to=256, textvariable=self.workers, width=10).grid(
+            row=0, column=1, sticky=tk.W, padx=5)
+        ttk.Label(perf_frame, text="1 - последовательно, 0 - по числу ядер; большие файлы делятся на части",
+                  foreground="gray").grid(row=1, column=0, columnspan=2, sticky=tk.W, padx=5)
+        ttk.Label(perf_frame, text="Память для сортировки (МБ):").grid(row=2, column=0, sticky=tk.W, padx=5, pady=5)
+        ttk.Spinbox(perf_frame, from_=16, to=65536, increment=64, textvariable=self.memory_budget_mb,
+                    width=10).grid(row=2, column=1, sticky=tk.W, padx=5)
+        ttk.Label(perf_frame, text="При превышении дедупликация и сортировка идут через временные файлы",
+                  foreground="gray").grid(row=3, column=0, columnspan=2, sticky=tk.W, padx=5)
+        ttk.Label(perf_frame, text="Дедупликация:").grid(row=4, column=0, sticky=tk.W, padx=5, pady=5)
+        dedup_frame = ttk.Frame(perf_frame)
+        dedup_frame.grid(row=4, column=1, sticky=tk.W)
+        for text, val in [("Точная", "exact"), ("Приближённая (Bloom + HLL)", "approximate")]:
+            ttk.Radiobutton(dedup_frame, text=text, variable=self.dedup_mode, value=val).pack(side=tk.LEFT, padx=5)
+        ttk.Label(perf_frame, text="Ёмкость / доля ложных:").grid(row=5, column=0, sticky=tk.W, padx=5, pady=5)
+        approx_frame = ttk.Frame(perf_frame)
+        approx_frame.grid(row=5, column=1, sticky=tk.W)
+        ttk.Entry(approx_frame, textvariable=self.approx_capacity, width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Entry(approx_frame, textvariable=self.approx_fp_rate, width=8).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(perf_frame, text="Кэш результатов по файлам (МБ):",
+                        variable=self.result_cache).grid(row=6, column=0, sticky=tk.W, padx=5, pady=5)
+        ttk.Spinbox(perf_frame, from_=16, to=65536, increment=64, textvariable=self.result_cache_mb,
+                    width=10).grid(row=6, column=1, sticky=tk.W, padx=5)
+        ttk.Label(perf_frame, text="Неизменённые файлы не перечитываются, пока не меняются режим, "
+                                   "очистка символов, длины и проверка DNS",
+                  foreground="gray").grid(row=7, column=0, columnspan=2, sticky=tk.W, padx=5)
+        ttk.Label(perf_frame, text="История отмены на диске (МБ):").grid(row=8, column=0, sticky=tk.W, padx=5, pady=5)
+        ttk.Spinbox(perf_frame, from_=0, to=65536, increment=64, textvariable=self.history_mb,
+                    width=10).grid(row=8, column=1, sticky=tk.W, padx=5)
+        ttk.Checkbutton(perf_frame, text="Профилировать задачу (cProfile, файл .prof рядом с результатом)",
+                        variable=self.profile).grid(row=9, column=0, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        ttk.Checkbutton(perf_frame, text="Частые домены (топ-K / МБ):",
+                        variable=self.heavy_hitters).grid(row=10, column=0, sticky=tk.W, padx=5, pady=5)
+        hitters_frame = ttk.Frame(perf_frame)
+        hitters_frame.grid(row=10, column=1, sticky=tk.W)
+        ttk.Spinbox(hitters_frame, from_=10, to=100000, increment=100, textvariable=self.heavy_hitters_k,
+                    width=8).pack(side=tk.LEFT, padx=5)
+        ttk.Spinbox(hitters_frame, from_=1, to=4096, increment=8, textvariable=self.heavy_hitters_mb,
+                    width=6).pack(side=tk.LEFT, padx=5)
+        ttk.Label(perf_frame, text="Частоты доменов и регистрируемых доменов: Count-Min Sketch, "
+                                   "погрешность оценок показывается в статистике",
+                  foreground="gray").grid(row=11, column=0, columnspan=2, sticky=tk.W, padx=5)
+
+    def create_jobs_tab(self, parent):
+        parent.columnconfigure(0, weight=1)
+        parent.rowconfigure(1, weight=1)
+        # === Управление ===
+        control_frame = ttk.Frame(parent)
+        control_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=5)
+        ttk.Button(control_frame, text="⏸ Пауза", command=lambda: self.control_jobs(self.scheduler.pause)).pack(
+            side=tk.LEFT, padx=2)
+        ttk.Button(control_frame, text="▶ Продолжить", command=lambda: self.control_jobs(self.scheduler.resume)).pack(
+            side=tk.LEFT, padx=2)
+        ttk.Button(control_frame, text="⏹ Отменить", command=lambda: self.control_jobs(self.scheduler.cancel)).pack(
+            side=tk.LEFT, padx=2)
+        ttk.Button(control_frame, text="Очистить завершённые", command=self.clear_finished_jobs).pack(
+            side=tk.LEFT, padx=2)
+        ttk.Spinbox(control_frame, from_=1, to=16, textvariable=self.max_jobs, width=5,
+                    command=self.update_max_jobs).pack(side=tk.RIGHT, padx=2)
+        ttk.Label(control_frame, text="Одновременно задач:").pack(side=tk.RIGHT, padx=5)
+        # === Список задач ===
+        columns = ("kind", "files", "priority", "status", "elapsed")
+        self.jobs_tree = ttk.Treeview(parent, columns=columns, show="tree headings", selectmode="extended")
+        self.jobs_tree.heading("#0", text="№")
+        self.jobs_tree.column("#0", width=60, stretch=False)
+        for col, text, width in [("kind", "Тип", 120), ("files", "Файлов", 80), ("priority", "Приоритет", 90),
+                                 ("status", "Статус", 120), ("elapsed", "Время", 100)]:
+            self.jobs_tree.heading(col, text=text)
+            self.jobs_tree.column(col, width=width)
+        self.jobs_tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        ttk.Label(parent, text="Предпросмотр выполняется раньше экспорта; пауза и отмена срабатывают "
+                               "между блоками данных", foreground="gray").grid(row=2, column=0, sticky=tk.W, pady=5)
 
     def create_log_tab(self, parent):
         parent.columnconfigure(0, weight=1)
@@ -294,6 +488,9 @@ class DomainExtractorApp:
         self.search_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=5)
         ttk.Button(search_frame, text="Найти", command=self.search_log).grid(row=0, column=2, padx=2)
         ttk.Button(search_frame, text="Найти далее", command=self.search_next).grid(row=0, column=3, padx=2)
+        ttk.Label(search_frame, text="Строк в логе:").grid(row=0, column=4, padx=5)
+        ttk.Spinbox(search_frame, from_=100, to=1000000, increment=1000, textvariable=self.log_max_lines,
+                    width=9).grid(row=0, column=5, padx=2)
         # === Лог ===
         log_frame = ttk.Frame(parent)
         log_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -318,7 +515,8 @@ class DomainExtractorApp:
     def browse_input(self):
         files = filedialog.askopenfilenames(
             title="Выберите входные файлы",
-            filetypes=[("Текстовые файлы", "*.txt *.log *.csv *.html"), ("Все файлы", "*.*")]
+            filetypes=[("Текстовые файлы", "*.txt *.log *.csv *.html"),
+                       ("Сжатые файлы", "*.gz *.bz2 *.xz *.zst"), ("Все файлы", "*.*")]
         )
         for f in files:
             if f not in self.input_files:
@@ -349,336 +547,199 @@ class DomainExtractorApp:
 
     def update_tld_filter(self):
         text = self.tld_entry.get().strip()
-        self.selected_tlds = {tld.strip().lower().lstrip('.') for tld in text.split(',') if tld.strip()}
+        self.selected_tlds = parse_tld_filter(text)
         self.log(f"✓ Фильтр TLD обновлён: {', '.join('.' + t for t in self.selected_tlds) or 'отключён'}", "info")
 
+    def snapshot_settings(self):
+        """Снимок текущих настроек (вызывать из главного потока)"""
+        return ExtractionSettings(
+            extraction_mode=self.extraction_mode.get(),
+            idn=self.idn.get(),
+            extract_engine=self.extract_engine.get(),
+            strip_chars=self.strip_chars.get(),
+            min_length=self.min_length.get(),
+            max_length=self.max_length.get(),
+            validate_dns=self.validate_dns.get(),
+            selected_tlds=frozenset(self.selected_tlds),
+            blacklist=tuple(self.blacklist_patterns),
+            whitelist=tuple(self.whitelist_patterns),
+            blacklist_files=tuple(self.blacklist_files),
+            whitelist_files=tuple(self.whitelist_files),
+            remove_www=self.remove_www.get(),
+            case_mode=self.case_mode.get(),
+            domain_format=self.domain_format.get(),
+            use_advanced_mask=self.use_advanced_mask.get(),
+            advanced_mask=self.advanced_mask.get(),
+            prefix=self.prefix.get(),
+            suffix=self.suffix.get(),
+            remove_duplicates=self.remove_duplicates.get(),
+            dedup_mode=self.dedup_mode.get(),
+            approx_capacity=self.approx_capacity.get(),
+            approx_fp_rate=self.approx_fp_rate.get(),
+            heavy_hitters=self.heavy_hitters.get(),
+            heavy_hitters_k=self.heavy_hitters_k.get(),
+            heavy_hitters_mb=self.heavy_hitters_mb.get(),
+            sort_results=self.sort_results.get(),
+            export_format=self.export_format.get(),
+            separator=self.separator.get(),
+            workers=self.workers.get(),
+            memory_budget_mb=self.memory_budget_mb.get(),
+            result_cache=self.result_cache.get(),
+            result_cache_mb=self.result_cache_mb.get(),
+            profile=self.profile.get(),
+        )
+
     def extract_domains(self, text):
-        """Улучшенное извлечение доменов с учётом режима"""
-        mode = self.extraction_mode.get()
-       
-        # Удаление символов из strip_chars
-        for char in self.strip_chars.get():
-            text = text.replace(char, ' ')
-       
-        domains = []
-       
-        if mode == "standard":
-            # Стандартный режим - основные домены
-            pattern = r'\b(?:[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]{2,}\b'
-            domains = re.findall(pattern, text, re.IGNORECASE)
-           
-        elif mode == "aggressive":
-            # Агрессивный - включая поддомены и IDN
-            pattern = r'(?:[a-zA-Z0-9\-]+\.)+[a-zA-Z]{2,}(?:\.[a-zA-Z]{2,})?'
-            domains = re.findall(pattern, text, re.IGNORECASE)
-           
-        elif mode == "email":
-            # Извлечение из email
-            pattern = r'[\w\.-]+@([\w\.-]+\.[a-zA-Z]{2,})'
-            domains = re.findall(pattern, text, re.IGNORECASE)
-           
-        elif mode == "url":
-            # Из URL
-            pattern = r'(?:https?://)?(?:www\.)?([a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*\.[a-zA-Z]{2,})'
-            domains = re.findall(pattern, text, re.IGNORECASE)
-       
-        # Очистка и валидация
-        valid_domains = []
-        for d in domains:
-            d = d.lower().strip('.-')
-           
-            # Проверка длины
-            if len(d) < self.min_length.get() or len(d) > self.max_length.get():
-                continue
-           
-            # Проверка наличия точки
-            if '.' not in d:
-                continue
-           
-            # Валидация DNS
-            if self.validate_dns.get() and not self.is_valid_domain(d):
-                continue
-           
-            # Проверка TLD
-            if self.selected_tlds:
-                parts = d.split('.')
-                tld = parts[-1]
-                # Поддержка двухуровневых TLD
-                if len(parts) > 2:
-                    tld2 = '.'.join(parts[-2:])
-                    if tld not in self.selected_tlds and tld2 not in self.selected_tlds:
-                        continue
-                elif tld not in self.selected_tlds:
-                    continue
-           
-            # Чёрный список
-            if self.is_blacklisted(d):
-                continue
-           
-            # Белый список (если задан, пропускаем только совпадения)
-            if self.whitelist_patterns and not self.is_whitelisted(d):
-                continue
-           
-            valid_domains.append(d)
-       
-        return valid_domains
+        """Извлечение доменов с текущими настройками"""
+        return ExtractionPipeline(self.snapshot_settings()).run(text)
 
     def is_valid_domain(self, domain):
         """Валидация структуры домена"""
-        if not domain or len(domain) > 253:
-            return False
-       
-        # Проверка на недопустимые символы
-        if re.search(r'[^a-z0-9\.\-]', domain):
-            return False
-       
-        # Проверка частей домена
-        parts = domain.split('.')
-        if len(parts) < 2:
-            return False
-       
-        for part in parts:
-            if not part or len(part) > 63:
-                return False
-            if part.startswith('-') or part.endswith('-'):
-                return False
-       
-        return True
-
-    def is_blacklisted(self, domain):
-        """Проверка на чёрный список"""
-        for pattern in self.blacklist_patterns:
-            if self.match_pattern(domain, pattern):
-                return True
-        return False
-
-    def is_whitelisted(self, domain):
-        """Проверка на белый список"""
-        for pattern in self.whitelist_patterns:
-            if self.match_pattern(domain, pattern):
-                return True
-        return False
+        return is_valid_domain(domain)
 
     def match_pattern(self, domain, pattern):
         """Сопоставление домена с паттерном (поддержка wildcard)"""
-        pattern = pattern.replace('.', r'\.')
-        pattern = pattern.replace('*', '.*')
-        pattern = f'^{pattern}$'
-        return bool(re.match(pattern, domain, re.IGNORECASE))
+        return match_pattern(domain, pattern)
 
     def format_domain(self, domain):
-        """Форматирование домена с учётом всех настроек"""
-        original = domain
-       
-        # Удаление www
-        if self.remove_www.get() and domain.startswith('www.'):
-            domain = domain[4:]
-       
-        # Регистр
-        case_mode = self.case_mode.get()
-        if case_mode == "lower":
-            domain = domain.lower()
-        elif case_mode == "upper":
-            domain = domain.upper()
-       
-        # Формат домена
-        parts = domain.split('.')
-        fmt = self.domain_format.get()
-       
-        if fmt == "no_tld" and len(parts) > 1:
-            domain = '.'.join(parts[:-1])
-        elif fmt == "only_tld" and len(parts) > 1:
-            domain = '.' + parts[-1]
-        elif fmt == "sld" and len(parts) >= 2:
-            # Second-level domain (example из example.com)
-            domain = parts[-2]
-       
-        # Продвинутая маска
-        if self.use_advanced_mask.get():
-            mask = self.advanced_mask.get()
-           
-            # Подготовка переменных для шаблона
-            full_domain = original
-            name = '.'.join(parts[:-1]) if len(parts) > 1 else parts[0]
-            tld = parts[-1] if len(parts) > 1 else ''
-            sld = parts[-2] if len(parts) >= 2 else ''
-            subdomain = '.'.join(parts[:-2]) if len(parts) > 2 else ''
-           
-            # Замена переменных
-            result = mask.replace('{domain}', domain)
-            result = result.replace('{name}', name)
-            result = result.replace('{tld}', tld)
-            result = result.replace('{sld}', sld)
-            result = result.replace('{subdomain}', subdomain)
-            result = result.replace('{full}', full_domain)
-           
-            return result
-       
-        # Простой префикс/суффикс
-        return self.prefix.get() + domain + self.suffix.get()
+        """Форматирование домена с текущими настройками"""
+        return ExtractionPipeline(self.snapshot_settings()).format(domain)
 
     def detect_encoding(self, filepath):
-        """Определение кодировки файла"""
+        """Определение кодировки файла (BOM, UTF-8, детектор; с кэшем)"""
         try:
-            with open(filepath, 'rb') as f:
-                raw = f.read(100000)
-                result = chardet.detect(raw)
-                return result['encoding'] or 'utf-8'
-        except:
-            return 'utf-8'
+            return self.encoding_detector.detect(filepath)
+        except Exception:
+            return Detection('utf-8', 'fallback', 0.0)
+
+    def process_domains(self, input_paths, output_path=None, preview_mode=False, preview_limit=100000, settings=None,
+                        control=None):
+        """Основная обработка доменов (control - пауза и отмена задачи)
 
-    def process_domains(self, input_paths, output_path=None, preview_mode=False, preview_limit=100):
-        """Основная обработка доменов"""
+        Результат собирает движок (domain_engine.collect); здесь - кодировки, план работ,
+        прогресс, экспорт с записью в историю и диалоги.
+        """
+        domains = None
+        progress = None
         try:
-            start_time = time.time()
-            total_domains = 0
-            all_formatted = []
-            stats = {
-                'files_processed': 0,
-                'raw_domains': 0,
-                'valid_domains': 0,
-                'filtered_out': 0,
-                'duplicates_removed': 0,
-                'final_count': 0,
-                'tld_distribution': Counter(),
-                'processing_time': 0
-            }
+            settings = settings or self.snapshot_settings()
             self.log("=" * 70, "header")
             self.log(f"🚀 НАЧАЛО ОБРАБОТКИ - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", "header")
             self.log("=" * 70, "header")
-            for idx, path in enumerate(input_paths):
-                self.log(f"\n[{idx+1}/{len(input_paths)}] 📄 Обработка: {Path(path).name}")
-               
-                # Определение кодировки
-                encoding = self.detect_encoding(path)
-                self.log(f" ℹ Кодировка: {encoding}", "info")
-               
-                # Чтение файла
-                with open(path, 'r', encoding=encoding, errors='ignore') as f:
-                    content = f.read()
-                # Извлечение доменов
-                domains = self.extract_domains(content)
-                raw_count = len(domains)
-                stats['raw_domains'] += raw_count
-               
-                self.log(f" ✓ Извлечено доменов: {raw_count}", "success")
-                # Форматирование
-                formatted = [self.format_domain(d) for d in domains]
-                all_formatted.extend(formatted)
-                total_domains += len(domains)
-               
-                # Статистика TLD
-                for d in domains:
-                    tld = d.split('.')[-1]
-                    stats['tld_distribution'][tld] += 1
-                stats['files_processed'] += 1
-                # Прогресс
-                progress = (idx + 1) / len(input_paths) * 100
-                self.root.after(0, self.progress.configure, {'value': progress})
-            if not all_formatted:
+            # Определение кодировок и план работ
+            detections = [self.detect_encoding(path) for path in input_paths]
+            self.encoding_detector.save()
+            encodings = [d.encoding for d in detections]
+            cached = sum(d.tier == 'cache' for d in detections)
+            encoding_time = sum(d.elapsed for d in detections)
+            self.log(f" ⚙ Определение кодировок: {encoding_time * 1000:.1f} мс, "
+                     f"из кэша {cached} из {len(detections)}", "info")
+            for path, detection in zip(input_paths, detections):
+                self.log(f" ℹ {Path(path).name}: кодировка {detection.encoding} "
+                         f"({detection.tier}, {detection.elapsed * 1000:.1f} мс)", "info")
+            workers = resolve_workers(settings.workers)
+            units = plan_units(input_paths, encodings, workers)
+            last_unit = {u.file_index: u.index for u in units}
+            if workers > 1:
+                self.log(f" ⚙ Параллельный режим: {workers} процессов, частей: {len(units)}", "info")
+            # Прогресс по байтам файлов на диске (для сжатых - по сжатым байтам):
+            # воркеры пополняют счётчики, главный поток опрашивает их по таймеру
+            total_bytes = sum(u.size for u in units)
+            progress = Progress(total_bytes)
+            self.active_progress = progress
+            self.root.after(0, self.poll_progress, progress, RateMeter(total_bytes))
+
+            def file_results():
+                for result in run_units(units, settings, workers, progress, control):
+                    # Время определения кодировок - в первый результат
+                    result['encoding_time'] = encoding_time if not result['index'] else 0.0
+                    idx = result['file_index']
+                    yield idx, result, last_unit[idx] == result['index']
+
+            domains, stats = collect(file_results(), input_paths, settings, self.log)
+            self.stats = stats
+            results = control.guard(domains) if control is not None else domains
+            # Пустой результат виден по первому домену: пустой файл не записывается
+            first = next(results, None)
+            if first is None:
                 self.log("\n⚠ Домены не найдены!", "warning")
-                messagebox.showwarning("Предупреждение", "Домены не найдены ни в одном файле.")
+                self.root.after(0, messagebox.showwarning, "Предупреждение", "Домены не найдены ни в одном файле.")
                 return
-            stats['valid_domains'] = len(all_formatted)
-            # Удаление дубликатов
-            if self.remove_duplicates.get():
-                orig = len(all_formatted)
-                all_formatted = list(dict.fromkeys(all_formatted))
-                removed = orig - len(all_formatted)
-                stats['duplicates_removed'] = removed
-                self.log(f"\n🗑 Удалено дубликатов: {removed}", "info")
-            # Сортировка
-            if self.sort_results.get():
-                all_formatted.sort()
-                self.log("📊 Результаты отсортированы", "info")
-            stats['final_count'] = len(all_formatted)
-            stats['processing_time'] = time.time() - start_time
-            self.stats = stats
+            results = chain((first,), results)
             # Предпросмотр
             if preview_mode:
-                self.show_preview(all_formatted, preview_limit, stats)
+                self.show_preview(results, preview_limit, stats)
                 return
-            # Экспорт
-            self.export_results(all_formatted, output_path, stats)
-           
-            # Сохранение в историю
-            self.history.append({
-                'timestamp': datetime.now().isoformat(),
-                'domains': all_formatted.copy(),
-                'stats': stats.copy()
-            })
-            if len(self.history) > self.max_history:
-                self.history.pop(0)
+            # Экспорт с попутной записью в историю (сжатый файл на диске);
+            # время экспорта движок считает по мере выдачи доменов
+            with self.history.record() as record:
+                record.stats = stats
+                self.export_results(record.tee(results), output_path, stats, settings)
+            if record.broken:
+                self.log("ℹ Результат содержит переводы строк и не сохранён для отмены", "info")
+            elif not record.saved:
+                self.log("ℹ Результат больше лимита истории и не сохранён для отмены", "info")
            
             # Отображение статистики
-            self.display_stats(stats)
+            self.root.after(0, self.display_stats, stats)
            
             self.log("\n" + "=" * 70, "header")
             self.log(f"✅ ОБРАБОТКА ЗАВЕРШЕНА за {stats['processing_time']:.2f} сек", "success")
             self.log("=" * 70, "header")
            
-            messagebox.showinfo("Готово",
-                f"Обработано файлов: {stats['files_processed']}\n"
-                f"Уникальных доменов: {stats['final_count']}\n"
-                f"Время: {stats['processing_time']:.2f} сек")
+            # Диалоги - только из главного потока: задача выполняется в потоке run_job
+            self.root.after(0, messagebox.showinfo, "Готово",
+                            f"Обработано файлов: {stats['files_processed']}\n"
+                            f"Уникальных доменов: {stats['final_count']}\n"
+                            f"Время: {stats['processing_time']:.2f} сек")
+        except JobCancelled:
+            raise
         except Exception as e:
             self.log(f"\n❌ ОШИБКА: {e}", "error")
-            messagebox.showerror("Ошибка", str(e))
+            self.root.after(0, messagebox.showerror, "Ошибка", str(e))
+            raise
         finally:
-            self.root.after(0, self.progress.configure, {'value': 0})
-            self.root.after(0, self.update_status, "Готово")
-            self.is_processing = False
-            self.process_queue()
+            # Незакрытый итератор движка держит временные файлы сортировщика
+            if domains is not None:
+                domains.close()
+            # Строку состояния освобождает только задача, которая ею владеет
+            if self.active_progress is progress:
+                self.active_progress = None
+                self.root.after(0, self.progress.configure, {'value': 0})
+                self.root.after(0, self.update_status, "Готово")
 
     def show_preview(self, domains, limit, stats):
-        """Отображение предпросмотра"""
-        preview = domains[:limit]
+        """Отображение предпросмотра (список в памяти показывается целиком)"""
+        if isinstance(domains, list):
+            preview = domains
+            total = len(domains)
+        else:
+            it = iter(domains)
+            preview = list(islice(it, limit))
+            total = len(preview) + sum(1 for _ in it)
         self.log("\n" + "=" * 70, "header")
-        self.log(f"👁 ПРЕДПРОСМОТР ({len(preview)} из {len(domains)})", "header")
+        self.log(f"👁 ПРЕДПРОСМОТР ({len(preview)} из {total})", "header")
         self.log("=" * 70, "header")
-       
-        for i, d in enumerate(preview, 1):
-            self.log(f"{i:4}. {d}")
-       
-        if len(domains) > limit:
-            self.log(f"\n... ещё {len(domains) - limit} доменов", "info")
-       
-        self.log("\n" + "=" * 70, "header")
-        self.display_stats(stats)
+        if total > len(preview):
+            self.log(f"... ещё {total - len(preview)} доменов не показано", "info")
+        self.root.after(0, self.open_preview_window, preview, total)
+        self.root.after(0, self.display_stats, stats)
 
-    def export_results(self, domains, output_path, stats):
-        """Экспорт результатов в различных форматах"""
-        fmt = self.export_format.get()
-       
-        if fmt == "txt":
-            sep = self.separator.get().replace('\\n', '\n').replace('\\t', '\t').replace('\\r', '\r')
-            result = sep.join(domains)
-           
-        elif fmt == "csv":
-            result = "domain\n" + "\n".join(domains)
-           
-        elif fmt == "json":
-            output_data = {
-                'domains': domains,
-                'count': len(domains),
-                'timestamp': datetime.now().isoformat(),
-                'statistics': {
-                    'files_processed': stats['files_processed'],
-                    'total_extracted': stats['raw_domains'],
-                    'duplicates_removed': stats['duplicates_removed'],
-                    'processing_time': f"{stats['processing_time']:.2f}s"
-                }
-            }
-            result = json.dumps(output_data, ensure_ascii=False, indent=2)
-           
-        elif fmt == "xml":
-            result = '<?xml version="1.0" encoding="UTF-8"?>\n<domains>\n'
-            for d in domains:
-                result += f' <domain>{d}</domain>\n'
-            result += '</domains>'
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(result)
-        self.log(f"\n💾 Сохранено: {output_path}", "success")
+    def open_preview_window(self, domains, total):
+        """Окно предпросмотра с виртуализированным списком"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Предпросмотр результатов")
+        dialog.geometry("700x500")
+        ttk.Label(dialog, text=f"Показано {len(domains)} из {total}").pack(pady=5)
+        VirtualList(dialog, domains).pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        ttk.Button(dialog, text="Закрыть", command=dialog.destroy).pack(pady=5)
+
+    def export_results(self, domains, output_path, stats, settings=None):
+        """Потоковый экспорт результатов в выбранном формате"""
+        settings = settings or self.snapshot_settings()
+        count = export(domains, output_path, settings, stats)
+        self.log(f"\n💾 Сохранено: {output_path} ({count} записей)", "success")
+        return count
 
     def display_stats(self, stats):
         """Отображение статистики"""
@@ -696,6 +757,43 @@ class DomainExtractorApp:
 """
         for tld, count in stats['tld_distribution'].most_common(5):
             stats_str += f" .{tld}: {count}\n"
+        approx = stats.get('approx')
+        if approx:
+            stats_str += f"Уникальных (HLL): ≈{approx['unique']} (±{approx['error'] * 100:.1f}%)\n"
+            top = list(approx['tld_unique'].items())[:5]
+            stats_str += " " + ", ".join(f".{tld}: ≈{n}" for tld, n in top) + "\n"
+        hitters = stats.get('heavy_hitters')
+        if hitters:
+            for key, title in (('domains', "Частые домены"), ('registrable', "Частые регистрируемые домены")):
+                entry = hitters[key]
+                stats_str += f"{title} ({heavy_hitters_bound(entry)}):\n"
+                for domain, count in entry['top'][:10]:
+                    stats_str += f" {domain}: {count}\n"
+        throughput = stats.get('throughput')
+        if throughput:
+            stats_str += (f"Скорость: {throughput['avg_rate'] / 1048576:.1f} МБ/с "
+                          f"(пик {throughput['peak_rate'] / 1048576:.1f}), "
+                          f"кандидатов/с: {throughput['candidates_per_sec']:,.0f}\n")
+        cache = stats.get('result_cache')
+        if cache and (cache['hits'] or cache['misses']):
+            stats_str += f"Кэш результатов: попаданий {cache['hits']}, промахов {cache['misses']}\n"
+        if len(stats.get('workers', {})) > 1:
+            stats_str += "Пропускная способность воркеров:\n"
+            for name, w in sorted(stats['workers'].items()):
+                speed = w['bytes'] / w['time'] / 1048576 if w['time'] else 0
+                stats_str += f" {name}: {w['units']} частей, {speed:.1f} МБ/с\n"
+        stages = stats.get('stages')
+        if stages:
+            stats_str += "Время по стадиям:\n"
+            for name, seconds, share in stage_rows(stages):
+                stats_str += f" {name}: {seconds:.2f} сек ({share * 100:.0f}%)\n"
+            counts = stages['counts']
+            if counts.get('candidates'):
+                stats_str += (f"Кандидатов: {counts['candidates']}, после валидации: {counts.get('validated', 0)}, "
+                              f"после фильтров: {counts.get('filtered', 0)}\n")
+            if stages['rejects']:
+                stats_str += "Отсеяно: " + ", ".join(
+                    f"{REJECT_NAMES.get(reason, reason)} {n}" for reason, n in stages['rejects'].items()) + "\n"
        
         self.stats_text.insert(1.0, stats_str)
         self.stats_text.config(state=tk.DISABLED)
@@ -709,9 +807,7 @@ class DomainExtractorApp:
             messagebox.showwarning("Ошибка", "Выберите выходной файл!")
             return
         self.update_tld_filter() # Применить фильтр TLD
-        self.task_queue.append((self.input_files.copy(), self.output_file.get(), False))
-        if not self.is_processing:
-            self.process_queue()
+        self.submit_job(Job(self.input_files, self.output_file.get(), self.snapshot_settings()))
 
     def preview_results(self):
         """Предпросмотр результатов"""
@@ -719,21 +815,137 @@ class DomainExtractorApp:
             messagebox.showwarning("Ошибка", "Выберите входной файл!")
             return
         self.update_tld_filter()
-        self.task_queue.append((self.input_files.copy(), None, True))
-        if not self.is_processing:
-            self.process_queue()
+        self.submit_job(Job(self.input_files, None, self.snapshot_settings(), preview=True))
 
-    def process_queue(self):
-        """Обработка очереди задач"""
-        if not self.task_queue or self.is_processing:
+    def follow_files(self):
+        """Слежение за дописываемыми файлами: новые домены дописываются в выходной файл"""
+        if not self.input_files:
+            messagebox.showwarning("Ошибка", "Выберите хотя бы один входной файл!")
             return
-        self.is_processing = True
-        inputs, output, preview = self.task_queue.popleft()
+        if not self.output_file.get():
+            messagebox.showwarning("Ошибка", "Выберите выходной файл!")
+            return
+        self.update_tld_filter()
+        self.submit_job(Job(self.input_files, self.output_file.get(), self.snapshot_settings(), follow=True))
+
+    def submit_job(self, job):
+        """Постановка задачи в очередь планировщика"""
+        self.update_max_jobs()
+        if not job.follow and self.scheduler.running >= self.scheduler.max_running:
+            self.log(f"⏳ Задача #{job.id} ({job.kind.lower()}) поставлена в очередь", "info")
+        self.scheduler.submit(job)
+        self.refresh_jobs(schedule=False)
+
+    def start_job(self, job):
+        """Запуск задачи в рабочем потоке (вызывается планировщиком)"""
         self.update_status("Обработка...")
-        thread = threading.Thread(target=self.process_domains, args=(inputs, output, preview))
+        # Переменные Tk читаются здесь, в главном потоке, а не в задаче
+        self.history.max_entries = self.max_history
+        self.history.max_mb = self.history_mb.get()
+        thread = threading.Thread(target=self.run_job, args=(job,))
         thread.daemon = True
         thread.start()
 
+    def run_job(self, job):
+        """Выполнение задачи; итог передаётся планировщику в главном потоке"""
+        status, error = DONE, None
+        try:
+            if job.follow:
+                self.run_follow(job)
+            elif job.settings.profile:
+                path = profile_path(job.output)
+                try:
+                    with profiled(path):
+                        self.process_domains(job.inputs, job.output, job.preview, settings=job.settings,
+                                             control=job.control)
+                finally:
+                    self.log(f"🔬 Профиль задачи #{job.id}: {path} (сводка в {Path(path).name}.txt; "
+                             f"процессы-воркеры не профилируются)", "info")
+            else:
+                self.process_domains(job.inputs, job.output, job.preview, settings=job.settings,
+                                     control=job.control)
+        except JobCancelled:
+            status = CANCELLED
+            if job.follow:
+                self.log(f"\n⏹ Слежение #{job.id} остановлено, позиции в файлах сохранены", "warning")
+            else:
+                self.log(f"\n⏹ Задача #{job.id} отменена, временные и частичные файлы удалены", "warning")
+        except Exception as e:
+            status, error = FAILED, str(e)
+        finally:
+            self.root.after(0, self.scheduler.finish, job, status, error)
+
+    FOLLOW_EVENTS = {ROTATED: "ротация файла, чтение нового с начала",
+                     TRUNCATED: "файл усечён или перезаписан, чтение с начала",
+                     MISSING: "файл не найден, ожидание",
+                     COMPRESSED: "сжатый файл не поддерживается слежением"}
+
+    def run_follow(self, job):
+        """Слежение до отмены задачи (в рабочем потоке)"""
+        try:
+            follower = Follower(job.inputs, job.output, job.settings, detector=self.encoding_detector)
+        except Exception as e:
+            self.log(f"\n❌ ОШИБКА: {e}", "error")
+            raise
+        self.log(f"\n📡 Слежение #{job.id}: файлов {len(job.inputs)} → {Path(job.output).name}, "
+                 f"уже выдано доменов: {len(follower.seen)}", "header")
+        if follower.reset:
+            self.log(" ℹ Настройки изменились: позиции и множество выданных доменов сброшены", "info")
+
+        def on_poll(result):
+            for path, event in result['events']:
+                self.log(f" ↻ {Path(path).name}: {self.FOLLOW_EVENTS[event]}", "warning")
+            if result['new']:
+                self.log(f" ✓ Слежение #{job.id}: +{result['new']} новых доменов "
+                         f"(всего {follower.total_new})", "success")
+            # Строку состояния занимает пакетная задача, если она идёт
+            if self.active_progress is None:
+                self.root.after(0, self.update_status,
+                                f"Слежение #{job.id}: новых доменов {follower.total_new}, "
+                                f"прочитано {follower.total_bytes / 1048576:.1f} МБ")
+
+        follower.run(job.control, on_poll=on_poll)
+
+    def update_max_jobs(self):
+        try:
+            self.scheduler.max_running = max(1, self.max_jobs.get())
+        except tk.TclError:
+            return
+        self.scheduler.dispatch()
+
+    def selected_jobs(self):
+        return [job for job in (self.scheduler.get(int(iid)) for iid in self.jobs_tree.selection()) if job]
+
+    def control_jobs(self, action):
+        """Пауза, продолжение или отмена выбранных задач (без выбора - всех)"""
+        for job in self.selected_jobs() or list(self.scheduler.jobs):
+            action(job)
+        self.refresh_jobs(schedule=False)
+
+    def clear_finished_jobs(self):
+        self.scheduler.clear_finished()
+        self.refresh_jobs(schedule=False)
+
+    def refresh_jobs(self, schedule=True):
+        """Обновление панели очереди: статус и время выполнения задач"""
+        tree = self.jobs_tree
+        ids = set()
+        for job in self.scheduler.jobs:
+            iid = str(job.id)
+            ids.add(iid)
+            minutes, seconds = divmod(int(job.elapsed), 60)
+            values = (job.kind, len(job.inputs), job.priority, self.JOB_STATUS[job.status],
+                      f"{minutes:02d}:{seconds:02d}")
+            if tree.exists(iid):
+                tree.item(iid, values=values)
+            else:
+                tree.insert("", tk.END, iid=iid, text=f"#{job.id}", values=values)
+        for iid in tree.get_children():
+            if iid not in ids:
+                tree.delete(iid)
+        if schedule:
+            self.root.after(self.JOBS_POLL_MS, self.refresh_jobs)
+
     def manage_blacklist(self):
         """Управление чёрным списком"""
         dialog = tk.Toplevel(self.root)
@@ -747,6 +959,7 @@ class DomainExtractorApp:
         text = scrolledtext.ScrolledText(dialog, height=15)
         text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         text.insert(1.0, '\n'.join(self.blacklist_patterns))
+        self.create_list_files_frame(dialog, self.blacklist_files)
        
         def save():
             content = text.get(1.0, tk.END).strip()
@@ -769,6 +982,7 @@ class DomainExtractorApp:
         text = scrolledtext.ScrolledText(dialog, height=15)
         text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         text.insert(1.0, '\n'.join(self.whitelist_patterns))
+        self.create_list_files_frame(dialog, self.whitelist_files)
        
         def save():
             content = text.get(1.0, tk.END).strip()
@@ -778,6 +992,33 @@ class DomainExtractorApp:
        
         ttk.Button(dialog, text="Сохранить", command=save).pack(pady=5)
 
+    def create_list_files_frame(self, dialog, files):
+        """Блок подключаемых файлов списка (hosts или один домен на строку)"""
+        frame = ttk.Frame(dialog)
+        frame.pack(fill=tk.X, padx=10)
+        info = ttk.Label(frame, foreground="gray")
+        info.pack(side=tk.LEFT)
+       
+        def refresh():
+            names = ', '.join(Path(f).name for f in files)
+            info.config(text=f"Файлы списков: {names}" if files else "Файлы списков не подключены")
+       
+        def add():
+            for f in filedialog.askopenfilenames(
+                    parent=dialog, title="Выберите файлы списков",
+                    filetypes=[("Списки и hosts", "*.txt *.hosts *.list hosts"), ("Все файлы", "*.*")]):
+                if f not in files:
+                    files.append(f)
+            refresh()
+       
+        def clear():
+            files.clear()
+            refresh()
+       
+        ttk.Button(frame, text="Очистить", command=clear).pack(side=tk.RIGHT, padx=2)
+        ttk.Button(frame, text="Добавить файл...", command=add).pack(side=tk.RIGHT, padx=2)
+        refresh()
+
     def test_regex(self):
         """Тестирование регулярных выражений"""
         dialog = tk.Toplevel(self.root)
@@ -792,12 +1033,13 @@ class DomainExtractorApp:
        
         def test():
             text = input_text.get(1.0, tk.END)
-            domains = self.extract_domains(text)
+            pipeline = ExtractionPipeline(self.snapshot_settings())
+            domains = pipeline.run(text)
             result_text.config(state=tk.NORMAL)
             result_text.delete(1.0, tk.END)
             result_text.insert(1.0, f"Найдено доменов: {len(domains)}\n\n")
             for i, d in enumerate(domains, 1):
-                formatted = self.format_domain(d)
+                formatted = pipeline.format(d)
                 result_text.insert(tk.END, f"{i}. {d} → {formatted}\n")
             result_text.config(state=tk.DISABLED)
        
@@ -866,13 +1108,58 @@ class DomainExtractorApp:
                 writer.writerow(['Файлов обработано', self.stats.get('files_processed', 0)])
                 writer.writerow(['Извлечено доменов', self.stats.get('raw_domains', 0)])
                 writer.writerow(['Валидных доменов', self.stats.get('valid_domains', 0)])
+                writer.writerow(['Отсеяно фильтрами', self.stats.get('filtered_out', 0)])
                 writer.writerow(['Удалено дубликатов', self.stats.get('duplicates_removed', 0)])
                 writer.writerow(['Итоговый результат', self.stats.get('final_count', 0)])
                 writer.writerow(['Время обработки (сек)', f"{self.stats.get('processing_time', 0):.2f}"])
+                approx = self.stats.get('approx')
+                if approx:
+                    writer.writerow(['Уникальных доменов (HLL)', approx['unique']])
+                    writer.writerow(['Погрешность HLL', f"{approx['error'] * 100:.2f}%"])
+                cache = self.stats.get('result_cache')
+                if cache:
+                    writer.writerow(['Кэш результатов: попаданий', cache['hits']])
+                    writer.writerow(['Кэш результатов: промахов', cache['misses']])
                 writer.writerow([])
                 writer.writerow(['Доменная зона', 'Количество'])
                 for tld, count in self.stats.get('tld_distribution', Counter()).most_common():
                     writer.writerow([f'.{tld}', count])
+                throughput = self.stats.get('throughput')
+                if throughput:
+                    writer.writerow(['Средняя скорость (МБ/с)', f"{throughput['avg_rate'] / 1048576:.2f}"])
+                    writer.writerow(['Пиковая скорость (МБ/с)', f"{throughput['peak_rate'] / 1048576:.2f}"])
+                    writer.writerow(['Кандидатов в секунду', f"{throughput['candidates_per_sec']:.0f}"])
+                files = self.stats.get('files')
+                if files:
+                    writer.writerow([])
+                    writer.writerow(['Файл', 'Байт', 'Время (сек)', 'Средняя МБ/с', 'Пиковая МБ/с', 'Кандидатов'])
+                    for name, entry in files.items():
+                        avg = entry['bytes'] / entry['time'] / 1048576 if entry['time'] else 0
+                        writer.writerow([name, entry['bytes'], f"{entry['time']:.2f}", f"{avg:.2f}",
+                                         f"{entry['peak_rate'] / 1048576:.2f}", entry['candidates']])
+                if approx:
+                    writer.writerow([])
+                    writer.writerow(['Доменная зона', 'Уникальных (HLL)', 'Погрешность'])
+                    for tld, count in approx['tld_unique'].items():
+                        writer.writerow([f'.{tld}', count, f"{approx['tld_error'] * 100:.2f}%"])
+                hitters = self.stats.get('heavy_hitters')
+                if hitters:
+                    for key, title in (('domains', 'Частый домен'), ('registrable', 'Частый регистрируемый домен')):
+                        entry = hitters[key]
+                        writer.writerow([])
+                        writer.writerow([title, 'Вхождений', 'Завышение не более', 'Вероятность'])
+                        for domain, count in entry['top']:
+                            writer.writerow([domain, count, entry['error'], f"{entry['confidence'] * 100:.1f}%"])
+                stages = self.stats.get('stages')
+                if stages:
+                    writer.writerow([])
+                    writer.writerow(['Стадия', 'Время (сек)', 'Доля'])
+                    for name, seconds, share in stage_rows(stages):
+                        writer.writerow([name, f"{seconds:.3f}", f"{share * 100:.1f}%"])
+                    writer.writerow([])
+                    writer.writerow(['Причина отсева', 'Кандидатов'])
+                    for reason, n in stages['rejects'].items():
+                        writer.writerow([REJECT_NAMES.get(reason, reason), n])
            
             self.log(f"✓ Статистика экспортирована: {filename}", "success")
 
@@ -882,77 +1169,130 @@ class DomainExtractorApp:
             messagebox.showinfo("Информация", "Нет операций для отмены")
             return
        
-        last = self.history[-1]
+        last = self.history.last()
         response = messagebox.askyesno("Отмена",
             f"Восстановить результат от {last['timestamp']}?\n"
-            f"Доменов: {len(last['domains'])}")
+            f"Доменов: {last['count']}")
        
         if response and self.output_file.get():
             try:
-                domains = last['domains']
-                self.export_results(domains, self.output_file.get(), last['stats'])
-                self.log(f"✓ Восстановлено из истории: {len(domains)} доменов", "success")
+                # Домены читаются из сжатой записи потоком, прямо в экспортёр
+                count = self.export_results(self.history.iter_domains(last), self.output_file.get(),
+                                            last['stats'])
+                self.log(f"✓ Восстановлено из истории: {count} доменов", "success")
                 messagebox.showinfo("Успех", "Результат восстановлен")
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Не удалось восстановить: {e}")
 
     def log(self, msg, tag=None):
-        """Логирование с поддержкой тегов"""
-        self.log_text.insert(tk.END, msg + "\n", tag)
+        """Логирование с поддержкой тегов (из любого потока)"""
+        self.log_queue.put((msg, tag))
+
+    def drain_log(self):
+        """Перенос накопленных записей лога в виджет (главный поток)"""
+        records = []
+        try:
+            while len(records) < self.LOG_BATCH:
+                records.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        # Ограничение скорости: при большом отставании старые записи пропускаются
+        if self.log_queue.qsize() > self.LOG_BACKLOG:
+            skipped = 0
+            try:
+                while self.log_queue.qsize() > self.LOG_BATCH:
+                    self.log_queue.get_nowait()
+                    skipped += 1
+            except queue.Empty:
+                pass
+            records.append((f"… пропущено записей лога: {skipped}", "warning"))
+        try:
+            if records:
+                self.append_log(coalesce(records))
+        finally:
+            self.root.after(self.LOG_POLL_MS, self.drain_log)
+
+    def append_log(self, records):
+        """Вставка записей одной операцией; виджет повторяет кольцевой буфер"""
+        buffer = self.log_buffer
+        try:
+            limit = self.log_max_lines.get()
+        except tk.TclError:
+            limit = buffer.max_lines
+        dropped = buffer.resize(limit) if limit != buffer.max_lines else 0
+        runs = []
+        for msg, tag in records:
+            for line in msg.split("\n"):
+                dropped += buffer.append(line, tag)
+                if runs and runs[-1][1] == tag:
+                    runs[-1][0].append(line)
+                else:
+                    runs.append(([line], tag))
+        args = []
+        for lines, tag in runs:
+            args.extend(("\n".join(lines) + "\n", tag or ""))
+        self.log_text.insert(tk.END, *args)
+        if dropped:
+            self.log_text.delete("1.0", f"{dropped + 1}.0")
         self.log_text.see(tk.END)
 
     def clear_log(self):
         """Очистка лога"""
+        self.log_buffer.clear()
         self.log_text.delete(1.0, tk.END)
 
+    def poll_progress(self, progress, meter):
+        """Прогресс, МБ/с, кандидатов/с и ETA в строке состояния (главный поток)"""
+        if self.active_progress is not progress:
+            return
+        snap = meter.update(progress.bytes_done, progress.candidates)
+        self.progress.configure(value=snap['percent'])
+        self.update_status(f"Обработка: {snap['percent']:.1f}% • {snap['mbps']:.1f} МБ/с • "
+                           f"{snap['candidates_per_sec']:,.0f} канд./с • осталось {format_eta(snap['eta'])}")
+        self.root.after(self.PROGRESS_POLL_MS, self.poll_progress, progress, meter)
+
     def update_status(self, msg):
         """Обновление статуса"""
         self.status_label.config(text=msg)
 
+    def log_index(self, row, col=0):
+        """Индекс виджета для позиции в кольцевом буфере"""
+        if col and tk.TkVersion < 9.0:
+            # Tk 8.6 хранит символы вне BMP (эмодзи) как суррогатные пары
+            col += sum(1 for ch in self.log_buffer.lines[row][0][:col] if ord(ch) > 0xFFFF)
+        return f"{row + 1}.{col}"
+
     def search_log(self):
-        """Поиск в логе"""
-        query = self.search_var.get().lower()
+        """Поиск в логе (по кольцевому буферу, без обхода виджета)"""
+        query = self.search_var.get()
         if not query:
             return
        
         self.log_text.tag_remove("search", 1.0, tk.END)
-       
-        start = "1.0"
-        while True:
-            pos = self.log_text.search(query, start, tk.END, nocase=True)
-            if not pos:
-                break
-            end = f"{pos}+{len(query)}c"
-            self.log_text.tag_add("search", pos, end)
-            start = end
+        matches = self.log_buffer.search(query)
+        for row, col in matches:
+            self.log_text.tag_add("search", self.log_index(row, col), self.log_index(row, col + len(query)))
        
         self.log_text.tag_config("search", background="yellow", foreground="black")
        
         # Переход к первому совпадению
-        first = self.log_text.search(query, 1.0, tk.END, nocase=True)
-        if first:
-            self.log_text.see(first)
+        if matches:
+            self.log_text.see(self.log_index(*matches[0]))
         else:
             messagebox.showinfo("Поиск", "Совпадений не найдено")
 
     def search_next(self):
         """Поиск следующего совпадения"""
-        query = self.search_var.get().lower()
+        query = self.search_var.get()
         if not query:
             return
        
-        current = self.log_text.index(tk.INSERT)
-        pos = self.log_text.search(query, current, tk.END, nocase=True)
-       
-        if pos:
+        current = int(self.log_text.index(tk.INSERT).split('.')[0]) - 1
+        row = self.log_buffer.find_next(query, current)
+        if row is not None:
+            pos = self.log_index(row)
             self.log_text.mark_set(tk.INSERT, pos)
             self.log_text.see(pos)
-        else:
-            # Начать сначала
-            pos = self.log_text.search(query, "1.0", tk.END, nocase=True)
-            if pos:
-                self.log_text.mark_set(tk.INSERT, pos)
-                self.log_text.see(pos)
 
     def focus_search(self):
         """Фокус на поиск"""
@@ -983,6 +1323,12 @@ class DomainExtractorApp:
             "domain_format": self.domain_format.get(),
             "remove_www": self.remove_www.get(),
             "remove_duplicates": self.remove_duplicates.get(),
+            "dedup_mode": self.dedup_mode.get(),
+            "approx_capacity": self.approx_capacity.get(),
+            "approx_fp_rate": self.approx_fp_rate.get(),
+            "heavy_hitters": self.heavy_hitters.get(),
+            "heavy_hitters_k": self.heavy_hitters_k.get(),
+            "heavy_hitters_mb": self.heavy_hitters_mb.get(),
             "sort_results": self.sort_results.get(),
             "export_format": self.export_format.get(),
             "dark_mode": self.dark_mode.get(),
@@ -995,8 +1341,20 @@ class DomainExtractorApp:
             "validate_dns": self.validate_dns.get(),
             "case_mode": self.case_mode.get(),
             "extraction_mode": self.extraction_mode.get(),
+            "idn": self.idn.get(),
+            "extract_engine": self.extract_engine.get(),
+            "workers": self.workers.get(),
+            "memory_budget_mb": self.memory_budget_mb.get(),
+            "result_cache": self.result_cache.get(),
+            "result_cache_mb": self.result_cache_mb.get(),
+            "profile": self.profile.get(),
+            "log_max_lines": self.log_max_lines.get(),
+            "max_jobs": self.max_jobs.get(),
+            "history_mb": self.history_mb.get(),
             "blacklist": self.blacklist_patterns,
-            "whitelist": self.whitelist_patterns
+            "whitelist": self.whitelist_patterns,
+            "blacklist_files": self.blacklist_files,
+            "whitelist_files": self.whitelist_files
         }
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
@@ -1014,7 +1372,7 @@ class DomainExtractorApp:
            
             # Загрузка простых переменных
             for k, v in config.items():
-                if k in ['blacklist', 'whitelist', 'tld_filter']:
+                if k in ['blacklist', 'whitelist', 'blacklist_files', 'whitelist_files', 'tld_filter']:
                     continue
                 var = getattr(self, k, None)
                 if var and isinstance(var, tk.Variable):
@@ -1023,6 +1381,8 @@ class DomainExtractorApp:
             # Загрузка списков
             self.blacklist_patterns = config.get('blacklist', [])
             self.whitelist_patterns = config.get('whitelist', [])
+            self.blacklist_files = config.get('blacklist_files', [])
+            self.whitelist_files = config.get('whitelist_files', [])
             
             # Загрузка tld_entry
             tld_filter = config.get('tld_filter', '.com, .ru, .org, .net')
@@ -1038,10 +1398,10 @@ class DomainExtractorApp:
 СПРАВКА ПО ПРОДВИНУТЫМ МАСКАМ
 Переменные шаблона:
   {domain} - Полный домен (example.com)
-  {name} - Имя без TLD (example)
-  {tld} - Доменная зона (com)
-  {sld} - Second-level domain (example из example.com)
-  {subdomain} - Поддомен (www из www.example.com)
+  {name} - Имя без зоны (example, shop.example из shop.example.co.uk)
+  {tld} - Доменная зона по Public Suffix List (com, co.uk)
+  {sld} - Имя регистрируемого домена (example из shop.example.co.uk)
+  {subdomain} - Поддомен (shop из shop.example.co.uk)
   {full} - Оригинальный домен без изменений
 Примеры использования:
 1. URL формат:
@@ -1111,7 +1471,7 @@ Domain Extractor Pro v3.0
 ✓ 4 режима извлечения доменов
 ✓ Чёрный и белый списки
 ✓ Валидация DNS структуры
-✓ Поддержка двухуровневых TLD
+✓ Доменные зоны по Public Suffix List
 ✓ Фильтрация по длине домена
 ✓ Настройка регистра
 ✓ Удаление символов
@@ -1178,4 +1538,6 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()